@@ -6,9 +6,11 @@ except ImportError:
     AsyncAnthropic = None
 
 from datetime import datetime
+import json
 from typing import Dict, Any, Optional
 from app.agents.adapters.base_adapter import BaseModelAdapter
 from app.agents.base import ModelCapability
+from app.agents.token_budget import context_window_for
 
 class AnthropicAdapter(BaseModelAdapter):
     """Adapter for Claude models (optional dependency)"""
@@ -28,23 +30,41 @@ class AnthropicAdapter(BaseModelAdapter):
         prompt: str,
         temperature: float,
         max_tokens: Optional[int] = None,
-        response_format: Optional[str] = None
+        response_format: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate completion from Claude"""
 
         start_time = datetime.utcnow()
 
-        response = await self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens or 4096,
-            temperature=temperature,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        request_params = {
+            "model": self.model,
+            "max_tokens": max_tokens or 4096,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+        # Structured output via a forced tool call whose input is the schema
+        if response_schema is not None:
+            request_params["tools"] = [{
+                "name": "record_output",
+                "description": "Record the analysis as structured JSON",
+                "input_schema": response_schema
+            }]
+            request_params["tool_choice"] = {"type": "tool", "name": "record_output"}
+
+        response = await self.client.messages.create(**request_params)
 
         execution_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
 
+        if response_schema is not None:
+            tool_input = next(block.input for block in response.content if block.type == "tool_use")
+            text = json.dumps(tool_input)
+        else:
+            text = response.content[0].text
+
         return {
-            "text": response.content[0].text,
+            "text": text,
             "model": self.model,
             "execution_time_ms": execution_time,
             "token_usage": {
@@ -70,6 +90,18 @@ class AnthropicAdapter(BaseModelAdapter):
                 ModelCapability.LONG_CONTEXT
             ]
 
+    def supports_native_schema(self) -> bool:
+        """Schemas are enforced through forced tool use"""
+        return True
+
+    def get_model_name(self) -> str:
+        """Claude model identifier"""
+        return self.model
+
+    def get_context_window(self) -> int:
+        """Claude context window"""
+        return context_window_for(self.model)
+
     def get_cost_per_1k_tokens(self) -> Dict[str, float]:
         """Claude pricing"""
         if "opus" in self.model:
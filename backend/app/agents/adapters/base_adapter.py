@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 from app.agents.base import ModelCapability
+from app.agents.token_budget import context_window_for
 
 class BaseModelAdapter(ABC):
     """
@@ -14,7 +15,8 @@ class BaseModelAdapter(ABC):
         prompt: str,
         temperature: float,
         max_tokens: Optional[int] = None,
-        response_format: Optional[str] = None  # "json", "text"
+        response_format: Optional[str] = None,  # "json", "text"
+        response_schema: Optional[Dict[str, Any]] = None  # JSON Schema for structured output
     ) -> Dict[str, Any]:
         """Generate completion from the model"""
         pass
@@ -27,4 +29,21 @@ class BaseModelAdapter(ABC):
     @abstractmethod
     def get_cost_per_1k_tokens(self) -> Dict[str, float]:
         """Pricing info for routing decisions"""
-        pass
\ No newline at end of file
+        pass
+
+    def supports_native_schema(self) -> bool:
+        """
+        Whether generate() enforces response_schema through the provider.
+
+        When False, response_schema is ignored and the agent keeps the
+        example JSON in its prompt.
+        """
+        return False
+
+    def get_model_name(self) -> str:
+        """Model identifier reported in results"""
+        return getattr(self, "model_name", "")
+
+    def get_context_window(self) -> int:
+        """Context window (tokens) used for prompt budgeting and routing"""
+        return context_window_for(self.get_model_name())
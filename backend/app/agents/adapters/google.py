@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from app.agents.adapters.base_adapter import BaseModelAdapter
 from app.agents.base import ModelCapability
+from app.agents.output_schema import gemini_schema
 
 class GoogleGeminiAdapter(BaseModelAdapter):
     """Adapter for Google Gemini models"""
@@ -17,16 +18,25 @@ class GoogleGeminiAdapter(BaseModelAdapter):
         prompt: str,
         temperature: float,
         max_tokens: Optional[int] = None,
-        response_format: Optional[str] = None
+        response_format: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate completion from Gemini"""
 
         start_time = datetime.utcnow()
 
-        generation_config = genai.GenerationConfig(
-            temperature=temperature,
-            max_output_tokens=max_tokens
-        )
+        config_params = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens
+        }
+
+        # Native JSON mode, constrained to the schema when one is given
+        if response_format == "json" or response_schema is not None:
+            config_params["response_mime_type"] = "application/json"
+        if response_schema is not None:
+            config_params["response_schema"] = gemini_schema(response_schema)
+
+        generation_config = genai.GenerationConfig(**config_params)
 
         try:
             response = self.model.generate_content(
@@ -67,6 +77,10 @@ class GoogleGeminiAdapter(BaseModelAdapter):
             execution_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
             raise Exception(f"Gemini API error: {str(e)}") from e
 
+    def supports_native_schema(self) -> bool:
+        """Gemini enforces response_schema natively"""
+        return True
+
     def get_capabilities(self) -> list[ModelCapability]:
         """Gemini 2.0 Flash is fast + good at structured output"""
         return [
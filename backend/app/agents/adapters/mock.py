@@ -19,7 +19,8 @@ class MockAdapter(ModelAdapter):
         prompt: str,
         temperature: float = 0.7,
         max_tokens: int = 1000,
-        response_format: str = "text"
+        response_format: str = "text",
+        response_schema: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """Generate mock response based on the agent type in the prompt"""
 
@@ -1,5 +1,6 @@
 from openai import AsyncOpenAI
 from datetime import datetime
+import json
 from typing import Dict, Any, Optional
 from app.agents.adapters.base_adapter import BaseModelAdapter
 from app.agents.base import ModelCapability
@@ -7,6 +8,9 @@ from app.agents.base import ModelCapability
 class OpenRouterAdapter(BaseModelAdapter):
     """Adapter for OpenRouter API using OpenAI-compatible interface"""
 
+    # Model families whose OpenRouter providers accept json_schema response formats
+    NATIVE_SCHEMA_MODELS = ("openai/", "google/gemini", "anthropic/")
+
     def __init__(self, api_key: str, model: str = "google/gemini-2.0-flash-exp:free"):
         self.client = AsyncOpenAI(
             base_url="https://openrouter.ai/api/v1",
@@ -19,7 +23,8 @@ class OpenRouterAdapter(BaseModelAdapter):
         prompt: str,
         temperature: float,
         max_tokens: Optional[int] = None,
-        response_format: Optional[str] = None
+        response_format: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate completion from OpenRouter"""
 
@@ -39,15 +44,32 @@ class OpenRouterAdapter(BaseModelAdapter):
             if max_tokens:
                 request_params["max_tokens"] = max_tokens
 
-            # Handle response format (OpenRouter supports some models with JSON mode)
-            if response_format == "json":
-                try:
-                    request_params["response_format"] = {"type": "json_object"}
-                except Exception:
-                    # Fallback if model doesn't support JSON mode
-                    pass
-
-            response = await self.client.chat.completions.create(**request_params)
+            # Handle response format: strict JSON schema where supported, JSON mode otherwise
+            use_schema = response_schema is not None and self.supports_native_schema()
+            if use_schema:
+                request_params["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {"name": "agent_output", "strict": True, "schema": response_schema}
+                }
+                # Only route to providers that honour the schema
+                request_params["extra_body"] = {"provider": {"require_parameters": True}}
+            elif response_format == "json" or response_schema is not None:
+                request_params["response_format"] = {"type": "json_object"}
+
+            try:
+                response = await self.client.chat.completions.create(**request_params)
+            except Exception as e:
+                if not use_schema:
+                    raise
+                # Schema rejected - fall back to JSON mode with the schema in the prompt
+                print(f"⚠️ json_schema rejected for {self.model_name}, retrying with JSON mode: {e}")
+                request_params.pop("extra_body", None)
+                request_params["response_format"] = {"type": "json_object"}
+                request_params["messages"] = [{
+                    "role": "user",
+                    "content": f"{prompt}\n\nRespond with JSON matching this JSON Schema:\n{json.dumps(response_schema)}"
+                }]
+                response = await self.client.chat.completions.create(**request_params)
 
             execution_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
 
@@ -77,6 +99,10 @@ class OpenRouterAdapter(BaseModelAdapter):
             execution_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
             raise Exception(f"OpenRouter API error: {str(e)}") from e
 
+    def supports_native_schema(self) -> bool:
+        """json_schema response format is only sent to model families known to support it"""
+        return self.model_name.startswith(self.NATIVE_SCHEMA_MODELS)
+
     def get_capabilities(self) -> list[ModelCapability]:
         """Capabilities depend on the underlying model"""
 
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
+from uuid import UUID
 from pydantic import BaseModel
 from enum import Enum
 
@@ -23,8 +24,11 @@ class AgentTask(BaseModel):
     input_data: Dict[str, Any]
     temperature: float = 0.7
     max_tokens: Optional[int] = None
+    estimated_prompt_tokens: Optional[int] = None  # Used to route oversized prompts
+    output_mode: str = "verbose"  # "verbose" or "compact" (short keys, expanded by the agent)
     required_capabilities: list[ModelCapability] = []
     preferred_provider: Optional[ModelProvider] = None
+    analysis_id: Optional[UUID] = None  # Keys the prompt/response transcript
 
 class AgentResponse(BaseModel):
     """Standardized agent response"""
@@ -46,6 +50,13 @@ class BaseAgent(ABC):
     Agents are model-agnostic - they define WHAT to do, not HOW.
     """
 
+    # Field paths this agent reads from the pipeline context (see app.agents.projection).
+    # Empty means the agent receives the whole context.
+    INPUT_PROJECTION: tuple[str, ...] = ()
+
+    # Context key the orchestrator stores this agent's output under
+    OUTPUT_KEY: Optional[str] = None
+
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -0,0 +1,48 @@
+"""
+Compact Output Mode
+
+Agents can ask models for a compact JSON shape (short keys, optional
+narrative fields dropped) to cut generated tokens. The compact output is
+expanded back to the verbose shape before it leaves the agent, so the
+orchestrator, SynthesisAgent and API consumers never see short keys.
+Expansion restores the keys, not the text: each agent fills the fields
+it dropped with empty values (or ones it can derive), so compact output
+has the verbose shape without the narrative content.
+"""
+
+from typing import Any, Dict
+
+OUTPUT_MODE_VERBOSE = "verbose"
+OUTPUT_MODE_COMPACT = "compact"
+OUTPUT_MODES = (OUTPUT_MODE_VERBOSE, OUTPUT_MODE_COMPACT)
+
+
+def expand_keys(data: Any, key_map: Dict[str, str]) -> Any:
+    """
+    Recursively rename short keys to their verbose names.
+
+    Keys missing from key_map are kept as-is, so a model that answers
+    with verbose keys anyway is still handled.
+    """
+    if isinstance(data, dict):
+        return {key_map.get(key, key): expand_keys(value, key_map) for key, value in data.items()}
+    if isinstance(data, list):
+        return [expand_keys(item, key_map) for item in data]
+    return data
+
+
+def compact_instructions(skeleton: str) -> str:
+    """
+    Output format section used for compact mode prompts.
+
+    The result is appended to a str.format() prompt template, so braces in
+    the skeleton are escaped here.
+    """
+    skeleton = skeleton.replace("{", "{{").replace("}", "}}")
+    return f"""OUTPUT FORMAT (ONLY VALID JSON, COMPACT KEYS):
+Use exactly these short keys. Keep every string value brief (under 20 words).
+Do not add keys that are not shown.
+
+{skeleton}
+
+CRITICAL: Output ONLY minified valid JSON. Any text outside JSON will cause parsing failure."""
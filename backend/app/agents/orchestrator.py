@@ -5,22 +5,75 @@ Manages the 4-agent pipeline for Job Hazard Analysis.
 Replicates the multiAgentSafety.ts workflow in Python.
 """
 
+import copy
+import json
 from typing import Dict, Any, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.agents.registry import AgentRegistry
-from app.agents.base import AgentTask, ModelCapability
+from app.agents.base import AgentTask, AgentResponse, ModelCapability
+from app.agents.risk_engine import risk_engine
+from app.agents.projection import fingerprint, get_path, project, set_path, stages_affected_by
 from app.agents.profiles.jha_validator import JHAValidatorAgent
 from app.agents.profiles.risk_assessor import RiskAssessorAgent
 from app.agents.profiles.swiss_cheese_analyzer import SwissCheeseAnalyzerAgent
 from app.agents.profiles.synthesis_agent import SynthesisAgent
-from app.models.analysis import AnalysisHistory
+from app.knowledge import osha_data_for_naics
+from app.models.analysis import AnalysisHistory, AgentOutput
 from app.models.jha_updates import JHAUpdate
 from app.schemas.jha import JHAAnalysisRequest, JHAAnalysisResponse
 from app.services.agent_config_service import AgentConfigService
+from app.services.company_cache import company_naics_cache
+from app.services.metrics_sink import metrics_sink
+from app.services.analysis_persister import analysis_persister
+from app.services.hazard_index import extract_hazard_rows
+from app.services.blob_store import blob_store
+from app.services.voice_extractor import voice_extractor
+from app.core.serialization import to_jsonable
+from app.core.config import get_settings
+from app.core.database import release_connection
+
+# Per agent: orchestrator config key, metrics config name, task type,
+# required capabilities and default temperature
+STAGE_SETTINGS = {
+    "jha_validator": ("agent1_validation", "validator", "jha_validation",
+                      [ModelCapability.FAST_REASONING, ModelCapability.STRUCTURED_OUTPUT], 0.3),
+    "risk_assessor": ("agent2_risk", "risk_assessor", "risk_assessment",
+                      [ModelCapability.FAST_REASONING, ModelCapability.STRUCTURED_OUTPUT], 0.7),
+    "swiss_cheese_analyzer": ("agent3_prediction", "swiss_cheese", "swiss_cheese_analysis",
+                              [ModelCapability.DEEP_REASONING, ModelCapability.CREATIVE, ModelCapability.STRUCTURED_OUTPUT], 1.0),
+    "synthesis_agent": ("agent4_synthesis", "synthesizer", "report_synthesis",
+                        [ModelCapability.STRUCTURED_OUTPUT], 0.5)
+}
+
+# Pipeline inputs (as opposed to agent outputs) kept with each analysis
+PIPELINE_INPUTS = ("checklist", "weather", "osha_data", "current_time")
+
+# Live updates may only change field conditions, not the NAICS baseline
+# or agent outputs
+LIVE_UPDATE_ROOTS = ("weather", "checklist")
+
+# Extracted field variables -> context paths they update, and update type
+LIVE_UPDATE_PATHS = {
+    "wind_speed": ("weather.windSpeed", "environmental"),
+    "temperature": ("weather.temperature", "environmental"),
+    "precipitation": ("weather.precipitation", "environmental"),
+    "visibility": ("weather.visibility", "environmental"),
+    "crew_size": ("checklist.project_data.crewSize", "crew"),
+    "equipment_changes": ("checklist.project_data.equipmentChanges", "equipment"),
+    "time_of_day": ("checklist.project_data.timeOfDay", "scope"),
+    "crew_experience": ("checklist.project_data.crewExperience", "crew")
+}  # concern_keywords are descriptive and stay in extracted_variables
+
+# Changes the risk engine can re-score locally, without the LLM agents
+CREW_EXPERIENCE_PATH = LIVE_UPDATE_PATHS["crew_experience"][0]
+RESCORABLE_PATHS = {"weather.windSpeed", "weather.temperature", "weather.precipitation", CREW_EXPERIENCE_PATH}
+
+ALERT_SEVERITY = {"STOP_WORK": "critical", "NO_GO": "critical", "GO_WITH_CONDITIONS": "warning"}
+RISK_DELTA_WARNING = 10  # A rise this large warns the crew even on a GO
 
 
 class JHAOrchestrator:
@@ -44,6 +97,54 @@ class JHAOrchestrator:
         # Initialize agent config service
         self.config_service = AgentConfigService(db)
 
+    @property
+    def pipeline(self) -> list:
+        """Agents in execution order"""
+        return [self.validator, self.risk_assessor, self.swiss_cheese, self.synthesizer]
+
+    def stages_affected_by(self, changed_paths: list[str]) -> list[str]:
+        """
+        Names of the agents that must re-run when the given context paths
+        change, e.g. ["weather.windSpeed"] or ["checklist"].
+        """
+        return stages_affected_by(
+            changed_paths,
+            [(agent.name, agent.INPUT_PROJECTION, agent.OUTPUT_KEY) for agent in self.pipeline]
+        )
+
+    def _stage_task(
+        self,
+        agent,
+        context: Dict[str, Any],
+        agent_configs: Dict[str, Any],
+        analysis_id: UUID
+    ) -> AgentTask:
+        """Task for one pipeline stage: projected inputs plus its DB config"""
+        config_key, _, task_type, capabilities, temperature = STAGE_SETTINGS[agent.name]
+        config = agent_configs.get(config_key, {"temperature": temperature})
+        return AgentTask(
+            task_type=task_type,
+            input_data=project(context, agent.INPUT_PROJECTION),
+            temperature=config["temperature"],
+            max_tokens=config.get("max_tokens"),
+            output_mode=config.get("output_mode", "verbose"),
+            required_capabilities=capabilities,
+            analysis_id=analysis_id
+        )
+
+    def _record_metrics(self, config_name: str, execution_id: str, result: AgentResponse) -> None:
+        """Queue one agent run for the background metrics writer"""
+        metrics_sink.record(
+            agent_name=config_name,
+            execution_id=execution_id,
+            execution_time_ms=result.execution_time_ms,
+            token_usage=result.token_usage,
+            success=result.success,
+            model=result.model_used,
+            error=result.error,
+            user_id=self.config_service.user_id
+        )
+
     async def execute_full_analysis(
         self,
         request: JHAAnalysisRequest,
@@ -57,95 +158,76 @@ class JHAOrchestrator:
         """
 
         pipeline_start = datetime.utcnow()
+        execution_id = str(uuid4())
 
-        # Create analysis record for tracking (disabled for testing)
-        # analysis_record = AnalysisHistory(
-        #     user_id=user_id,
-        #     query=f"JHA Analysis - {request.project_data.get('projectName', 'Master JHA') if request.project_data else 'Master JHA'}",
-        #     response="Generating multi-agent safety analysis...",
-        #     type="jha_multi_agent_analysis"
-        # )
-
-        # self.db.add(analysis_record)
-        # await self.db.commit()
-        # await self.db.refresh(analysis_record)
+        # Analysis id is assigned here so it can be returned before the
+        # write-behind persister has stored the record
+        analysis_id = uuid4()
 
         try:
-            # Load agent configurations from database
-            await self.config_service.ensure_default_configs_exist()
+            # Load agent configurations (cached; defaults are seeded at startup)
             agent_configs = await self.config_service.get_orchestrator_config()
 
-            # Prepare base task data
-            base_task_data = {
-                "checklist": request.dict(),
+            # Industry baseline from the company's NAICS code (cached, no per-request query)
+            naics_code = await company_naics_cache.get(self.db, company_id or request.company_id)
+            osha_data = osha_data_for_naics(naics_code)
+            print(f"🏭 Industry baseline: NAICS {osha_data['naicsCode']} {osha_data['industryName']} ({osha_data['injuryRate']}/100)")
+
+            # The agents below only call LLMs (results are written by the
+            # persister), so don't hold a pooled connection for the pipeline
+            if get_settings().db_release_during_llm:
+                await release_connection(self.db)
+
+            # Shared pipeline context. Each agent receives only the fields in its
+            # INPUT_PROJECTION and its output is stored under its OUTPUT_KEY.
+            context = {
+                "checklist": request.dict(exclude={"company_id", "project_id"}),
                 "weather": request.weather_conditions or {},
-                "osha_data": {
-                    "industryName": "Specialty Trade Contractors",
-                    "naicsCode": "238",
-                    "injuryRate": 35,
-                    "totalCases": 198400,
-                    "dataSource": "BLS_Table_1_2023"
-                },
+                "osha_data": osha_data,
                 "current_time": datetime.utcnow().isoformat()
             }
 
             # AGENT 1: Data Validation (Temperature from DB)
             agent1_config = agent_configs.get("agent1_validation", {"temperature": 0.3})
             print(f"📋 Agent 1: Validating data quality... (T={agent1_config['temperature']})")
-            agent1_task = AgentTask(
-                task_type="jha_validation",
-                input_data=base_task_data,
-                temperature=agent1_config["temperature"],
-                required_capabilities=[ModelCapability.FAST_REASONING, ModelCapability.STRUCTURED_OUTPUT]
-            )
+            agent1_task = self._stage_task(self.validator, context, agent_configs, analysis_id)
 
             validation_result = await self.validator.execute(agent1_task)
+            self._record_metrics("validator", execution_id, validation_result)
             if not validation_result.success:
                 raise ValueError(f"Agent 1 validation failed: {validation_result.error}")
 
             validation_data = validation_result.output_data
+            context[self.validator.OUTPUT_KEY] = validation_data
             print(f"✓ Data quality: {validation_data.get('validation', {}).get('dataQuality', 'UNKNOWN')}")
 
             # AGENT 2: Risk Assessment (Temperature from DB)
             agent2_config = agent_configs.get("agent2_risk", {"temperature": 0.7})
             print(f"⚠️ Agent 2: Assessing risks with OSHA data... (T={agent2_config['temperature']})")
-            agent2_task_data = base_task_data.copy()
-            agent2_task_data["validation"] = validation_data
-
-            agent2_task = AgentTask(
-                task_type="risk_assessment",
-                input_data=agent2_task_data,
-                temperature=agent2_config["temperature"],
-                required_capabilities=[ModelCapability.FAST_REASONING, ModelCapability.STRUCTURED_OUTPUT]
-            )
+            agent2_task = self._stage_task(self.risk_assessor, context, agent_configs, analysis_id)
 
             risk_result = await self.risk_assessor.execute(agent2_task)
+            self._record_metrics("risk_assessor", execution_id, risk_result)
             if not risk_result.success:
                 raise ValueError(f"Agent 2 risk assessment failed: {risk_result.error}")
 
             risk_data = risk_result.output_data
+            context[self.risk_assessor.OUTPUT_KEY] = risk_data
             hazard_count = len(risk_data.get("hazards", []))
             print(f"✓ Identified {hazard_count} hazards")
 
             # AGENT 3: Swiss Cheese Incident Prediction (Temperature from DB)
             agent3_config = agent_configs.get("agent3_prediction", {"temperature": 1.0})
             print(f"🔮 Agent 3: Predicting incident scenarios... (T={agent3_config['temperature']})")
-            agent3_task_data = base_task_data.copy()
-            agent3_task_data["validation"] = validation_data
-            agent3_task_data["risk_assessment"] = risk_data
-
-            agent3_task = AgentTask(
-                task_type="swiss_cheese_analysis",
-                input_data=agent3_task_data,
-                temperature=agent3_config["temperature"],
-                required_capabilities=[ModelCapability.DEEP_REASONING, ModelCapability.CREATIVE, ModelCapability.STRUCTURED_OUTPUT]
-            )
+            agent3_task = self._stage_task(self.swiss_cheese, context, agent_configs, analysis_id)
 
             prediction_result = await self.swiss_cheese.execute(agent3_task)
+            self._record_metrics("swiss_cheese", execution_id, prediction_result)
             if not prediction_result.success:
                 raise ValueError(f"Agent 3 incident prediction failed: {prediction_result.error}")
 
             prediction_data = prediction_result.output_data
+            context[self.swiss_cheese.OUTPUT_KEY] = prediction_data
             incident_name = prediction_data.get("incidentPrediction", {}).get("incidentName", "Unknown incident")
             confidence = prediction_data.get("incidentPrediction", {}).get("confidence", "Unknown")
             print(f"✓ Predicted: {incident_name} (confidence: {confidence})")
@@ -153,30 +235,94 @@ class JHAOrchestrator:
             # AGENT 4: Report Synthesis (Temperature from DB)
             agent4_config = agent_configs.get("agent4_synthesis", {"temperature": 0.5})
             print(f"📄 Agent 4: Synthesizing final report... (T={agent4_config['temperature']})")
-            agent4_task_data = {
-                "validation": validation_data,
-                "risk": risk_data,
-                "prediction": prediction_data,
-                "weather": base_task_data["weather"],
-                "checklist": base_task_data["checklist"]
-            }
-
-            agent4_task = AgentTask(
-                task_type="report_synthesis",
-                input_data=agent4_task_data,
-                temperature=agent4_config["temperature"],
-                required_capabilities=[ModelCapability.STRUCTURED_OUTPUT]
-            )
+            agent4_task = self._stage_task(self.synthesizer, context, agent_configs, analysis_id)
 
             synthesis_result = await self.synthesizer.execute(agent4_task)
+            self._record_metrics("synthesizer", execution_id, synthesis_result)
             if not synthesis_result.success:
                 raise ValueError(f"Agent 4 synthesis failed: {synthesis_result.error}")
 
             final_report = synthesis_result.output_data.get("finalReport", {})
             print("✓ Pipeline complete!")
 
-            # Return complete analysis result for testing
+            executive_summary = final_report.get("executiveSummary", {})
+            overall_risk_score = risk_data.get("riskSummary", {}).get("highestRiskScore", 0)
+            analysis_company_id = company_id or request.company_id
+            go_no_go_decision = executive_summary.get("decision", "UNKNOWN")
+
+            analysis_persister.submit(
+                analysis={
+                    "id": analysis_id,
+                    "user_id": user_id,
+                    "query": f"JHA Analysis - {final_report.get('metadata', {}).get('projectName') or 'Master JHA'}",
+                    "response": json.dumps(final_report),
+                    "type": "jha_multi_agent_analysis",
+                    "risk_score": overall_risk_score,
+                    "urgency_level": self._determine_urgency_level(final_report),
+                    "safety_categories": self._extract_safety_categories(risk_data),
+                    "company_id": analysis_company_id,
+                    "project_id": request.project_id,
+                    "go_no_go_decision": go_no_go_decision,
+                    "top_hazard_category": self._top_hazard_category(risk_data),
+                    "metadata_json": to_jsonable({
+                        "execution_id": execution_id,
+                        "company_id": analysis_company_id,
+                        "project_id": request.project_id,
+                        "osha_data": osha_data,
+                        "checklist": context["checklist"],
+                        "weather": context["weather"],
+                        "current_time": context["current_time"],
+                        # Hash of each agent's projected inputs; live updates
+                        # re-run only agents whose fingerprint changes
+                        "stage_fingerprints": {
+                            agent.name: fingerprint(task.input_data)
+                            for agent, task in (
+                                (self.validator, agent1_task),
+                                (self.risk_assessor, agent2_task),
+                                (self.swiss_cheese, agent3_task),
+                                (self.synthesizer, agent4_task)
+                            )
+                        }
+                    }),
+                    "created_at": pipeline_start
+                },
+                outputs=[
+                    {
+                        "id": uuid4(),
+                        "analysis_id": analysis_id,
+                        "agent_id": agent.name,
+                        "agent_name": config_key,
+                        "agent_type": task.task_type,
+                        "output_data": result.output_data,
+                        "execution_metadata": {
+                            "model": result.model_used,
+                            "provider": result.provider.value,
+                            "execution_time_ms": result.execution_time_ms,
+                            "token_usage": result.token_usage,
+                            "temperature": task.temperature
+                        },
+                        "success": result.success,
+                        "error_details": result.error,
+                        "created_at": datetime.utcnow()
+                    }
+                    for agent, config_key, task, result in (
+                        (self.validator, "agent1_validation", agent1_task, validation_result),
+                        (self.risk_assessor, "agent2_risk", agent2_task, risk_result),
+                        (self.swiss_cheese, "agent3_prediction", agent3_task, prediction_result),
+                        (self.synthesizer, "agent4_synthesis", agent4_task, synthesis_result)
+                    )
+                ],
+                hazards=extract_hazard_rows(
+                    analysis_id,
+                    risk_data,
+                    created_at=pipeline_start,
+                    company_id=analysis_company_id,
+                    project_id=request.project_id
+                )
+            )
+
             return {
+                "analysis_id": str(analysis_id),
                 "pipeline_metadata": {
                     "version": "python-multi-agent-v1.0",
                     "execution_time_ms": int((datetime.utcnow() - pipeline_start).total_seconds() * 1000),
@@ -194,9 +340,9 @@ class JHAOrchestrator:
                     "agent4_final_report": final_report
                 },
                 "summary": {
-                    "overall_risk_score": risk_data.get("riskSummary", {}).get("highestRiskScore", 0),
-                    "go_no_go_decision": final_report.get("decision", {}).get("goNoGo", "UNKNOWN"),
-                    "primary_concerns": final_report.get("riskProfile", {}).get("primaryHazards", []),
+                    "overall_risk_score": overall_risk_score,
+                    "go_no_go_decision": go_no_go_decision,
+                    "primary_concerns": final_report.get("hazardAnalysis", {}).get("topThreats", []),
                     "execution_time_seconds": (datetime.utcnow() - pipeline_start).total_seconds()
                 }
             }
@@ -231,33 +377,292 @@ class JHAOrchestrator:
     async def execute_live_update(
         self,
         analysis_id: UUID,
-        update_data: Dict[str, Any]
+        update_data: Dict[str, Any],
+        user_id: UUID
     ) -> Dict[str, Any]:
         """
         Execute live update workflow.
 
-        Re-runs Agent 2 (Risk) and Agent 3 (Swiss Cheese) with new conditions.
+        Applies field changes (weather, crew, scope, equipment) - given
+        as extracted_variables / changes, or extracted from voice_input -
+        to the analysis' latest pipeline state and re-runs only the agents whose
+        projected inputs changed, comparing each agent's input fingerprint
+        with the one stored for the previous run. The rest reuse their
+        stored outputs. When only numeric conditions change (wind,
+        temperature, precipitation, crew experience), Agent 2's hazards are
+        re-scored locally by the risk engine instead and no LLM is called;
+        only the local synthesis re-runs.
+
+        The result is stored as a JHAUpdate and becomes the base for the
+        next update of the same analysis.
         """
+        update_start = datetime.utcnow()
+        execution_id = str(uuid4())
+
+        if not update_data.get("extracted_variables") and not update_data.get("changes"):
+            extracted = await voice_extractor.extract(update_data.get("voice_input") or "")
+            update_data = {
+                **update_data,
+                "extracted_variables": extracted,
+                "update_type": update_data.get("update_type") or extracted.get("update_type")
+            }
 
-        # Load original analysis
-        result = await self.db.execute(
-            select(AnalysisHistory).where(AnalysisHistory.id == analysis_id)
-        )
-        original_analysis = result.scalar_one_or_none()
-
-        if not original_analysis:
+        changes = self._live_update_changes(update_data)
+        if not changes:
+            raise ValueError("No field changes found in the update")
+
+        # The analysis may still be queued for write-behind (just analyzed)
+        if not await analysis_persister.wait_written(analysis_id):
+            raise ValueError(f"Analysis {analysis_id} is not stored yet; retry the update shortly")
+        state = await self._load_live_state(analysis_id)
+        agent_configs = await self.config_service.get_orchestrator_config()
+        if get_settings().db_release_during_llm:
+            await release_connection(self.db)
+
+        context = copy.deepcopy({**state["inputs"], **state["outputs"]})
+        applied = {}
+        for path, value in changes.items():
+            if get_path(context, path) != value:
+                set_path(context, path, value)
+                applied[path] = value
+
+        # Analyses stored before fingerprints existed fall back to the
+        # declared projections
+        stored_fingerprints = state.get("fingerprints") or {}
+        planned = set(self.stages_affected_by(list(applied)))
+
+        # Only numeric conditions changed: re-score Agent 2's hazards locally
+        # and keep the LLM agents' outputs. Their stored fingerprints are
+        # kept too, so a later update still re-runs them on the new inputs.
+        local_stages = set()
+        if applied and get_settings().live_update_local_rescoring and set(applied) <= RESCORABLE_PATHS:
+            rescored = risk_engine.rescore(
+                state["outputs"].get(self.risk_assessor.OUTPUT_KEY, {}),
+                state["inputs"].get("weather") or {},
+                context.get("weather") or {},
+                experience=applied.get(CREW_EXPERIENCE_PATH)
+            )
+            if rescored is not None:
+                context[self.risk_assessor.OUTPUT_KEY] = rescored
+                local_stages = {self.validator.name, self.risk_assessor.name, self.swiss_cheese.name}
+
+        fingerprints, stages_rerun, stages_reused, stages_rescored = {}, [], [], []
+        for agent in self.pipeline:
+            if agent.name in local_stages:
+                fingerprints[agent.name] = stored_fingerprints.get(agent.name)
+                (stages_rescored if agent is self.risk_assessor else stages_reused).append(agent.name)
+                continue
+
+            task = self._stage_task(agent, context, agent_configs, analysis_id)
+            fingerprints[agent.name] = fingerprint(task.input_data)
+            if agent.name in stored_fingerprints:
+                unchanged = stored_fingerprints[agent.name] == fingerprints[agent.name]
+            else:
+                unchanged = agent.name not in planned
+            if unchanged and agent.OUTPUT_KEY in state["outputs"]:
+                stages_reused.append(agent.name)
+                continue
+
+            print(f"🔁 Live update: re-running {agent.name}")
+            result = await agent.execute(task)
+            self._record_metrics(STAGE_SETTINGS[agent.name][1], execution_id, result)
+            if not result.success:
+                raise ValueError(f"Live update failed in {agent.name}: {result.error}")
+            context[agent.OUTPUT_KEY] = result.output_data
+            stages_rerun.append(agent.name)
+
+        previous_risk = state["outputs"].get(self.risk_assessor.OUTPUT_KEY, {})
+        risk_data = context.get(self.risk_assessor.OUTPUT_KEY, {})
+        final_report = context.get(self.synthesizer.OUTPUT_KEY, {}).get("finalReport", {})
+        previous_risk_score = state.get("risk_score")
+        updated_risk_score = risk_data.get("riskSummary", {}).get("highestRiskScore", 0)
+        risk_delta = updated_risk_score - previous_risk_score if previous_risk_score is not None else None
+        new_hazards, removed_hazards = self._hazard_changes(previous_risk, risk_data, applied)
+        alert_severity, crew_alert, action_required = self._crew_alert(final_report, risk_data, risk_delta)
+        processing_time_ms = int((datetime.utcnow() - update_start).total_seconds() * 1000)
+        print(f"✓ Live update: re-ran {stages_rerun or 'nothing'}, re-scored {stages_rescored or 'nothing'}, reused {stages_reused} ({processing_time_ms}ms)")
+
+        update = {
+            "id": uuid4(),
+            "original_jha_id": analysis_id,
+            "user_id": user_id,
+            "voice_input": update_data.get("voice_input") or "",
+            "update_type": update_data.get("update_type") or self._live_update_type(applied),
+            "extracted_variables": to_jsonable({
+                name: value for name, value in (update_data.get("extracted_variables") or {}).items() if value is not None
+            } or applied),
+            "previous_risk_score": previous_risk_score,
+            "updated_risk_score": updated_risk_score,
+            "risk_delta": risk_delta,
+            "new_hazards": new_hazards,
+            "removed_hazards": removed_hazards,
+            "crew_alert": crew_alert,
+            "alert_severity": alert_severity,
+            "requires_action": alert_severity != "info",
+            "action_required": action_required,
+            "acknowledged": False,
+            # Full pipeline state after the update: the base for the next one
+            "gemini_response": to_jsonable({
+                "inputs": {key: context[key] for key in PIPELINE_INPUTS if key in context},
+                "outputs": {agent.OUTPUT_KEY: context[agent.OUTPUT_KEY] for agent in self.pipeline if agent.OUTPUT_KEY in context},
+                "fingerprints": fingerprints,
+                "risk_score": updated_risk_score,
+                "project_id": state.get("project_id"),
+                "changes": applied,
+                "stages_rerun": stages_rerun,
+                "stages_rescored": stages_rescored,
+                "stages_reused": stages_reused
+            }),
+            "processing_time_ms": processing_time_ms,
+            "created_at": update_start
+        }
+        [row] = await blob_store.offload(self.db, [update], "gemini_response", "gemini_response_blob")
+        self.db.add(JHAUpdate(**row))
+        await self.db.flush()
+
+        response = {key: value for key, value in update.items() if key != "gemini_response"}
+        response.update({
+            "project_id": state.get("project_id"),
+            "changes": applied,
+            "stages_rerun": stages_rerun,
+            "stages_rescored": stages_rescored,
+            "stages_reused": stages_reused,
+            "go_no_go_decision": final_report.get("executiveSummary", {}).get("decision")
+        })
+        return response
+
+    def _live_update_changes(self, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Context path -> new value from extracted variables and explicit changes"""
+        changes = {}
+        for name, value in (update_data.get("extracted_variables") or {}).items():
+            if value is not None and name in LIVE_UPDATE_PATHS:
+                changes[LIVE_UPDATE_PATHS[name][0]] = value
+        for path, value in (update_data.get("changes") or {}).items():
+            if path.split(".")[0] not in LIVE_UPDATE_ROOTS or "." not in path:
+                raise ValueError(f"Cannot update {path}: only weather.* and checklist.* fields can change")
+            changes[path] = value
+        return changes
+
+    def _live_update_type(self, applied: Dict[str, Any]) -> Optional[str]:
+        """Update type of the first applied change"""
+        if not applied:
+            return None
+        path = next(iter(applied))
+        by_path = {path: update_type for path, update_type in LIVE_UPDATE_PATHS.values()}
+        return by_path.get(path, "environmental" if path.startswith("weather.") else "scope")
+
+    async def _load_live_state(self, analysis_id: UUID) -> Dict[str, Any]:
+        """
+        Pipeline inputs, agent outputs and stage fingerprints as of the
+        latest update of an analysis (or the analysis itself)
+        """
+        latest = (await self.db.execute(
+            select(JHAUpdate.gemini_response, JHAUpdate.gemini_response_blob)
+            .where(JHAUpdate.original_jha_id == analysis_id)
+            .order_by(JHAUpdate.created_at.desc())
+            .limit(1)
+        )).one_or_none()
+        if latest is not None:
+            state = await blob_store.get_json(self.db, latest.gemini_response_blob) if latest.gemini_response_blob else latest.gemini_response
+            if state and state.get("inputs"):
+                return state
+
+        analysis = (await self.db.execute(
+            select(AnalysisHistory.risk_score, AnalysisHistory.project_id, AnalysisHistory.metadata_json, AnalysisHistory.created_at)
+            .where(AnalysisHistory.id == analysis_id)
+        )).one_or_none()
+        if analysis is None:
             raise ValueError(f"Analysis {analysis_id} not found")
-
-        # TODO: Implement live update logic
-        # This would re-run agents 2-3 with updated conditions
-        # For now, return placeholder
+        metadata = analysis.metadata_json or {}
+        if "checklist" not in metadata:
+            raise ValueError(f"Analysis {analysis_id} has no stored pipeline inputs")
+
+        output_keys = {agent.name: agent.OUTPUT_KEY for agent in self.pipeline}
+        outputs = {}
+        rows = await self.db.execute(
+            select(AgentOutput.agent_id, AgentOutput.output_data, AgentOutput.output_blob)
+            .where(AgentOutput.analysis_id == analysis_id, AgentOutput.success == True)
+        )
+        for agent_id, output_data, output_blob in rows:
+            if agent_id in output_keys:
+                outputs[output_keys[agent_id]] = await blob_store.get_json(self.db, output_blob) if output_blob else output_data
 
         return {
-            "status": "live_update_complete",
-            "analysis_id": str(analysis_id),
-            "updated_at": datetime.utcnow().isoformat()
+            "inputs": {
+                "checklist": metadata["checklist"],
+                "weather": metadata.get("weather") or {},
+                "osha_data": metadata.get("osha_data") or {},
+                "current_time": metadata.get("current_time") or analysis.created_at.isoformat()
+            },
+            "outputs": outputs,
+            "fingerprints": metadata.get("stage_fingerprints"),
+            "risk_score": analysis.risk_score,
+            "project_id": analysis.project_id
         }
 
+    def _hazard_changes(
+        self,
+        previous_risk: Dict[str, Any],
+        risk_data: Dict[str, Any],
+        applied: Dict[str, Any]
+    ) -> tuple[list, list]:
+        """
+        Hazard categories that appeared / disappeared. Hazard names are
+        free text and reworded between runs, so categories are compared.
+        """
+        def top_by_category(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            top = {}
+            for hazard in data.get("hazards", []):
+                if isinstance(hazard, dict) and hazard.get("category"):
+                    current = top.get(hazard["category"])
+                    if current is None or (hazard.get("riskScore") or 0) > (current.get("riskScore") or 0):
+                        top[hazard["category"]] = hazard
+            return top
+
+        def change(hazard: Dict[str, Any], reason: str) -> Dict[str, Any]:
+            controls = hazard.get("recommendedControls") or []
+            return {
+                "hazard": hazard.get("name") or hazard["category"],
+                "category": hazard["category"],
+                "reason": reason,
+                "severity": (hazard.get("riskLevel") or "").lower(),
+                "risk_score": hazard.get("riskScore"),
+                "mitigation": controls[0] if controls else None
+            }
+
+        reason = f"Updated {', '.join(applied)}" if applied else "Re-assessed"
+        before, after = top_by_category(previous_risk), top_by_category(risk_data)
+        new_hazards = [change(hazard, reason) for category, hazard in after.items() if category not in before]
+        removed_hazards = [change(hazard, reason) for category, hazard in before.items() if category not in after]
+        return new_hazards, removed_hazards
+
+    def _crew_alert(
+        self,
+        final_report: Dict[str, Any],
+        risk_data: Dict[str, Any],
+        risk_delta: Optional[int]
+    ) -> tuple[str, Optional[str], Optional[str]]:
+        """(severity, message, action) for the crew after an update"""
+        decision = final_report.get("executiveSummary", {}).get("decision", "GO")
+        severity = ALERT_SEVERITY.get(decision, "info")
+        if severity == "info" and risk_delta is not None and risk_delta >= RISK_DELTA_WARNING:
+            severity = "warning"
+        if severity == "info":
+            return severity, None, None
+
+        threats = risk_data.get("topThreats") or []
+        reason = threats[0] if threats else f"risk score {risk_data.get('riskSummary', {}).get('highestRiskScore', 0)}/100"
+        icon = "🛑" if severity == "critical" else "⚠️"
+        crew_alert = f"{icon} {decision.replace('_', ' ')}: {reason}"
+
+        urgent = [
+            item.get("action") for item in final_report.get("actionItems", [])
+            if isinstance(item, dict) and item.get("priority") in ("CRITICAL", "HIGH")
+        ]
+        immediate = risk_data.get("immediateActions") or []
+        action_required = urgent[0] if urgent else immediate[0] if immediate else None
+        return severity, crew_alert, action_required
+
     def _determine_urgency_level(self, final_report: Dict[str, Any]) -> str:
         """Determine urgency level from final report"""
         decision = final_report.get("executiveSummary", {}).get("decision", "GO")
@@ -281,4 +686,11 @@ class JHAOrchestrator:
             if category and category not in categories:
                 categories.append(category)
 
-        return categories or ["general_safety"]
\ No newline at end of file
+        return categories or ["general_safety"]
+
+    def _top_hazard_category(self, risk_data: Dict[str, Any]) -> Optional[str]:
+        """Category of the highest-scoring hazard"""
+        hazards = [h for h in risk_data.get("hazards", []) if isinstance(h, dict) and h.get("category")]
+        if not hazards:
+            return None
+        return max(hazards, key=lambda h: h.get("riskScore") or 0)["category"]
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Agent Output Schemas
+
+Helpers for declaring agent output as JSON Schema. Adapters pass the schema
+to the provider's native structured-output mechanism (OpenRouter
+json_schema, Anthropic forced tool use, Gemini response_schema), which lets
+the prompt drop its example JSON block.
+
+Schemas are written in the strict subset accepted by all three providers:
+every property is required, no additional properties, ranges described in
+text rather than with minimum/maximum.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# Keys Gemini's response_schema accepts (OpenAPI 3.0 subset)
+GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "items", "properties", "required"}
+
+
+def obj(properties: Dict[str, Any], description: Optional[str] = None) -> Dict[str, Any]:
+    """Strict object schema: all properties required, nothing else allowed"""
+    schema = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def arr(items: Dict[str, Any], description: Optional[str] = None) -> Dict[str, Any]:
+    schema = {"type": "array", "items": items}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def string(description: Optional[str] = None, enum: Optional[List[str]] = None) -> Dict[str, Any]:
+    schema: Dict[str, Any] = {"type": "string"}
+    if description:
+        schema["description"] = description
+    if enum:
+        schema["enum"] = enum
+    return schema
+
+
+def number(description: Optional[str] = None) -> Dict[str, Any]:
+    schema = {"type": "number"}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def integer(description: Optional[str] = None) -> Dict[str, Any]:
+    schema = {"type": "integer"}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def compact_schema(schema: Dict[str, Any], key_map: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Derive the compact-mode schema from a verbose schema.
+
+    key_map is an agent's COMPACT_KEYS (short -> verbose). Properties with
+    a short key are renamed; properties without one are dropped, matching
+    the fields the compact prompt omits.
+    """
+    short_keys = {verbose: short for short, verbose in key_map.items()}
+
+    def convert(node: Any) -> Any:
+        if not isinstance(node, dict):
+            return node
+        converted = dict(node)
+        if "properties" in node:
+            converted["properties"] = {
+                short_keys[key]: convert(value)
+                for key, value in node["properties"].items()
+                if key in short_keys
+            }
+            converted["required"] = list(converted["properties"])
+        if "items" in node:
+            converted["items"] = convert(node["items"])
+        return converted
+
+    return convert(schema)
+
+
+def gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip keys Gemini's response_schema does not accept"""
+    cleaned = {key: value for key, value in schema.items() if key in GEMINI_SCHEMA_KEYS}
+    if "properties" in cleaned:
+        cleaned["properties"] = {key: gemini_schema(value) for key, value in cleaned["properties"].items()}
+    if "items" in cleaned:
+        cleaned["items"] = gemini_schema(cleaned["items"])
+    return cleaned
+
+
+def native_schema_instructions() -> str:
+    """Output format section used when the adapter enforces the schema natively"""
+    return """OUTPUT FORMAT:
+Respond with a single JSON object matching the response schema supplied with this request.
+Keep string values specific to this job; do not copy field descriptions."""
@@ -1,5 +1,10 @@
 from app.agents.base import BaseAgent, AgentTask, AgentResponse, ModelCapability, ModelProvider
 from app.agents.registry import AgentRegistry
+from app.agents.token_budget import completion_budgets, estimate_tokens, fit_prompt_to_window, output_token_budget
+from app.agents.compact import OUTPUT_MODE_COMPACT, OUTPUT_MODE_VERBOSE, compact_instructions, expand_keys
+from app.knowledge import get_trade_registry, retrieve_osha_references
+from app.agents.output_schema import obj, arr, string, integer, compact_schema, native_schema_instructions
+from app.core.transcript_log import transcript_log
 import json
 from typing import Dict, Any
 
@@ -10,6 +15,74 @@ class JHAValidatorAgent(BaseAgent):
     Best models: Gemini 2.5 Flash, Claude Sonnet
     """
 
+    # Compact output mode: short key -> verbose key.
+    # weatherIntegration.currentConditions and tradeSpecificFindings.workType
+    # are dropped from generation and restored from the inputs.
+    COMPACT_KEYS = {
+        "v": "validation",
+        "qs": "qualityScore",
+        "dq": "dataQuality",
+        "cp": "completeness",
+        "rs": "reviewStatus",
+        "mc": "missingCritical",
+        "c": "concerns",
+        "ls": "lifeSafety",
+        "env": "environmental",
+        "reg": "regulatory",
+        "res": "resources",
+        "w": "weatherIntegration",
+        "wr": "weatherRisks",
+        "wc": "weatherControls",
+        "rec": "recommendations",
+        "t": "tradeSpecificFindings",
+        "g": "specificGaps",
+        "ar": "additionalRequirements"
+    }
+
+    COMPACT_SKELETON = """{"v":{"qs":<1-10>,"dq":"EXCELLENT|GOOD|MEDIUM|POOR|UNACCEPTABLE","cp":"<pct>%","rs":"APPROVED|CONDITIONAL|REJECTED"},
+"mc":["missing critical field"],
+"c":{"ls":["life safety concern"],"env":["environmental concern"],"reg":["OSHA 1926.xxx gap"],"res":["resource concern"]},
+"w":{"wr":["weather risk"],"wc":["weather control"]},
+"rec":["recommendation"],
+"t":{"g":["trade-specific gap"],"ar":["trade-specific requirement"]}}"""
+
+    INPUT_PROJECTION = (
+        "checklist",
+        "weather",
+        "osha_data.naicsCode",
+        "osha_data.industryName",
+        "osha_data.injuryRate"
+    )
+    OUTPUT_KEY = "validation"
+
+    # Output schema, enforced natively by adapters that support it
+    OUTPUT_SCHEMA = obj({
+        "validation": obj({
+            "qualityScore": integer("Overall data quality, 1-10"),
+            "dataQuality": string(enum=["EXCELLENT", "GOOD", "MEDIUM", "POOR", "UNACCEPTABLE"]),
+            "completeness": string("Percentage complete, e.g. '70% complete'"),
+            "reviewStatus": string(enum=["APPROVED", "CONDITIONAL", "REJECTED"])
+        }),
+        "missingCritical": arr(string("Specific missing critical field")),
+        "concerns": obj({
+            "lifeSafety": arr(string()),
+            "environmental": arr(string()),
+            "regulatory": arr(string("OSHA 1926.xxx compliance gap")),
+            "resources": arr(string())
+        }),
+        "weatherIntegration": obj({
+            "currentConditions": string("Summary of weather impact on work"),
+            "weatherRisks": arr(string()),
+            "weatherControls": arr(string())
+        }),
+        "recommendations": arr(string()),
+        "tradeSpecificFindings": obj({
+            "workType": string(),
+            "specificGaps": arr(string()),
+            "additionalRequirements": arr(string())
+        })
+    })
+
     def __init__(self, registry: AgentRegistry):
         super().__init__(
             name="jha_validator",
@@ -25,53 +98,10 @@ class JHAValidatorAgent(BaseAgent):
         ]
 
     def get_trade_specific_fields(self, work_type: str) -> str:
-        """Get trade-specific critical fields based on work type"""
-        work_type_lower = work_type.lower()
-
-        if 'electric' in work_type_lower:
-            return """Electrical Trade Critical Fields:
-   - LOTO (Lock-Out Tag-Out) procedures with specific energy sources
-   - Arc flash PPE category (0-4) with calorie rating
-   - Voltage testing procedure (must use rated test equipment)
-   - Qualified person designation for electrical work
-   - Approach boundaries clearly defined"""
-
-        elif 'roof' in work_type_lower:
-            return """Roofing Trade Critical Fields:
-   - Fall protection plan specific to roof type and slope
-   - Weather monitoring procedures (wind, temperature, precipitation)
-   - Material storage and loading plan for roof surface
-   - Emergency descent plan from roof level"""
-
-        elif 'scaffold' in work_type_lower:
-            return """Scaffolding Trade Critical Fields:
-   - Scaffold erection plan with certified competent person
-   - Load calculations for intended use
-   - Daily inspection procedures and documentation
-   - Tie-in requirements to building structure"""
-
-        elif 'crane' in work_type_lower:
-            return """Crane Operations Critical Fields:
-   - Crane operator certification and medical clearance
-   - Lift plan with load charts and rigging details
-   - Ground conditions assessment and outrigger setup
-   - Communication protocols between operator and signal person"""
-
-        elif 'glass' in work_type_lower or 'glazing' in work_type_lower:
-            return """Glass Installation Critical Fields:
-   - Wind speed monitoring with specific work suspension limits
-   - Glass handling equipment certification (vacuum lifters, suction cups)
-   - Fall protection systems adequate for glass installation work
-   - Emergency response plan for glass breakage and fall incidents"""
-
-        else:
-            return """General Construction Critical Fields:
-   - Competent person designated for identified hazards
-   - Site-specific hazard assessment completed
-   - Emergency action plan appropriate for work scope
-   - Worker training verification for task-specific hazards"""
-
-    def get_prompt_template(self) -> str:
+        """Get trade-specific critical fields for every trade the work type mentions"""
+        return get_trade_registry().format_critical_fields(work_type)
+
+    def get_prompt_template(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
         """Exact Agent 1 prompt from multiAgentSafety.ts"""
         return """You are a construction safety data validator with expertise in OSHA 1926 standards.
 Analyze the provided checklist and weather data for completeness, quality, and safety adequacy.
@@ -82,6 +112,9 @@ Weather: {weather_data}
 Industry: NAICS {naics_code} ({industry_name})
 Baseline Injury Rate: {injury_rate} per 100 workers
 
+RELEVANT OSHA REFERENCES (retrieved for this job):
+{osha_references}
+
 VALIDATION REQUIREMENTS:
 
 1. CRITICAL FIELD VERIFICATION:
@@ -137,13 +170,25 @@ VALIDATION REQUIREMENTS:
    - Weather considerations: [Specific gaps]
 
 8. SAFETY CONCERNS:
-   Immediate attention required for:
-   - Life safety issues (fall protection, electrical, confined space)
-   - Environmental hazards (weather, visibility, ground conditions)
-   - Regulatory compliance gaps (OSHA standards violations)
-   - Resource adequacy (staffing, equipment, time constraints)
+   Immediate attention required for life safety, environmental hazards,
+   regulatory gaps (cite the OSHA references above) and resource adequacy.
+
+""" + self.get_output_format(output_mode, native_schema)
 
-OUTPUT FORMAT (ONLY VALID JSON):
+    def get_output_schema(self, output_mode: str = OUTPUT_MODE_VERBOSE) -> Dict[str, Any]:
+        """JSON schema for the requested output mode"""
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_schema(self.OUTPUT_SCHEMA, self.COMPACT_KEYS)
+        return self.OUTPUT_SCHEMA
+
+    def get_output_format(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
+        """Output format section: schema note, verbose example or compact skeleton"""
+        if native_schema:
+            return native_schema_instructions()
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_instructions(self.COMPACT_SKELETON)
+
+        return """OUTPUT FORMAT (ONLY VALID JSON):
 
 {{
   "validation": {{
@@ -205,6 +250,13 @@ OUTPUT FORMAT (ONLY VALID JSON):
 
 CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failure."""
 
+    def expand_compact_output(self, output_data: Dict[str, Any], work_type: str, weather_summary: str) -> Dict[str, Any]:
+        """Map compact output back to the verbose shape, restoring dropped fields"""
+        expanded = expand_keys(output_data, self.COMPACT_KEYS)
+        expanded.setdefault("weatherIntegration", {}).setdefault("currentConditions", weather_summary)
+        expanded.setdefault("tradeSpecificFindings", {}).setdefault("workType", work_type)
+        return expanded
+
     async def execute(self, task: AgentTask) -> AgentResponse:
         """Execute JHA validation"""
 
@@ -225,38 +277,80 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
         # Create weather summary
         weather_summary = f"Temp: {weather_data.get('temperature', 'N/A')}°F, Wind: {weather_data.get('windSpeed', 'N/A')}mph, Conditions: {weather_data.get('conditions', 'N/A')}"
 
-        # Build prompt from template
-        prompt = self.get_prompt_template().format(
-            checklist_data=json.dumps(checklist_data, indent=2),
+        # Build prompt from template (checklist is rendered last so it can be trimmed)
+        output_mode = task.output_mode
+        template = self.get_prompt_template(output_mode)
+        prompt_fields = dict(
             weather_data=json.dumps(weather_data, indent=2),
             naics_code=osha_data.get("naicsCode", "238"),
             industry_name=osha_data.get("industryName", "Construction"),
             injury_rate=osha_data.get("injuryRate", 35),
             trade_specific_fields=self.get_trade_specific_fields(work_type),
             weather_summary=weather_summary,
-            work_type=work_type
+            work_type=work_type,
+            osha_references=retrieve_osha_references(checklist_data, work_type)
         )
 
+        def render(checklist_json: str) -> str:
+            return template.format(checklist_data=checklist_json, **prompt_fields)
+
+        # Ceiling: configured AgentConfiguration.max_tokens, else Agent 1 max tokens from multiAgentSafety.ts
+        max_tokens = task.max_tokens or 12000
+        full_prompt = render(json.dumps(checklist_data, indent=2))
+
         # Route to best model
         adapter = self.registry.route_task(AgentTask(
             task_type="jha_validation",
             input_data=task.input_data,
             temperature=0.3,  # Agent 1 temperature from multiAgentSafety.ts
+            max_tokens=max_tokens,
+            estimated_prompt_tokens=estimate_tokens(full_prompt),
             required_capabilities=self.get_capabilities()
         ))
 
+        # Native structured output replaces the example JSON in the prompt
+        # (render() picks up the reassigned template)
+        native_schema = adapter.supports_native_schema()
+        if native_schema:
+            template = self.get_prompt_template(output_mode, native_schema=True)
+
+        # Size max_tokens from completions observed for this agent and model
+        model_name = adapter.get_model_name()
+        max_tokens = completion_budgets.budget(self.name, model_name, max_tokens)
+
+        # Fit the prompt to the chosen model's context window
+        context_window = adapter.get_context_window()
+        prompt, fit_report = fit_prompt_to_window(render, checklist_data, context_window, max_tokens)
+        if fit_report["steps"]:
+            print(f"✂️ Agent 1 prompt trimmed {fit_report['original_tokens']} → {fit_report['prompt_tokens']} tokens: {fit_report['steps']}")
+
         # Execute
         try:
+            # Raises if the trimmed prompt leaves too little room for output
+            max_tokens = output_token_budget(context_window, fit_report["prompt_tokens"], max_tokens)
             result = await adapter.generate(
                 prompt=prompt,
                 temperature=0.3,
-                max_tokens=12000,  # Agent 1 max tokens from multiAgentSafety.ts
-                response_format="json"
+                max_tokens=max_tokens,
+                response_format="json",
+                response_schema=self.get_output_schema(output_mode) if native_schema else None
             )
+            completion_budgets.record(self.name, model_name, result["token_usage"].get("completion_tokens", 0), max_tokens)
 
-            # Debug: Log the raw response
+            # Full prompt and raw response go to the transcript log
             raw_response = result["text"]
-            print(f"🔍 Agent 1 Raw Response (first 500 chars): {raw_response[:500]}...")
+            transcript_log.record(
+                task.analysis_id,
+                agent=self.name,
+                model=result["model"],
+                prompt=prompt,
+                response=raw_response,
+                temperature=0.3,
+                max_tokens=max_tokens,
+                output_mode=output_mode,
+                token_usage=result["token_usage"]
+            )
+            print(f"🔍 Agent 1 raw response: {len(raw_response)} chars")
 
             # Try to extract JSON from the response (handle markdown formatting)
             json_text = raw_response
@@ -273,6 +367,8 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
 
             # Parse and return
             output_data = json.loads(json_text)
+            if output_mode == OUTPUT_MODE_COMPACT:
+                output_data = self.expand_compact_output(output_data, work_type, weather_summary)
             return AgentResponse(
                 success=True,
                 output_data=output_data,
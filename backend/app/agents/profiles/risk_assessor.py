@@ -1,6 +1,13 @@
 from app.agents.base import BaseAgent, AgentTask, AgentResponse, ModelCapability, ModelProvider
 from app.agents.registry import AgentRegistry
+from app.agents.token_budget import completion_budgets, estimate_tokens, fit_prompt_to_window, output_token_budget
+from app.agents.risk_engine import risk_engine
+from app.agents.compact import OUTPUT_MODE_COMPACT, OUTPUT_MODE_VERBOSE, compact_instructions, expand_keys
+from app.knowledge import retrieve_osha_references
+from app.agents.output_schema import obj, arr, string, number, integer, compact_schema, native_schema_instructions
+from app.core.transcript_log import transcript_log
 import json
+from typing import Dict, Any
 
 class RiskAssessorAgent(BaseAgent):
     """
@@ -9,6 +16,86 @@ class RiskAssessorAgent(BaseAgent):
     Best models: Gemini 2.5 Flash, Claude Sonnet
     """
 
+    # Compact output mode: short key -> verbose key.
+    # riskSummary.industryContext and hazards[].oshaContext are not
+    # generated and come back empty; topThreats is derived from the
+    # hazard list after expansion.
+    COMPACT_KEYS = {
+        "rs": "riskSummary",
+        "ol": "overallRiskLevel",
+        "max": "highestRiskScore",
+        "hz": "hazards",
+        "n": "name",
+        "cat": "category",
+        "p": "probability",
+        "pc": "probabilityCalculation",
+        "b": "base",
+        "hm": "hazardMultiplier",
+        "cm": "controlMultiplier",
+        "wm": "weatherMultiplier",
+        "em": "experienceMultiplier",
+        "f": "final",
+        "cons": "consequence",
+        "sc": "riskScore",
+        "lvl": "riskLevel",
+        "ic": "inadequateControls",
+        "rc": "recommendedControls",
+        "reg": "regulatoryRequirement",
+        "wi": "weatherImpact",
+        "ia": "immediateActions"
+    }
+
+    COMPACT_SKELETON = """{"rs":{"ol":"EXTREME|HIGH|MEDIUM|LOW","max":<number>},
+"hz":[{"n":"hazard with context","cat":"Falls|Struck-By|Electrocution|Caught-Between|Other","p":<0.0-1.0>,
+"pc":{"b":<n>,"hm":<n>,"cm":<n>,"wm":<n>,"em":<n>,"f":<n>},
+"cons":"Fatal|Critical|Serious|Minor","sc":<1-100>,"lvl":"EXTREME|HIGH|MEDIUM|LOW",
+"ic":["control gap"],"rc":["L1-Elimination: recommendation"],"reg":"OSHA 1926.xxx"}],
+"wi":"weather effect on risk",
+"ia":["action if EXTREME/HIGH"]}"""
+
+    INPUT_PROJECTION = (
+        "checklist",
+        "weather",
+        "osha_data",
+        "validation.validation.dataQuality",
+        "validation.validation.qualityScore",
+        "validation.missingCritical",
+        "validation.concerns"
+    )
+    OUTPUT_KEY = "risk_assessment"
+
+    # Output schema, enforced natively by adapters that support it
+    OUTPUT_SCHEMA = obj({
+        "riskSummary": obj({
+            "overallRiskLevel": string(enum=["EXTREME", "HIGH", "MEDIUM", "LOW"]),
+            "highestRiskScore": integer("Highest hazard riskScore, 1-100"),
+            "industryContext": string("Brief comparison to the industry baseline")
+        }),
+        "hazards": arr(obj({
+            "name": string("Specific hazard with context (work type, height, conditions)"),
+            "category": string(enum=["Falls", "Struck-By", "Electrocution", "Caught-Between", "Other"]),
+            "probability": number("0.0-1.0"),
+            "probabilityCalculation": obj({
+                "base": number(),
+                "hazardMultiplier": number(),
+                "controlMultiplier": number(),
+                "weatherMultiplier": number(),
+                "experienceMultiplier": number(),
+                "final": number()
+            }),
+            "consequence": string(enum=["Fatal", "Critical", "Serious", "Minor"]),
+            "riskScore": integer("1-100"),
+            "riskLevel": string(enum=["EXTREME", "HIGH", "MEDIUM", "LOW"]),
+            "oshaContext": string("Specific OSHA statistic or regulation reference"),
+            "inadequateControls": arr(string()),
+            "recommendedControls": arr(string("Prefixed with hierarchy level, e.g. 'L3-Engineering: ...'")),
+            "regulatoryRequirement": string("OSHA 1926.xxx citation if applicable")
+        })),
+        "topThreats": arr(string("Threat (Risk Score: XX)")),
+        "weatherImpact": string("How current weather affects risk levels"),
+        "immediateActions": arr(string("Action required for EXTREME/HIGH risk"))
+    })
+
     def __init__(self, registry: AgentRegistry):
         super().__init__(
             name="risk_assessor",
@@ -23,7 +110,7 @@ class RiskAssessorAgent(BaseAgent):
             ModelCapability.STRUCTURED_OUTPUT
         ]
 
-    def get_prompt_template(self) -> str:
+    def get_prompt_template(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
         """Exact Agent 2 prompt from multiAgentSafety.ts"""
         return """You are a construction risk assessor certified in OSHA 1926 standards with expertise in quantitative risk analysis.
 
@@ -130,14 +217,29 @@ RISK ASSESSMENT METHODOLOGY:
 
    Recommend improvements following hierarchy.
 
-4. OSHA STATISTICAL CONTEXT:
+4. OSHA CONTEXT:
+
+   OSHA clauses and statistics retrieved for this job (cite them in oshaContext and regulatoryRequirement):
+{osha_references}
 
-   For each hazard, cite relevant statistic:
-   - Falls: "36.5% of construction fatalities (OSHA 2023)"
    - If industry injury rate high: "This trade has {injury_rate}/100 injury rate, {industry_comparison}% above construction average"
-   - Weather-related: "Wet conditions increase slip/fall incidents by 60%"
 
-OUTPUT FORMAT (ONLY VALID JSON):
+""" + self.get_output_format(output_mode, native_schema)
+
+    def get_output_schema(self, output_mode: str = OUTPUT_MODE_VERBOSE) -> Dict[str, Any]:
+        """JSON schema for the requested output mode"""
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_schema(self.OUTPUT_SCHEMA, self.COMPACT_KEYS)
+        return self.OUTPUT_SCHEMA
+
+    def get_output_format(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
+        """Output format section: schema note, verbose example or compact skeleton"""
+        if native_schema:
+            return native_schema_instructions()
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_instructions(self.COMPACT_SKELETON)
+
+        return """OUTPUT FORMAT (ONLY VALID JSON):
 
 {{
   "riskSummary": {{
@@ -187,29 +289,38 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
 
     def _format_weather_multipliers(self, weather_data: dict) -> str:
         """Format weather multipliers for prompt"""
-        multipliers = []
-
-        if weather_data.get("temperature"):
-            temp = weather_data["temperature"]
-            if temp < 32 or temp > 95:
-                multipliers.append("- Extreme temp: ×1.4")
-
-        if weather_data.get("windSpeed") and weather_data["windSpeed"] > 25:
-            multipliers.append("- High winds: ×1.8")
-
-        if weather_data.get("precipitation"):
-            multipliers.append("- Precipitation: ×1.6")
+        multipliers = [f"- {label}: ×{factor}" for label, factor in risk_engine.weather_factors(weather_data)]
 
         if not multipliers:
             multipliers.append("- Normal: ×1.0")
 
         return "\n   ".join(multipliers)
 
+    def expand_compact_output(self, output_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map compact output back to the verbose shape, deriving topThreats"""
+        expanded = expand_keys(output_data, self.COMPACT_KEYS)
+        expanded.setdefault("riskSummary", {}).setdefault("industryContext", "")
+        for hazard in expanded.get("hazards", []):
+            if isinstance(hazard, dict):
+                hazard.setdefault("oshaContext", "")
+        if "topThreats" not in expanded:
+            hazards = sorted(
+                (h for h in expanded.get("hazards", []) if isinstance(h, dict)),
+                key=lambda h: h.get("riskScore") or 0,
+                reverse=True
+            )
+            expanded["topThreats"] = [
+                f"{h.get('name', 'Unknown hazard')} (Risk Score: {h.get('riskScore', 'N/A')})"
+                for h in hazards[:3]
+            ]
+        return expanded
+
     async def execute(self, task: AgentTask) -> AgentResponse:
         """Execute risk assessment"""
 
         # Extract data from task
         validation_data = task.input_data.get("validation", {})
+        validation_scores = validation_data.get("validation", {})
         checklist_data = task.input_data.get("checklist", {})
         weather_data = task.input_data.get("weather", {})
         osha_data = task.input_data.get("osha_data", {
@@ -224,13 +335,14 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
         injury_rate = osha_data.get("injuryRate", 35)
         base_probability = injury_rate / 100
 
-        # Build prompt from template
-        prompt = self.get_prompt_template().format(
-            data_quality=validation_data.get("dataQuality", "MEDIUM"),
-            quality_score=validation_data.get("qualityScore", 5),
+        # Build prompt from template (checklist is rendered last so it can be trimmed)
+        output_mode = task.output_mode
+        template = self.get_prompt_template(output_mode)
+        prompt_fields = dict(
+            data_quality=validation_scores.get("dataQuality", "MEDIUM"),
+            quality_score=validation_scores.get("qualityScore", 5),
             missing_critical=json.dumps(validation_data.get("missingCritical", [])),
             concerns=json.dumps(validation_data.get("concerns", {})),
-            checklist_data=json.dumps(checklist_data, indent=2),
             industry_name=osha_data.get("industryName", "Construction"),
             naics_code=osha_data.get("naicsCode", "238"),
             injury_rate=injury_rate,
@@ -239,29 +351,70 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
             weather_data=json.dumps(weather_data, indent=2),
             base_probability=base_probability,
             weather_multipliers=self._format_weather_multipliers(weather_data),
-            industry_comparison=round((injury_rate/35)*100) if injury_rate != 35 else 100
+            industry_comparison=round((injury_rate/35)*100) if injury_rate != 35 else 100,
+            osha_references=retrieve_osha_references(checklist_data, checklist_data.get("workType", ""))
         )
 
+        def render(checklist_json: str) -> str:
+            return template.format(checklist_data=checklist_json, **prompt_fields)
+
+        # Ceiling: configured AgentConfiguration.max_tokens, else Agent 2 max tokens from multiAgentSafety.ts
+        max_tokens = task.max_tokens or 16000
+        full_prompt = render(json.dumps(checklist_data, indent=2))
+
         # Route to best model
         adapter = self.registry.route_task(AgentTask(
             task_type="risk_assessment",
             input_data=task.input_data,
             temperature=0.7,  # Agent 2 temperature from multiAgentSafety.ts
+            max_tokens=max_tokens,
+            estimated_prompt_tokens=estimate_tokens(full_prompt),
             required_capabilities=self.get_capabilities()
         ))
 
+        # Native structured output replaces the example JSON in the prompt
+        # (render() picks up the reassigned template)
+        native_schema = adapter.supports_native_schema()
+        if native_schema:
+            template = self.get_prompt_template(output_mode, native_schema=True)
+
+        # Size max_tokens from completions observed for this agent and model
+        model_name = adapter.get_model_name()
+        max_tokens = completion_budgets.budget(self.name, model_name, max_tokens)
+
+        # Fit the prompt to the chosen model's context window
+        context_window = adapter.get_context_window()
+        prompt, fit_report = fit_prompt_to_window(render, checklist_data, context_window, max_tokens)
+        if fit_report["steps"]:
+            print(f"✂️ Agent 2 prompt trimmed {fit_report['original_tokens']} → {fit_report['prompt_tokens']} tokens: {fit_report['steps']}")
+
         # Execute
         try:
+            # Raises if the trimmed prompt leaves too little room for output
+            max_tokens = output_token_budget(context_window, fit_report["prompt_tokens"], max_tokens)
             result = await adapter.generate(
                 prompt=prompt,
                 temperature=0.7,
-                max_tokens=16000,  # Agent 2 max tokens from multiAgentSafety.ts
-                response_format="json"
+                max_tokens=max_tokens,
+                response_format="json",
+                response_schema=self.get_output_schema(output_mode) if native_schema else None
             )
+            completion_budgets.record(self.name, model_name, result["token_usage"].get("completion_tokens", 0), max_tokens)
 
-            # Debug: Log the raw response
+            # Full prompt and raw response go to the transcript log
             raw_response = result["text"]
-            print(f"🔍 Agent 2 Raw Response (first 500 chars): {raw_response[:500]}...")
+            transcript_log.record(
+                task.analysis_id,
+                agent=self.name,
+                model=result["model"],
+                prompt=prompt,
+                response=raw_response,
+                temperature=0.7,
+                max_tokens=max_tokens,
+                output_mode=output_mode,
+                token_usage=result["token_usage"]
+            )
+            print(f"🔍 Agent 2 raw response: {len(raw_response)} chars")
 
             # Try to extract JSON from the response (handle markdown formatting)
             json_text = raw_response
@@ -278,6 +431,8 @@ CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failu
 
             # Parse and return
             output_data = json.loads(json_text)
+            if output_mode == OUTPUT_MODE_COMPACT:
+                output_data = self.expand_compact_output(output_data)
             return AgentResponse(
                 success=True,
                 output_data=output_data,
@@ -1,8 +1,14 @@
 from app.agents.base import BaseAgent, AgentTask, AgentResponse, ModelCapability, ModelProvider
 from app.agents.registry import AgentRegistry
+from app.agents.token_budget import completion_budgets, estimate_tokens, fit_prompt_to_window, output_token_budget
+from app.agents.compact import OUTPUT_MODE_COMPACT, OUTPUT_MODE_VERBOSE, compact_instructions, expand_keys
+from app.agents.output_schema import obj, arr, string, number, compact_schema, native_schema_instructions
+from app.core.transcript_log import transcript_log
 import json
 from typing import Dict, Any
 
+SWISS_CHEESE_HOLES = ("organizationalHole", "supervisionHole", "preconditionHole", "actHole", "defenseHole")
+
 class SwissCheeseAnalyzerAgent(BaseAgent):
     """
     Agent 3: Swiss Cheese Incident Predictor
@@ -10,6 +16,137 @@ class SwissCheeseAnalyzerAgent(BaseAgent):
     Best models: Claude Opus, Gemini 2.5 Flash
     """
 
+    # Compact output mode: short key -> verbose key.
+    # Narrative-only fields (contribution, enablement, observability and
+    # swissCheeseAlignment) are not generated in compact mode and come
+    # back empty (see expand_compact_output).
+    COMPACT_KEYS = {
+        "ip": "incidentPrediction",
+        "n": "incidentName",
+        "p4": "probabilityNext4Hours",
+        "sev": "severity",
+        "conf": "confidence",
+        "peak": "peakRiskTime",
+        "cc": "causalChain",
+        "oi": "organizationalInfluences",
+        "f": "factor",
+        "ev": "evidence",
+        "us": "unsafeSupervision",
+        "gap": "gap",
+        "pre": "preconditions",
+        "ws": "workerState",
+        "es": "equipmentState",
+        "ens": "environmentalState",
+        "ua": "unsafeAct",
+        "ty": "type",
+        "d": "description",
+        "tr": "trigger",
+        "df": "defenseFailures",
+        "bar": "barrier",
+        "fm": "failureMode",
+        "im": "injuryMechanism",
+        "et": "energyType",
+        "em": "energyMagnitude",
+        "bp": "bodyPart",
+        "is": "injurySeverity",
+        "tti": "timeToInjury",
+        "li": "leadingIndicators",
+        "cat": "category",
+        "ind": "indicator",
+        "urg": "urgency",
+        "iv": "interventions",
+        "tf": "timeframe",
+        "act": "action",
+        "eff": "effectiveness",
+        "resp": "responsibility",
+        "rf": "riskFactors"
+    }
+
+    COMPACT_SKELETON = """{"ip":{"n":"incident with context","p4":<0.0-1.0>,"sev":"Fatal|Critical|Serious|Minor","conf":"High|Medium|Low","peak":"time window"},
+"cc":{"oi":[{"f":"factor","ev":"checklist quote"}],"us":[{"gap":"supervision gap","ev":"checklist quote"}],
+"pre":{"ws":["worker state"],"es":["equipment state"],"ens":["environmental state"]},
+"ua":{"ty":"Skill-based slip|Mistake|Violation","d":"unsafe act","tr":"trigger"},
+"df":[{"bar":"barrier","fm":"failure mode","ev":"checklist quote"}]},
+"im":{"et":"energy type","em":"magnitude","bp":"body part","is":"Fatal|Critical|Serious|Minor","tti":"Immediate|Delayed"},
+"li":[{"cat":"Behavioral|Equipment|Environmental|Organizational","ind":"indicator","urg":"urgency"}],
+"iv":[{"tf":"timeframe","act":"action","eff":"High|Medium|Low","resp":"role"}],
+"rf":["risk factor"]}"""
+
+    INPUT_PROJECTION = (
+        "checklist",
+        "current_time",
+        "weather.forecast",
+        "osha_data.industryName",
+        "osha_data.naicsCode",
+        "risk_assessment.hazards.0"
+    )
+    OUTPUT_KEY = "prediction"
+
+    # Output schema, enforced natively by adapters that support it
+    OUTPUT_SCHEMA = obj({
+        "incidentPrediction": obj({
+            "incidentName": string("Specific incident description with context"),
+            "probabilityNext4Hours": number("0.0-1.0"),
+            "severity": string(enum=["Fatal", "Critical", "Serious", "Minor"]),
+            "confidence": string(enum=["High", "Medium", "Low"]),
+            "peakRiskTime": string("Time window when risk is highest")
+        }),
+        "causalChain": obj({
+            "organizationalInfluences": arr(obj({
+                "factor": string(),
+                "evidence": string("Quote from checklist"),
+                "contribution": string("How this enables the incident")
+            })),
+            "unsafeSupervision": arr(obj({
+                "gap": string(),
+                "evidence": string("Quote from checklist"),
+                "enablement": string("How this allows unsafe acts")
+            })),
+            "preconditions": obj({
+                "workerState": arr(string()),
+                "equipmentState": arr(string()),
+                "environmentalState": arr(string())
+            }),
+            "unsafeAct": obj({
+                "type": string("e.g. Skill-based slip, Mistake, Violation"),
+                "description": string(),
+                "trigger": string()
+            }),
+            "defenseFailures": arr(obj({
+                "barrier": string(),
+                "failureMode": string(),
+                "evidence": string("Quote from checklist")
+            }))
+        }),
+        "injuryMechanism": obj({
+            "energyType": string(),
+            "energyMagnitude": string(),
+            "bodyPart": string(),
+            "injurySeverity": string(enum=["Fatal", "Critical", "Serious", "Minor"]),
+            "timeToInjury": string()
+        }),
+        "leadingIndicators": arr(obj({
+            "category": string(),
+            "indicator": string(),
+            "observability": string(),
+            "urgency": string()
+        })),
+        "interventions": arr(obj({
+            "timeframe": string(),
+            "action": string(),
+            "effectiveness": string(enum=["High", "Medium", "Low"]),
+            "responsibility": string()
+        })),
+        "swissCheeseAlignment": obj({
+            "organizationalHole": string(),
+            "supervisionHole": string(),
+            "preconditionHole": string(),
+            "actHole": string(),
+            "defenseHole": string()
+        }),
+        "riskFactors": arr(string())
+    })
+
     def __init__(self, registry: AgentRegistry):
         super().__init__(
             name="swiss_cheese_analyzer",
@@ -25,7 +162,7 @@ class SwissCheeseAnalyzerAgent(BaseAgent):
             ModelCapability.STRUCTURED_OUTPUT
         ]
 
-    def get_prompt_template(self) -> str:
+    def get_prompt_template(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
         """Exact Agent 3 prompt from multiAgentSafety.ts"""
         return """You are an incident prediction specialist using the Swiss Cheese Model and Bow-Tie Analysis. Your expertise is in identifying latent organizational failures that combine with active errors to create incidents.
 
@@ -177,7 +314,22 @@ Identify 3-4 specific actions that could break the causal chain:
 3. Systemic (this project): [Organizational change needed]
 4. Long-term (future projects): [Program improvement]
 
-OUTPUT FORMAT (ONLY VALID JSON):
+""" + self.get_output_format(output_mode, native_schema)
+
+    def get_output_schema(self, output_mode: str = OUTPUT_MODE_VERBOSE) -> Dict[str, Any]:
+        """JSON schema for the requested output mode"""
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_schema(self.OUTPUT_SCHEMA, self.COMPACT_KEYS)
+        return self.OUTPUT_SCHEMA
+
+    def get_output_format(self, output_mode: str = OUTPUT_MODE_VERBOSE, native_schema: bool = False) -> str:
+        """Output format section: schema note, verbose example or compact skeleton"""
+        if native_schema:
+            return native_schema_instructions()
+        if output_mode == OUTPUT_MODE_COMPACT:
+            return compact_instructions(self.COMPACT_SKELETON)
+
+        return """OUTPUT FORMAT (ONLY VALID JSON):
 
 {{
   "incidentPrediction": {{
@@ -260,48 +412,104 @@ OUTPUT FORMAT (ONLY VALID JSON):
 CRITICAL: Output ONLY valid JSON. Any text outside JSON will cause parsing failure.
 Include specific quotes from the checklist as evidence for your analysis."""
 
+    def expand_compact_output(self, output_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map compact output back to the verbose shape, with the narrative fields empty"""
+        expanded = expand_keys(output_data, self.COMPACT_KEYS)
+        causal_chain = expanded.setdefault("causalChain", {})
+        for items, field in (
+            (causal_chain.get("organizationalInfluences", []), "contribution"),
+            (causal_chain.get("unsafeSupervision", []), "enablement"),
+            (expanded.get("leadingIndicators", []), "observability")
+        ):
+            for item in items:
+                if isinstance(item, dict):
+                    item.setdefault(field, "")
+        expanded.setdefault("swissCheeseAlignment", dict.fromkeys(SWISS_CHEESE_HOLES, ""))
+        return expanded
+
     async def execute(self, task: AgentTask) -> AgentResponse:
         """Execute Swiss Cheese incident prediction"""
 
         # Extract data from task
         risk_data = task.input_data.get("risk_assessment", {})
         checklist_data = task.input_data.get("checklist", {})
-        validation_data = task.input_data.get("validation", {})
         weather_data = task.input_data.get("weather", {})
+        osha_data = task.input_data.get("osha_data", {})
 
         # Get top hazard from risk assessment
         top_hazard = risk_data.get("hazards", [{}])[0] if risk_data.get("hazards") else {}
 
-        # Build prompt from template
-        prompt = self.get_prompt_template().format(
+        # Build prompt from template (checklist is rendered last so it can be trimmed)
+        output_mode = task.output_mode
+        template = self.get_prompt_template(output_mode)
+        prompt_fields = dict(
             top_hazard=json.dumps(top_hazard, indent=2),
-            checklist_data=json.dumps(checklist_data, indent=2),
             current_time=task.input_data.get("current_time", "Not specified"),
             weather_forecast=weather_data.get("forecast", "Not available"),
-            industry_name=risk_data.get("oshaData", {}).get("industryName", "Construction"),
-            naics_code=risk_data.get("oshaData", {}).get("naicsCode", "23")
+            industry_name=osha_data.get("industryName", "Construction"),
+            naics_code=osha_data.get("naicsCode", "23")
         )
 
+        def render(checklist_json: str) -> str:
+            return template.format(checklist_data=checklist_json, **prompt_fields)
+
+        # Ceiling: configured AgentConfiguration.max_tokens, else Agent 3 max tokens from multiAgentSafety.ts
+        max_tokens = task.max_tokens or 16000
+        full_prompt = render(json.dumps(checklist_data, indent=2))
+
         # Route to best model for deep reasoning
         adapter = self.registry.route_task(AgentTask(
             task_type="swiss_cheese_analysis",
             input_data=task.input_data,
             temperature=1.0,  # Agent 3 temperature from multiAgentSafety.ts
+            max_tokens=max_tokens,
+            estimated_prompt_tokens=estimate_tokens(full_prompt),
             required_capabilities=self.get_capabilities()
         ))
 
+        # Native structured output replaces the example JSON in the prompt
+        # (render() picks up the reassigned template)
+        native_schema = adapter.supports_native_schema()
+        if native_schema:
+            template = self.get_prompt_template(output_mode, native_schema=True)
+
+        # Size max_tokens from completions observed for this agent and model
+        model_name = adapter.get_model_name()
+        max_tokens = completion_budgets.budget(self.name, model_name, max_tokens)
+
+        # Fit the prompt to the chosen model's context window
+        context_window = adapter.get_context_window()
+        prompt, fit_report = fit_prompt_to_window(render, checklist_data, context_window, max_tokens)
+        if fit_report["steps"]:
+            print(f"✂️ Agent 3 prompt trimmed {fit_report['original_tokens']} → {fit_report['prompt_tokens']} tokens: {fit_report['steps']}")
+
         # Execute
         try:
+            # Raises if the trimmed prompt leaves too little room for output
+            max_tokens = output_token_budget(context_window, fit_report["prompt_tokens"], max_tokens)
             result = await adapter.generate(
                 prompt=prompt,
                 temperature=1.0,
-                max_tokens=16000,  # Agent 3 max tokens from multiAgentSafety.ts
-                response_format="json"
+                max_tokens=max_tokens,
+                response_format="json",
+                response_schema=self.get_output_schema(output_mode) if native_schema else None
             )
+            completion_budgets.record(self.name, model_name, result["token_usage"].get("completion_tokens", 0), max_tokens)
 
-            # Debug: Log the raw response
+            # Full prompt and raw response go to the transcript log
             raw_response = result["text"]
-            print(f"🔍 Agent 3 Raw Response (first 500 chars): {raw_response[:500]}...")
+            transcript_log.record(
+                task.analysis_id,
+                agent=self.name,
+                model=result["model"],
+                prompt=prompt,
+                response=raw_response,
+                temperature=1.0,
+                max_tokens=max_tokens,
+                output_mode=output_mode,
+                token_usage=result["token_usage"]
+            )
+            print(f"🔍 Agent 3 raw response: {len(raw_response)} chars")
 
             # Try to extract JSON from the response (handle markdown formatting)
             json_text = raw_response
@@ -318,6 +526,8 @@ Include specific quotes from the checklist as evidence for your analysis."""
 
             # Parse and return
             output_data = json.loads(json_text)
+            if output_mode == OUTPUT_MODE_COMPACT:
+                output_data = self.expand_compact_output(output_data)
             return AgentResponse(
                 success=True,
                 output_data=output_data,
@@ -11,6 +11,22 @@ class SynthesisAgent(BaseAgent):
     Combines outputs from agents 1-3 into final JHA report
     """
 
+    INPUT_PROJECTION = (
+        "checklist",
+        "weather.riskLevel",
+        "validation.validation",
+        "validation.missingCritical",
+        "risk_assessment.hazards",
+        "risk_assessment.riskSummary.overallRiskLevel",
+        "risk_assessment.topThreats",
+        "risk_assessment.weatherImpact",
+        "prediction.incidentPrediction",
+        "prediction.causalChain",
+        "prediction.leadingIndicators",
+        "prediction.interventions"
+    )
+    OUTPUT_KEY = "final_report"
+
     def __init__(self, registry: AgentRegistry):
         super().__init__(
             name="synthesis_agent",
@@ -35,7 +51,7 @@ class SynthesisAgent(BaseAgent):
         """
 
         # Extract key metrics
-        quality_score = validation.get("qualityScore", 0)
+        quality_score = validation.get("validation", {}).get("qualityScore", 0)
         top_risk_score = 0
         if risk.get("hazards") and len(risk["hazards"]) > 0:
             top_risk_score = risk["hazards"][0].get("riskScore", 0)
@@ -186,10 +202,11 @@ class SynthesisAgent(BaseAgent):
         try:
             # Extract agent outputs
             validation = task.input_data.get("validation", {})
-            risk = task.input_data.get("risk", {})
+            risk = task.input_data.get("risk_assessment", {})
             prediction = task.input_data.get("prediction", {})
             weather = task.input_data.get("weather", {})
             checklist = task.input_data.get("checklist", {})
+            scores = validation.get("validation", {})
 
             # Extract metadata
             now = datetime.utcnow()
@@ -227,7 +244,7 @@ class SynthesisAgent(BaseAgent):
                     "decision": go_no_go,
                     "overallRiskLevel": risk.get("riskSummary", {}).get("overallRiskLevel", "MEDIUM"),
                     "keyFindings": [
-                        f"Data quality: {validation.get('dataQuality', 'UNKNOWN')} ({validation.get('qualityScore', 0)}/10)",
+                        f"Data quality: {scores.get('dataQuality', 'UNKNOWN')} ({scores.get('qualityScore', 0)}/10)",
                         f"Top risk score: {top_hazard.get('riskScore', 0)}/100",
                         f"Incident probability (4hrs): {prediction.get('incidentPrediction', {}).get('probabilityNext4Hours', 0):.1%}"
                     ],
@@ -252,10 +269,10 @@ class SynthesisAgent(BaseAgent):
                 "emergencyReadiness": emergency_readiness,
                 "actionItems": action_items,
                 "qualityMetrics": {
-                    "dataQualityScore": validation.get("qualityScore", 0),
+                    "dataQualityScore": scores.get("qualityScore", 0),
                     "riskAssessmentConfidence": "High" if len(risk.get("hazards", [])) > 0 else "Low",
                     "predictionConfidence": prediction.get("incidentPrediction", {}).get("confidence", "Medium"),
-                    "completeness": f"{((validation.get('qualityScore', 0) / 10) * 100):.0f}%"
+                    "completeness": f"{((scores.get('qualityScore', 0) / 10) * 100):.0f}%"
                 }
             }
 
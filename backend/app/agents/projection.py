@@ -0,0 +1,116 @@
+"""
+Input Projections
+
+Each agent declares INPUT_PROJECTION: the field paths it reads from the
+shared pipeline context. The orchestrator passes every agent only those
+fields, and the same declarations tell which stages must re-run when an
+upstream field changes: a stage's fingerprint is a hash of its projected
+inputs, so an unchanged fingerprint means its stored output still holds.
+
+Paths are dot-separated keys; integer segments index into lists, e.g.
+"risk_assessment.hazards.0" is the top hazard only.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_MISSING = object()
+
+
+def _split(path: str) -> List[Any]:
+    return [int(part) if part.isdigit() else part for part in path.split(".")]
+
+
+def get_path(data: Any, path: str, default: Any = None) -> Any:
+    """Value at path, or default if any segment is missing"""
+    current = data
+    for segment in _split(path):
+        if isinstance(segment, int):
+            if not isinstance(current, list) or segment >= len(current):
+                return default
+        elif not isinstance(current, dict) or segment not in current:
+            return default
+        current = current[segment]
+    return current
+
+
+def _set_path(target: Dict[str, Any], segments: List[Any], value: Any) -> None:
+    current = target
+    for segment, next_segment in zip(segments, segments[1:]):
+        empty = [] if isinstance(next_segment, int) else {}
+        if isinstance(segment, int):
+            while len(current) <= segment:
+                current.append(None)
+            if current[segment] is None:
+                current[segment] = empty
+        elif current.get(segment) is None:
+            current[segment] = empty
+        current = current[segment]
+
+    last = segments[-1]
+    if isinstance(last, int):
+        while len(current) <= last:
+            current.append(None)
+    current[last] = value
+
+
+def set_path(context: Dict[str, Any], path: str, value: Any) -> None:
+    """Set the value at path, creating intermediate dicts/lists as needed"""
+    _set_path(context, _split(path), value)
+
+
+def project(context: Dict[str, Any], paths: Sequence[str]) -> Dict[str, Any]:
+    """
+    Build the subset of context covered by paths, keeping its nesting.
+
+    Missing paths are skipped so agents fall back to their own defaults.
+    An empty projection passes the whole context.
+    """
+    if not paths:
+        return context
+
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        # A path nested under another declared path is already covered
+        if any(other != path and paths_overlap(other, path) and len(other) < len(path) for other in paths):
+            continue
+        value = get_path(context, path, _MISSING)
+        if value is not _MISSING:
+            _set_path(projected, _split(path), value)
+    return projected
+
+
+def fingerprint(input_data: Any) -> str:
+    """SHA-256 of canonical JSON, so equal projections hash the same"""
+    encoded = json.dumps(input_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def paths_overlap(changed: str, declared: str) -> bool:
+    """True if a change at one path can alter the value at the other"""
+    a, b = _split(changed), _split(declared)
+    shortest = min(len(a), len(b))
+    return a[:shortest] == b[:shortest]
+
+
+def stages_affected_by(
+    changed_paths: Iterable[str],
+    stages: Sequence[Tuple[str, Sequence[str], Optional[str]]]
+) -> List[str]:
+    """
+    Stages that must re-run after the given context paths change.
+
+    stages is the pipeline in order as (name, input_projection, output_key).
+    A re-run stage changes its output_key, which propagates to later
+    stages that read it.
+    """
+    changed = list(changed_paths)
+    affected = []
+    for name, projection, output_key in stages:
+        reads_everything = not projection
+        if reads_everything or any(paths_overlap(c, p) for c in changed for p in projection):
+            affected.append(name)
+            if output_key:
+                changed.append(output_key)
+    return affected
@@ -74,8 +74,9 @@ class AgentRegistry:
         Pick the best model for this task based on:
         1. Required capabilities
         2. Preferred provider (if specified)
-        3. Cost (if multiple options)
-        4. Current availability
+        3. Prompt size vs. context window (if estimated)
+        4. Cost (if multiple options)
+        5. Current availability
         """
 
         if not self.adapters:
@@ -84,7 +85,7 @@ class AgentRegistry:
         # If user specified a provider, try to use it
         if task.preferred_provider:
             adapter = self._get_preferred_adapter(task.preferred_provider)
-            if adapter:
+            if adapter and self._filter_by_context_window([("preferred", adapter)], task, widen=False):
                 return adapter
             # If preferred not available, fall through to capability matching
 
@@ -99,16 +100,51 @@ class AgentRegistry:
 
         if not candidates:
             # No perfect match - use first available adapter as fallback
-            return list(self.adapters.values())[0]
+            if task.estimated_prompt_tokens is None:
+                return list(self.adapters.values())[0]
+            candidates = list(self.adapters.items())
 
-        # Pick cheapest option that meets requirements
+        # Route by prompt size: only go to LONG_CONTEXT models when needed
+        candidates = self._filter_by_context_window(candidates, task)
+
+        # Pick cheapest option that meets requirements,
+        # preferring the smallest window that fits on ties
         cheapest = min(
             candidates,
-            key=lambda x: x[1].get_cost_per_1k_tokens()["input"]
+            key=lambda x: (x[1].get_cost_per_1k_tokens()["input"], x[1].get_context_window())
         )
 
         return cheapest[1]
 
+    def _filter_by_context_window(self, candidates: list, task: AgentTask, widen: bool = True) -> list:
+        """
+        Keep candidates whose context window fits the estimated prompt.
+
+        If no capability-matched candidate fits, widen the search to any
+        LONG_CONTEXT adapter that does. If nothing fits at all, return the
+        candidate with the largest window so the agent can trim its prompt.
+        """
+        if task.estimated_prompt_tokens is None:
+            return candidates
+
+        needed = task.estimated_prompt_tokens + min(task.max_tokens or 4096, 8192)
+
+        fitting = [c for c in candidates if c[1].get_context_window() >= needed]
+        if fitting or not widen:
+            return fitting
+
+        long_context = [
+            (name, adapter) for name, adapter in self.adapters.items()
+            if ModelCapability.LONG_CONTEXT in adapter.get_capabilities()
+            and adapter.get_context_window() >= needed
+        ]
+        if long_context:
+            print(f"📏 Prompt ~{task.estimated_prompt_tokens} tokens - routing to long-context model")
+            return long_context
+
+        largest = max(self.adapters.items(), key=lambda x: x[1].get_context_window())
+        return [largest]
+
     def _get_preferred_adapter(self, provider: ModelProvider) -> Optional[BaseModelAdapter]:
         """Get adapter for preferred provider (if available)"""
         if provider == ModelProvider.GOOGLE:
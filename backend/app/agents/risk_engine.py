@@ -0,0 +1,191 @@
+"""
+Risk Engine
+
+Deterministic version of the risk methodology in the RiskAssessorAgent
+prompt:
+
+    probability = base × hazard type × controls × weather × experience
+    risk score  = probability × 100 × severity, capped at 100
+
+Agent 2's judgments (base rate, hazard type, control adequacy, severity)
+are kept from its stored probabilityCalculation; only the condition
+multipliers - weather and crew experience - are recomputed. Re-scoring is
+anchored to the stored score: a hazard moves by the difference between
+the formula under the old and new conditions, so rounding or arithmetic
+drift in the model's own numbers never shows up as a change.
+
+Live updates use this when only numeric conditions change, instead of
+re-running the LLM agents; new or changed hazard descriptions still go
+through Agent 2.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+HAZARD_TYPE_MULTIPLIERS = {
+    "Falls": 2.8,
+    "Struck-By": 1.6,
+    "Electrocution": 0.4,
+    "Caught-Between": 0.9,
+    "Other": 1.0
+}
+
+CONTROL_MULTIPLIERS = {
+    "comprehensive": 0.3,
+    "adequate": 0.7,
+    "minimal": 1.5,
+    "none": 3.0
+}
+
+EXPERIENCE_MULTIPLIERS = {
+    "expert": 0.6,       # >5 years
+    "experienced": 1.0,  # 2-5 years
+    "new": 2.1,          # <1 year
+    "unknown": 1.0
+}
+
+SEVERITY_MULTIPLIERS = {
+    "Fatal": 10,
+    "Critical": 7,
+    "Serious": 4,
+    "Minor": 1
+}
+
+EXTREME_COLD_F = 32
+EXTREME_HEAT_F = 95
+HIGH_WIND_MPH = 25
+EXTREME_TEMPERATURE_MULTIPLIER = 1.4
+HIGH_WIND_MULTIPLIER = 1.8
+PRECIPITATION_MULTIPLIER = 1.6
+
+# Score bands; the output schema has no MINIMAL level, so 0-49 is LOW
+RISK_BANDS = ((95, "EXTREME"), (75, "HIGH"), (50, "MEDIUM"), (0, "LOW"))
+
+TOP_THREATS = 3
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RiskEngine:
+    """Local re-scoring of Agent 2 hazards under new conditions"""
+
+    def weather_factors(self, weather: Dict[str, Any]) -> List[Tuple[str, float]]:
+        """Applicable weather multipliers as (label, multiplier)"""
+        factors = []
+        temperature = _number(weather.get("temperature"))
+        if temperature is not None and (temperature < EXTREME_COLD_F or temperature > EXTREME_HEAT_F):
+            factors.append(("Extreme temp", EXTREME_TEMPERATURE_MULTIPLIER))
+        wind_speed = _number(weather.get("windSpeed"))
+        if wind_speed is not None and wind_speed > HIGH_WIND_MPH:
+            factors.append(("High winds", HIGH_WIND_MULTIPLIER))
+        if weather.get("precipitation"):
+            factors.append(("Precipitation", PRECIPITATION_MULTIPLIER))
+        return factors
+
+    def weather_multiplier(self, weather: Dict[str, Any]) -> float:
+        multiplier = 1.0
+        for _, factor in self.weather_factors(weather):
+            multiplier *= factor
+        return multiplier
+
+    def probability(
+        self,
+        base: float,
+        hazard_multiplier: float,
+        control_multiplier: float,
+        weather_multiplier: float,
+        experience_multiplier: float
+    ) -> float:
+        return base * hazard_multiplier * control_multiplier * weather_multiplier * experience_multiplier
+
+    def risk_score(self, probability: float, consequence: str) -> int:
+        """1-100 score from probability and consequence severity"""
+        score = min(probability, 1.0) * 100 * SEVERITY_MULTIPLIERS[consequence]
+        return max(1, min(100, round(score)))
+
+    def risk_level(self, risk_score: int) -> str:
+        for floor, level in RISK_BANDS:
+            if risk_score >= floor:
+                return level
+        return "LOW"
+
+    def rescore(
+        self,
+        risk_data: Dict[str, Any],
+        previous_weather: Dict[str, Any],
+        weather: Dict[str, Any],
+        experience: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Agent 2 output re-scored for new weather and (optionally) crew
+        experience, or None if any hazard lacks the stored calculation
+        needed to re-score it.
+        """
+        hazards = risk_data.get("hazards")
+        if not hazards:
+            return None
+        if experience is not None and experience not in EXPERIENCE_MULTIPLIERS:
+            return None
+
+        previous_weather_multiplier = self.weather_multiplier(previous_weather)
+        weather_multiplier = self.weather_multiplier(weather)
+
+        rescored = copy.deepcopy(risk_data)
+        for hazard in rescored["hazards"]:
+            calculation = hazard.get("probabilityCalculation") if isinstance(hazard, dict) else None
+            if not isinstance(calculation, dict) or hazard.get("consequence") not in SEVERITY_MULTIPLIERS:
+                return None
+            base = _number(calculation.get("base"))
+            hazard_multiplier = _number(calculation.get("hazardMultiplier"))
+            if hazard_multiplier is None:
+                hazard_multiplier = HAZARD_TYPE_MULTIPLIERS.get(hazard.get("category"))
+            control_multiplier = _number(calculation.get("controlMultiplier"))
+            if base is None or hazard_multiplier is None or control_multiplier is None:
+                return None
+
+            previous_experience = _number(calculation.get("experienceMultiplier")) or 1.0
+            new_experience = EXPERIENCE_MULTIPLIERS[experience] if experience else previous_experience
+
+            previous_probability = self.probability(
+                base, hazard_multiplier, control_multiplier, previous_weather_multiplier, previous_experience
+            )
+            probability = self.probability(
+                base, hazard_multiplier, control_multiplier, weather_multiplier, new_experience
+            )
+            consequence = hazard["consequence"]
+            score_change = self.risk_score(probability, consequence) - self.risk_score(previous_probability, consequence)
+
+            stored_score = _number(hazard.get("riskScore"))
+            if stored_score is None:
+                stored_score = self.risk_score(previous_probability, consequence)
+            risk_score = max(1, min(100, round(stored_score + score_change)))
+            stored_probability = _number(hazard.get("probability"))
+            if stored_probability is not None:
+                hazard["probability"] = round(max(0.0, min(1.0, stored_probability + probability - previous_probability)), 4)
+            else:
+                hazard["probability"] = round(min(probability, 1.0), 4)
+            hazard["riskScore"] = risk_score
+            hazard["riskLevel"] = self.risk_level(risk_score)
+            calculation.update({
+                "weatherMultiplier": round(weather_multiplier, 4),
+                "experienceMultiplier": new_experience,
+                "final": round(probability, 4)
+            })
+
+        ranked = sorted(rescored["hazards"], key=lambda h: h["riskScore"], reverse=True)
+        highest = ranked[0]["riskScore"]
+        summary = rescored.setdefault("riskSummary", {})
+        summary["highestRiskScore"] = highest
+        summary["overallRiskLevel"] = self.risk_level(highest)
+        rescored["topThreats"] = [
+            f"{h.get('name', 'Unknown hazard')} (Risk Score: {h['riskScore']})" for h in ranked[:TOP_THREATS]
+        ]
+        return rescored
+
+
+risk_engine = RiskEngine()
@@ -0,0 +1,347 @@
+"""
+Token Budgeting
+
+Local token estimation and context-window-aware prompt fitting.
+
+Prompts are sized before they are sent so that oversized checklists are
+trimmed locally instead of failing after a full round-trip to a small
+free model.
+"""
+
+import json
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# Optional dependency - exact counts when tiktoken is installed
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    tiktoken = None
+
+
+# Context windows (tokens) by model identifier fragment.
+# First match wins, so more specific fragments come first.
+MODEL_CONTEXT_WINDOWS: List[Tuple[str, int]] = [
+    ("gemini-2.5", 1_048_576),
+    ("gemini-2.0-flash", 1_048_576),
+    ("claude", 200_000),
+    ("gpt-4o", 128_000),
+    ("deepseek-chat-v3.1", 163_840),
+    ("qwen3-235b-a22b", 131_072),
+    ("qwen2.5-vl-32b", 16_384),
+    ("mistral-small-3.2-24b", 131_072),
+    ("nemotron-nano-9b", 128_000),
+    ("glm-4.5-air", 131_072),
+    ("kimi-k2", 32_768),
+    ("dolphin-mistral-24b", 32_768),
+    ("llama-4-maverick", 128_000),
+    ("gemma-3", 32_768),
+]
+
+DEFAULT_CONTEXT_WINDOW = 32_768
+
+# Smallest completion worth requesting; prompts are trimmed to leave at least this
+MIN_OUTPUT_TOKENS = 256
+
+# Heuristic estimates are padded so that we err on the side of trimming
+HEURISTIC_SAFETY_MARGIN = 1.1
+
+# Answers that carry no information for the agents
+LOW_VALUE_ANSWERS = {"", "n/a", "na", "none", "no response", "same", "-", "tbd"}
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+_encoding = None
+
+
+def context_window_for(model_name: str) -> int:
+    """Look up the context window for a model identifier"""
+    model_lower = (model_name or "").lower()
+    for fragment, window in MODEL_CONTEXT_WINDOWS:
+        if fragment in model_lower:
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def _get_encoding():
+    """Lazily load the tiktoken encoding (None if unavailable)"""
+    global _encoding
+    if _encoding is None and TIKTOKEN_AVAILABLE:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable, using heuristic estimates: {e}")
+            return None
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text.
+
+    Uses tiktoken when installed. Otherwise falls back to a heuristic
+    calibrated against BPE tokenizers: short words are one token, long
+    words split every ~5 characters, numbers split into 1-3 digit groups
+    and each punctuation mark or whitespace run costs one token.
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    count = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isalpha():
+            count += max(1, math.ceil(len(piece) / 5))
+        elif piece[0].isspace():
+            # A single space is merged into the following word
+            count += 0 if piece == " " else 1
+        else:
+            count += 1
+
+    return math.ceil(count * HEURISTIC_SAFETY_MARGIN)
+
+
+def output_token_budget(context_window: int, prompt_tokens: int, requested: int) -> int:
+    """
+    Clamp requested max_tokens to what is left of the context window.
+
+    Raises ValueError when less than MIN_OUTPUT_TOKENS is left: the
+    provider would reject the request (or cut the answer short) anyway.
+    """
+    remaining = context_window - prompt_tokens
+    if remaining < MIN_OUTPUT_TOKENS:
+        raise ValueError(
+            f"Prompt of {prompt_tokens} tokens leaves {remaining} of the {context_window}-token "
+            f"context window for output (minimum {MIN_OUTPUT_TOKENS})"
+        )
+    return min(requested, remaining)
+
+
+class CompletionBudgetTracker:
+    """
+    Learns max_tokens per (agent, model) from observed completion lengths.
+
+    Keeps a sliding window of completion token counts and sizes max_tokens
+    to a high percentile plus a safety margin. The configured max_tokens
+    is always the ceiling; until enough samples exist the ceiling is used
+    as-is.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        percentile: float = 0.95,
+        margin: float = 1.25,
+        floor: int = 512
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.margin = margin
+        self.floor = floor
+        self._samples: Dict[Tuple[str, str], Deque[int]] = {}
+        self._truncations: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, model: str, completion_tokens: int, max_tokens: Optional[int] = None) -> None:
+        """Record one completion. Responses that hit max_tokens count double (length is censored)."""
+        if not completion_tokens:
+            return
+        key = (agent, model)
+        truncated = max_tokens is not None and completion_tokens >= max_tokens
+        with self._lock:
+            samples = self._samples.setdefault(key, deque(maxlen=self.window))
+            samples.append(completion_tokens * 2 if truncated else completion_tokens)
+            if truncated:
+                self._truncations[key] = self._truncations.get(key, 0) + 1
+
+    def _learned(self, samples: Deque[int]) -> Optional[int]:
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return max(self.floor, math.ceil(ordered[index] * self.margin))
+
+    def budget(self, agent: str, model: str, ceiling: int) -> int:
+        """max_tokens to request: learned budget capped at the configured ceiling"""
+        with self._lock:
+            learned = self._learned(self._samples.get((agent, model), ()))
+        if learned is None:
+            return ceiling
+        return min(ceiling, learned)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Learned budgets and distribution stats for every (agent, model)"""
+        with self._lock:
+            items = [(key, list(samples)) for key, samples in self._samples.items()]
+            truncations = dict(self._truncations)
+
+        stats = []
+        for (agent, model), samples in sorted(items):
+            ordered = sorted(samples)
+            stats.append({
+                "agent": agent,
+                "model": model,
+                "samples": len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)],
+                "max": ordered[-1],
+                "truncations": truncations.get((agent, model), 0),
+                "learned_max_tokens": self._learned(deque(ordered))
+            })
+        return stats
+
+
+completion_budgets = CompletionBudgetTracker()
+
+
+def _find_responses(checklist: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Locate the question -> answer mapping inside a checklist payload"""
+    for candidate in (checklist.get("checklist_data"), checklist):
+        if isinstance(candidate, dict) and isinstance(candidate.get("responses"), dict):
+            return candidate["responses"]
+    return None
+
+
+def _answer_text(answer: Any) -> str:
+    """Extract the free-text part of a checklist answer"""
+    if isinstance(answer, dict):
+        answer = answer.get("value", "")
+    return answer if isinstance(answer, str) else json.dumps(answer)
+
+
+def _is_critical(answer: Any) -> bool:
+    return isinstance(answer, dict) and bool(answer.get("critical"))
+
+
+def _truncate_answer(answer: Any, limit: int) -> Any:
+    """Truncate the free-text part of an answer to limit characters"""
+    text = _answer_text(answer)
+    if len(text) <= limit:
+        return answer
+    truncated = text[:limit].rstrip() + " [truncated]"
+    if isinstance(answer, dict):
+        return {**answer, "value": truncated}
+    return truncated
+
+
+def fit_prompt_to_window(
+    render: Callable[[str], str],
+    checklist: Dict[str, Any],
+    context_window: int,
+    reserved_output_tokens: int
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render a prompt that fits the context window.
+
+    render turns a serialized checklist into the full prompt. When the
+    prompt is too large, checklist content is reduced in priority order:
+
+    1. Compact JSON instead of indented JSON
+    2. Drop empty / "N/A" style answers
+    3. Truncate long non-critical answers
+    4. Drop non-critical answers (last questions first)
+    5. Truncate critical answers
+    6. Hard-cut the serialized checklist
+
+    At least MIN_OUTPUT_TOKENS of the window are kept for output. If the
+    prompt template alone does not fit, the checklist is cut to nothing
+    and output_token_budget raises for the result.
+
+    Returns the prompt and a report describing what was trimmed.
+    """
+    # Never reserve more than half the window for output, nor less than
+    # output_token_budget accepts
+    budget = context_window - max(MIN_OUTPUT_TOKENS, min(reserved_output_tokens, context_window // 2))
+
+    report: Dict[str, Any] = {"budget_tokens": budget, "steps": []}
+
+    def attempt(data: Dict[str, Any], indent: Optional[int]) -> Tuple[str, int]:
+        prompt = render(json.dumps(data, indent=indent, default=str))
+        return prompt, estimate_tokens(prompt)
+
+    prompt, tokens = attempt(checklist, 2)
+    report["original_tokens"] = tokens
+    if tokens <= budget:
+        report["prompt_tokens"] = tokens
+        return prompt, report
+
+    # Step 1: compact serialization
+    report["steps"].append("compact_json")
+    prompt, tokens = attempt(checklist, None)
+    if tokens <= budget:
+        report["prompt_tokens"] = tokens
+        return prompt, report
+
+    data = json.loads(json.dumps(checklist, default=str))
+    responses = _find_responses(data)
+
+    if responses:
+        # Step 2: drop answers that carry no information
+        empty = [
+            key for key, answer in responses.items()
+            if not _is_critical(answer) and _answer_text(answer).strip().lower() in LOW_VALUE_ANSWERS
+        ]
+        if empty:
+            for key in empty:
+                del responses[key]
+            report["steps"].append(f"dropped_empty_answers:{len(empty)}")
+            prompt, tokens = attempt(data, None)
+            if tokens <= budget:
+                report["prompt_tokens"] = tokens
+                return prompt, report
+
+        # Step 3: truncate long non-critical answers
+        for key, answer in responses.items():
+            if not _is_critical(answer):
+                responses[key] = _truncate_answer(answer, 200)
+        report["steps"].append("truncated_non_critical_answers")
+        prompt, tokens = attempt(data, None)
+        if tokens <= budget:
+            report["prompt_tokens"] = tokens
+            return prompt, report
+
+        # Step 4: drop non-critical answers, last questions first
+        non_critical = [key for key, answer in responses.items() if not _is_critical(answer)]
+        dropped = 0
+        for key in reversed(non_critical):
+            del responses[key]
+            dropped += 1
+            prompt, tokens = attempt(data, None)
+            if tokens <= budget:
+                break
+        report["steps"].append(f"dropped_non_critical_answers:{dropped}")
+        if tokens <= budget:
+            report["prompt_tokens"] = tokens
+            return prompt, report
+
+        # Step 5: truncate critical answers
+        for key, answer in responses.items():
+            responses[key] = _truncate_answer(answer, 300)
+        report["steps"].append("truncated_critical_answers")
+        prompt, tokens = attempt(data, None)
+        if tokens <= budget:
+            report["prompt_tokens"] = tokens
+            return prompt, report
+
+    # Step 6: hard cut the serialized checklist proportionally, again if
+    # the estimate was off, down to nothing if the template alone is too big
+    serialized = json.dumps(data, default=str)
+    keep = len(serialized)
+    while tokens > budget and keep > 0:
+        overflow = tokens - budget
+        keep_ratio = max(0.0, 1 - overflow / max(estimate_tokens(serialized[:keep]), 1))
+        keep = int(keep * keep_ratio * 0.9)
+        prompt = render(serialized[:keep] + " ...[checklist truncated to fit model context]")
+        tokens = estimate_tokens(prompt)
+    report["steps"].append("hard_cut")
+    report["prompt_tokens"] = tokens
+    return prompt, report
@@ -7,12 +7,17 @@ Requires admin privileges for access.
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_, func
 from sqlalchemy.orm import selectinload
 
-from app.core.deps import get_db
+from app.core.deps import get_db, get_read_db
+from app.core.database import upsert
+from app.core.pool_metrics import pool_metrics
+from app.core.database import read_engine, read_pool_metrics, replica_router
+from app.core.config import get_settings
 from app.models.agent_config import AgentConfiguration, AgentPerformanceLog, DEFAULT_AGENT_CONFIGS
 from app.schemas.agent_config import (
     AgentConfigCreate,
@@ -23,8 +28,18 @@ from app.schemas.agent_config import (
     AgentStatusResponse,
     BulkConfigUpdateRequest,
     AgentPerformanceResponse,
+    PerformanceMetrics,
+    TokenBudget,
+    TokenBudgetResponse,
     AVAILABLE_MODELS
 )
+from app.agents.token_budget import completion_budgets
+from app.services.agent_config_service import agent_config_cache
+from app.services.performance_analytics import performance_summary
+from app.services.partitioning import parse_month, partition_manager
+from app.core.transcript_log import transcript_log
+from app.services.voice_extractor import voice_extractor
+from app.services.alert_hub import alert_hub
 
 # For now, we'll use a simple current_user dependency
 # TODO: Replace with proper authentication when user system is implemented
@@ -88,37 +103,9 @@ async def create_or_update_agent_config(
     """
     user_id = current_user["user_id"]
 
-    # Check if configuration already exists
-    result = await db.execute(
-        select(AgentConfiguration)
-        .where(
-            and_(
-                AgentConfiguration.user_id == user_id,
-                AgentConfiguration.agent_name == config_data.agent_name
-            )
-        )
-    )
-    existing_config = result.scalar_one_or_none()
-
-    if existing_config:
-        # Update existing configuration
-        for field, value in config_data.dict(exclude_unset=True).items():
-            setattr(existing_config, field, value)
-        existing_config.updated_at = datetime.utcnow()
-
-        await db.commit()
-        await db.refresh(existing_config)
-        return AgentConfigResponse.from_orm(existing_config)
-    else:
-        # Create new configuration
-        new_config = AgentConfiguration(
-            user_id=user_id,
-            **config_data.dict()
-        )
-        db.add(new_config)
-        await db.commit()
-        await db.refresh(new_config)
-        return AgentConfigResponse.from_orm(new_config)
+    configs = await _upsert_agent_configs(db, user_id, [config_data])
+    await agent_config_cache.invalidate(user_id)
+    return AgentConfigResponse.from_orm(configs[0])
 
 
 @router.put("/agent-config/bulk", response_model=List[AgentConfigResponse])
@@ -131,43 +118,10 @@ async def bulk_update_agent_configs(
     Update multiple agent configurations at once.
     """
     user_id = current_user["user_id"]
-    updated_configs = []
-
-    for config_data in bulk_request.configs:
-        # Check if configuration exists
-        result = await db.execute(
-            select(AgentConfiguration)
-            .where(
-                and_(
-                    AgentConfiguration.user_id == user_id,
-                    AgentConfiguration.agent_name == config_data.agent_name
-                )
-            )
-        )
-        existing_config = result.scalar_one_or_none()
-
-        if existing_config:
-            # Update existing
-            for field, value in config_data.dict(exclude_unset=True).items():
-                setattr(existing_config, field, value)
-            existing_config.updated_at = datetime.utcnow()
-            updated_configs.append(existing_config)
-        else:
-            # Create new
-            new_config = AgentConfiguration(
-                user_id=user_id,
-                **config_data.dict()
-            )
-            db.add(new_config)
-            updated_configs.append(new_config)
-
-    await db.commit()
 
-    # Refresh all configs
-    for config in updated_configs:
-        await db.refresh(config)
-
-    return [AgentConfigResponse.from_orm(config) for config in updated_configs]
+    configs = await _upsert_agent_configs(db, user_id, bulk_request.configs)
+    await agent_config_cache.invalidate(user_id)
+    return [AgentConfigResponse.from_orm(config) for config in configs]
 
 
 @router.post("/agent-config/test", response_model=AgentTestResponse)
@@ -216,7 +170,6 @@ async def test_agent(
     try:
         from app.core.deps import get_agent_registry
         from app.agents.adapters.openrouter import OpenRouterAdapter
-        from app.core.config import get_settings
 
         settings = get_settings()
 
@@ -288,6 +241,7 @@ async def delete_agent_config(
         )
 
     await db.commit()
+    await agent_config_cache.invalidate(user_id)
 
     return {"message": f"Configuration for agent '{agent_name}' deleted successfully"}
 
@@ -296,7 +250,7 @@ async def delete_agent_config(
 async def get_agent_performance(
     days: int = 30,
     current_user: dict = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get performance analytics for all agents.
@@ -304,20 +258,240 @@ async def get_agent_performance(
     user_id = current_user["user_id"]
     since_date = datetime.utcnow() - timedelta(days=days)
 
-    # Get performance metrics
-    # This is a placeholder - implement actual performance tracking when needed
+    # Aggregated in SQL over the hourly rollup, not the raw logs
+    summary = await performance_summary(db, since_date)
+
+    result = await db.execute(
+        select(AgentConfiguration.agent_name, AgentConfiguration.total_executions)
+        .where(AgentConfiguration.user_id == user_id)
+    )
+    lifetime_executions = dict(result.all())
+
+    def percentile_fields(stats: Dict[str, Any]) -> Dict[str, Any]:
+        return {f"{key}_ms": stats.get(key) for key in ("p50", "p95", "p99")}
+
+    metrics = []
+    for agent_name, stats in sorted(summary["by_agent"].items()):
+        model_performance = {
+            model: {
+                "executions": model_stats["executions"],
+                "avg_execution_time_ms": model_stats["avg_execution_time_ms"],
+                "success_rate": model_stats["success_rate"],
+                "tokens_per_second": model_stats["tokens_per_second"],
+                **percentile_fields(model_stats)
+            }
+            for (agent, model), model_stats in summary["by_model"].items()
+            if agent == agent_name
+        }
+        metrics.append(PerformanceMetrics(
+            agent_name=agent_name,
+            total_executions=lifetime_executions.get(agent_name) or stats["executions"],
+            avg_execution_time_ms=stats["avg_execution_time_ms"],
+            success_rate=stats["success_rate"],
+            last_30_days_executions=stats["executions"],
+            model_performance=model_performance,
+            tokens_per_second=stats["tokens_per_second"],
+            **percentile_fields(stats)
+        ))
+
+    overall = summary["overall"]
     return AgentPerformanceResponse(
-        metrics=[],
+        metrics=metrics,
         overall_stats={
-            "total_executions": 0,
-            "avg_execution_time": 0,
-            "success_rate": 0,
+            "total_executions": overall.get("executions", 0),
+            "avg_execution_time": overall.get("avg_execution_time_ms", 0),
+            "success_rate": overall.get("success_rate", 0),
+            "tokens_per_second": overall.get("tokens_per_second", 0),
+            **percentile_fields(overall),
             "period_days": days
         },
         period=f"last_{days}_days"
     )
 
 
+# Agent profile names (as recorded in token budgets) -> AgentConfiguration.agent_name
+AGENT_CONFIG_NAMES = {
+    "jha_validator": "validator",
+    "risk_assessor": "risk_assessor",
+    "swiss_cheese_analyzer": "swiss_cheese"
+}
+
+
+@router.get("/agent-config/token-budgets", response_model=TokenBudgetResponse)
+async def get_token_budgets(
+    current_user: dict = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get the max_tokens budgets learned from observed completion lengths.
+    The configured max_tokens is the ceiling for each agent.
+    """
+    user_id = current_user["user_id"]
+
+    result = await db.execute(
+        select(AgentConfiguration)
+        .where(
+            and_(
+                AgentConfiguration.user_id == user_id,
+                AgentConfiguration.is_active == True
+            )
+        )
+    )
+    configured = {config.agent_name: config.max_tokens for config in result.scalars()}
+
+    budgets = []
+    for stats in completion_budgets.snapshot():
+        ceiling = configured.get(AGENT_CONFIG_NAMES.get(stats["agent"], stats["agent"]))
+        learned = stats["learned_max_tokens"]
+        if ceiling is not None and learned is not None:
+            effective = min(ceiling, learned)
+        else:
+            effective = learned if learned is not None else ceiling
+        budgets.append(TokenBudget(
+            **stats,
+            configured_max_tokens=ceiling,
+            effective_max_tokens=effective
+        ))
+
+    return TokenBudgetResponse(
+        budgets=budgets,
+        percentile=completion_budgets.percentile,
+        margin=completion_budgets.margin,
+        min_samples=completion_budgets.min_samples
+    )
+
+
+@router.get("/database/pool")
+async def get_pool_metrics(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Connection pool metrics: checked out / overflow / idle connections,
+    wait time for a connection, how long connections are held, and
+    connection age. High wait times mean requests are queueing on the
+    pool; long holds with low waits point at slow work inside requests.
+    Includes the read replica's pool and routing state when configured.
+    """
+    settings = get_settings()
+    return {
+        "pool": pool_metrics.stats(),
+        "read_pool": read_pool_metrics.stats() if read_engine is not None else None,
+        "replica": replica_router.stats(),
+        "config": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "release_during_llm": settings.db_release_during_llm,
+            "replica_max_lag_seconds": settings.replica_max_lag_seconds
+        }
+    }
+
+
+@router.get("/partitions")
+async def get_partitions(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Monthly partitions of analysis_history and agent_outputs (approximate
+    rows and size) and the archive manifest.
+    """
+    return await partition_manager.partitions()
+
+
+@router.post("/partitions/maintain")
+async def run_partition_maintenance(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Create upcoming partitions and archive those older than the retention
+    window now, instead of waiting for the daily job.
+    """
+    try:
+        return await partition_manager.maintain()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Partition maintenance failed: {str(e)}"
+        )
+
+
+@router.post("/partitions/{table_name}/{month}/restore")
+async def restore_partition(
+    table_name: str,
+    month: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Restore an archived month (YYYY-MM) of analysis_history or
+    agent_outputs for an audit. Restored months stay online for a week
+    before the archiver takes them again.
+    """
+    try:
+        month_start = parse_month(month)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="month must be YYYY-MM")
+
+    try:
+        restored = await partition_manager.restore_partition(table_name, month_start)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    return {"table": table_name, "month": month, "rows_restored": restored}
+
+
+@router.get("/voice-extractor")
+async def get_voice_extractor_stats(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Live-update voice extraction: share of updates handled by the local
+    rules (fast_path_hit_rate) versus sent to the LLM fallback.
+    """
+    return voice_extractor.stats()
+
+
+@router.get("/alerts")
+async def get_alert_stats(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Crew alert WebSockets on this worker: connections, queued and
+    delivered alerts, slow-consumer evictions, and publish-to-delivery
+    latency.
+    """
+    return alert_hub.stats()
+
+
+@router.get("/transcripts/stats")
+async def get_transcript_stats(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Transcript log segments, queue depth and dropped records"""
+    return transcript_log.stats()
+
+
+@router.get("/transcripts/{analysis_id}")
+async def get_transcripts(
+    analysis_id: UUID,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Full prompts and raw model responses recorded for an analysis, in the
+    order the agents ran. Transcripts older than the retention window are
+    gone.
+    """
+    try:
+        transcripts = await transcript_log.read(analysis_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if not transcripts:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No transcripts for this analysis")
+    return {"analysis_id": str(analysis_id), "transcripts": transcripts}
+
+
 @router.get("/available-models")
 async def get_available_models():
     """
@@ -326,6 +500,54 @@ async def get_available_models():
     return {"models": AVAILABLE_MODELS}
 
 
+async def _upsert_agent_configs(
+    db: AsyncSession,
+    user_id: str,
+    configs: List[AgentConfigCreate]
+) -> List[AgentConfiguration]:
+    """
+    Insert or update configurations with INSERT ... ON CONFLICT DO UPDATE
+    RETURNING, then commit.
+
+    New rows get every field (with schema defaults). Existing rows only
+    get the fields the client explicitly set, so configs are grouped by
+    their set of explicit fields - normally a single statement.
+
+    Postgres rejects a statement that updates the same row twice, so
+    when a request repeats an agent_name only its last config is applied.
+    """
+    latest = {config_data.agent_name: config_data for config_data in configs}
+
+    groups: Dict[tuple, List[AgentConfigCreate]] = {}
+    for config_data in latest.values():
+        explicit = tuple(sorted(config_data.dict(exclude_unset=True)))
+        groups.setdefault(explicit, []).append(config_data)
+
+    now = datetime.utcnow()
+    upserted: Dict[str, AgentConfiguration] = {}
+    for explicit, group in groups.items():
+        stmt = upsert(AgentConfiguration).values([
+            {**config_data.dict(), "user_id": user_id, "created_at": now, "updated_at": now}
+            for config_data in group
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "agent_name"],
+            set_={
+                **{field: stmt.excluded[field] for field in explicit if field != "agent_name"},
+                "updated_at": now
+            }
+        ).returning(AgentConfiguration)
+
+        result = await db.scalars(stmt, execution_options={"populate_existing": True})
+        for config in result:
+            upserted[config.agent_name] = config
+
+    await db.commit()
+
+    # RETURNING order is not guaranteed; answer in request order
+    return [upserted[config_data.agent_name] for config_data in configs]
+
+
 async def _create_default_configs(db: AsyncSession, user_id: str) -> List[AgentConfiguration]:
     """Create default configurations for all agents."""
     default_configs = []
@@ -340,6 +562,7 @@ async def _create_default_configs(db: AsyncSession, user_id: str) -> List[AgentC
         default_configs.append(new_config)
 
     await db.commit()
+    await agent_config_cache.invalidate(user_id)
 
     # Refresh all configs
     for config in default_configs:
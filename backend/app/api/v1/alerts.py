@@ -0,0 +1,101 @@
+"""
+Crew Alert API Routes
+
+WebSocket delivery of JHA live-update alerts to crew devices.
+"""
+
+import asyncio
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+
+from app.core.config import get_settings
+from app.services.alert_hub import AlertSubscriber, alert_hub
+
+router = APIRouter(prefix="/alerts", tags=["Crew Alerts"])
+
+# Close code for evicted slow consumers: 1013 Try Again Later
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+async def _send_alerts(websocket: WebSocket, subscriber: AlertSubscriber) -> None:
+    """Drain the subscriber's queue; a send slower than the timeout evicts it"""
+    while True:
+        alert = await subscriber.queue.get()
+        # Not wait_for: before Python 3.12 it can swallow a cancel that arrives
+        # as the send completes, leaving this task blocked on the queue
+        send = asyncio.ensure_future(websocket.send_json(alert))
+        try:
+            done, _ = await asyncio.wait({send}, timeout=alert_hub.send_timeout)
+        finally:
+            send.cancel()
+        if not done:
+            alert_hub.evict(subscriber)
+            return
+        send.result()
+        alert_hub.record_delivery(subscriber, alert)
+
+
+async def _receive_until_disconnect(websocket: WebSocket) -> None:
+    """Devices may send keepalives; reading is how a disconnect is noticed"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/ws")
+async def crew_alerts(
+    websocket: WebSocket,
+    project_id: Optional[UUID] = None,
+    jha_id: Optional[UUID] = None
+):
+    """
+    Subscribe to crew alerts for a project and/or a JHA:
+    /api/v1/alerts/ws?project_id=...&jha_id=...
+
+    Each message is one alert: update_id, original_jha_id, project_id,
+    alert_severity, crew_alert, requires_action, action_required, risk
+    scores, go_no_go_decision, created_at and published_at.
+
+    Devices that fall behind are closed with code 1013 and should
+    reconnect; updates missed meanwhile can be re-read over REST.
+
+    Closed with 1008 unless ALERT_WEBSOCKET_ENABLED is set: there is no
+    device authentication yet.
+    """
+    if not get_settings().alert_websocket_enabled:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Crew alerts are not enabled")
+        return
+
+    topics = []
+    if jha_id:
+        topics.append(f"jha:{jha_id}")
+    if project_id:
+        topics.append(f"project:{project_id}")
+    if not topics:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="project_id or jha_id required")
+        return
+
+    await websocket.accept()
+    subscriber = alert_hub.subscribe(topics)
+    tasks = [
+        asyncio.create_task(_send_alerts(websocket, subscriber)),
+        asyncio.create_task(_receive_until_disconnect(websocket)),
+        asyncio.create_task(subscriber.evicted.wait())
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        alert_hub.unsubscribe(subscriber)
+
+    if subscriber.evicted.is_set():
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Too slow; reconnect")
+        except RuntimeError:
+            # Already closed by the client
+            pass
@@ -5,20 +5,36 @@ FastAPI endpoints for Job Hazard Analysis processing.
 Matches the V1 Node.js API endpoints.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from uuid import UUID
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_jha_service
+from app.core.deps import get_db, get_read_db, get_jha_service
+from app.models.user import PLACEHOLDER_USER_ID
 from app.services.jha_service import JHAService
+from app.services.analysis_history_service import (
+    AnalysisHistoryService,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    stream_response
+)
+from app.services.hazard_index import HazardSearchService, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
 from app.schemas.jha import (
     JHAAnalysisRequest,
     JHAAnalysisResponse,
     JHALiveUpdateRequest,
     JHALiveUpdateResponse,
-    JHAUpdateAcknowledge
+    JHAUpdateAcknowledge,
+    AnalysisSummary,
+    AnalysisListResponse,
+    AnalysisDetail,
+    AgentOutputSummary,
+    RiskBoardResponse,
+    HazardSearchResult,
+    HazardSearchResponse
 )
 
 router = APIRouter(prefix="/jha", tags=["JHA Analysis"])
@@ -27,6 +43,7 @@ router = APIRouter(prefix="/jha", tags=["JHA Analysis"])
 @router.post("/analyze")
 async def analyze_checklist(
     request: JHAAnalysisRequest,
+    db: AsyncSession = Depends(get_db),
     jha_service: JHAService = Depends(get_jha_service)
 ):
     """
@@ -56,12 +73,13 @@ async def analyze_checklist(
         from app.agents.orchestrator import JHAOrchestrator
         orchestrator = JHAOrchestrator(registry, db)
 
-        user_id = UUID("00000000-0000-0000-0000-000000000000")
+        user_id = PLACEHOLDER_USER_ID
 
         # Call orchestrator with real database
         result = await orchestrator.execute_full_analysis(
             request=request,
-            user_id=user_id
+            user_id=user_id,
+            company_id=request.company_id
         )
 
         return result
@@ -82,13 +100,14 @@ async def analyze_checklist(
 @router.post("/jha-update")
 async def jha_update_legacy(
     request: JHAAnalysisRequest,
+    db: AsyncSession = Depends(get_db),
     jha_service: JHAService = Depends(get_jha_service)
 ):
     """
     Legacy endpoint for old frontend compatibility.
     Maps to the same analyze_checklist function.
     """
-    return await analyze_checklist(request, jha_service)
+    return await analyze_checklist(request, db=db, jha_service=jha_service)
 
 
 @router.post("/live-update", response_model=JHALiveUpdateResponse)
@@ -106,24 +125,21 @@ async def live_update(
     - New hazards identified
 
     **Process:**
-    - Re-runs Agent 2 (Risk Assessment) with new data
-    - Re-runs Agent 3 (Swiss Cheese) for updated predictions
+    - Applies the field changes to the analysis' latest state
+    - Wind, temperature, precipitation or crew experience only: hazards
+      are re-scored locally (no LLM call) and the report is re-synthesized
+    - Otherwise re-runs only the agents whose inputs changed; the rest
+      reuse their stored outputs
     - Generates crew alerts if risk threshold breached
     """
     try:
         # TODO: Extract user_id from authentication
-        user_id = UUID("00000000-0000-0000-0000-000000000000")
+        user_id = PLACEHOLDER_USER_ID
 
-        # TODO: Implement live update logic in JHAService
-        # For now, return placeholder
-        return JHALiveUpdateResponse(
-            id=UUID("00000000-0000-0000-0000-000000000001"),
-            original_jha_id=request.original_jha_id,
-            user_id=user_id,
-            voice_input=request.voice_input,
-            requires_action=False,
-            acknowledged=False,
-            created_at=datetime.utcnow()
+        return await jha_service.live_update(
+            analysis_id=request.original_jha_id,
+            update_data=request.dict(exclude={"original_jha_id"}),
+            user_id=user_id
         )
 
     except ValueError as e:
@@ -169,6 +185,144 @@ async def acknowledge_update(
         )
 
 
+@router.get("/analyses", response_model=AnalysisListResponse)
+async def list_analyses(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    type: Optional[str] = Query(None, description="Filter by analysis type, e.g. jha_multi_agent_analysis"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List the current user's analyses, newest first.
+
+    Returns summary columns only. Follow next_cursor for older pages;
+    each page is a single index range scan regardless of depth.
+    """
+    # TODO: Extract user_id from authentication
+    user_id = PLACEHOLDER_USER_ID
+
+    try:
+        rows, next_cursor = await AnalysisHistoryService(db).list_for_user(
+            user_id, limit=limit, cursor=cursor, analysis_type=type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return AnalysisListResponse(
+        items=[AnalysisSummary(**row) for row in rows],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/analysis/{analysis_id}", response_model=AnalysisDetail)
+async def get_analysis(
+    analysis_id: UUID,
+    include_outputs: bool = Query(False, description="Include each agent's stored output"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get one analysis without its report body.
+
+    The report is served by GET /analysis/{analysis_id}/response.
+    """
+    detail = await AnalysisHistoryService(db).get_detail(analysis_id, include_outputs=include_outputs)
+    if detail is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Analysis {analysis_id} not found"
+        )
+
+    outputs = detail.pop("agent_outputs", None)
+    return AnalysisDetail(
+        **detail,
+        agent_outputs=[AgentOutputSummary.from_orm(output) for output in outputs] if outputs is not None else None
+    )
+
+
+@router.get("/analysis/{analysis_id}/response")
+async def get_analysis_response(
+    analysis_id: UUID,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Stream the stored report body (the final report JSON) in chunks.
+    """
+    source = await AnalysisHistoryService(db).response_source(analysis_id)
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Analysis {analysis_id} not found"
+        )
+
+    length, blob_hash = source
+    return StreamingResponse(
+        stream_response(analysis_id, length, blob_hash),
+        media_type="application/json"
+    )
+
+
+@router.get("/risk-board", response_model=RiskBoardResponse)
+async def get_risk_board(
+    company_id: Optional[UUID] = Query(None),
+    project_id: Optional[UUID] = Query(None),
+    days: int = Query(30, ge=1, le=365),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Risk overview for a company or project: GO/NO-GO and urgency counts,
+    top hazard categories and the highest-risk analyses of the last N days.
+    """
+    try:
+        board = await AnalysisHistoryService(db).risk_board(company_id=company_id, project_id=project_id, days=days)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    highest_risk = board.pop("highest_risk")
+    return RiskBoardResponse(
+        company_id=company_id,
+        project_id=project_id,
+        days=days,
+        highest_risk=[AnalysisSummary(**row) for row in highest_risk],
+        **board
+    )
+
+
+@router.get("/hazards/search", response_model=HazardSearchResponse)
+async def search_hazards(
+    category: Optional[str] = Query(None, description="Hazard category, e.g. Fall"),
+    min_risk_score: Optional[int] = Query(None, ge=0, le=100),
+    days: Optional[int] = Query(None, ge=1, description="Only analyses from the last N days"),
+    company_id: Optional[UUID] = Query(None),
+    project_id: Optional[UUID] = Query(None),
+    osha_standard: Optional[str] = Query(None, description="OSHA section, e.g. 1926.501"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    explain: bool = Query(False, description="Include the database query plan"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search hazards across stored analyses.
+
+    Example: category=Fall&min_risk_score=75&days=30 returns every high-risk
+    fall hazard from the last month. Filters are served by indexes on
+    analysis_hazards; pass explain=true to confirm the plan.
+    """
+    result = await HazardSearchService(db).search(
+        explain_plan=explain,
+        category=category,
+        min_risk_score=min_risk_score,
+        days=days,
+        company_id=company_id,
+        project_id=project_id,
+        osha_standard=osha_standard,
+        limit=limit
+    )
+    return HazardSearchResponse(
+        items=[HazardSearchResult(**row) for row in result["items"]],
+        analysis_ids=result["analysis_ids"],
+        query_plan=result.get("query_plan")
+    )
+
+
 @router.get("/health")
 async def health_check():
     """Health check for JHA analysis system"""
@@ -11,6 +11,22 @@ class Settings(BaseSettings):
     # Database - Neon (consolidated)
     database_url: str
 
+    # Optional read replica for dashboard/admin reads; reads fall back to
+    # the primary when it is unreachable or lags more than the limit
+    database_read_url: str | None = None
+    replica_max_lag_seconds: float = 10.0
+    replica_check_interval_seconds: float = 5.0
+
+    # Connection pool (PostgreSQL only, applies to each engine)
+    db_pool_size: int = 20
+    db_max_overflow: int = 0
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Replace connections older than this (seconds)
+    db_pool_pre_ping: bool = True
+    # End the request's transaction before long LLM calls so the
+    # connection returns to the pool instead of idling for the pipeline
+    db_release_during_llm: bool = True
+
     # Supabase removed - V2 uses SQLAlchemy only
 
     # External APIs (AT LEAST ONE REQUIRED)
@@ -21,6 +37,42 @@ class Settings(BaseSettings):
     google_maps_api_key: str | None = None
     anthropic_api_key: str | None = None  # Optional - for when LLC account is ready
 
+    # Write-behind analysis persistence: spool for batches the DB could not take
+    analysis_spool_dir: str = "spool"
+
+    # Content-addressed blob store for large payloads: "db" or "filesystem"
+    blob_backend: str = "db"
+    blob_dir: str = "blobs"
+    blob_min_bytes: int = 2048  # Smaller payloads stay inline
+
+    # Monthly partitions of analysis_history / agent_outputs; months older
+    # than the retention window are archived to compressed files (0 = keep)
+    partition_months_ahead: int = 2
+    partition_maintenance_interval_hours: float = 24.0
+    archive_dir: str = "archive"
+    archive_retention_months: int = 12
+
+    # Full agent prompt/response transcripts, appended to local segment files
+    transcript_enabled: bool = True
+    transcript_dir: str = "transcripts"
+    transcript_segment_mb: int = 64
+    transcript_retention_days: float = 30.0
+
+    # Voice updates: rule-based extraction, LLM only when the rules are unsure
+    voice_fast_path_min_confidence: float = 0.8
+    voice_llm_fallback: bool = True
+
+    # Live updates that only change wind/temperature/precipitation/crew
+    # experience are re-scored locally instead of re-running the LLM agents
+    live_update_local_rescoring: bool = True
+
+    # Crew alert WebSockets: per-connection send queue and send timeout
+    # before a slow device is disconnected. Devices are not authenticated
+    # yet, so the endpoint stays closed unless enabled.
+    alert_websocket_enabled: bool = False
+    alert_queue_size: int = 100
+    alert_send_timeout_seconds: float = 5.0
+
     # Security
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:5000"]
 
@@ -1,48 +1,107 @@
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from app.core.config import get_settings
+from app.core.pool_metrics import PoolMetrics, instrumented_pool_class, pool_metrics
 
 settings = get_settings()
 
-# Convert URLs for async drivers
-if settings.database_url.startswith("sqlite://"):
-    DATABASE_URL = settings.database_url.replace("sqlite://", "sqlite+aiosqlite://")
-else:
+def _async_url(url: str) -> str:
+    """Convert URLs for async drivers"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://")
     # Convert postgres:// to postgresql+asyncpg:// and remove sslmode for asyncpg
-    DATABASE_URL = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
-    if "sslmode=" in DATABASE_URL:
-        DATABASE_URL = DATABASE_URL.split("?sslmode=")[0]
+    url = url.replace("postgresql://", "postgresql+asyncpg://")
+    if "sslmode=" in url:
+        url = url.split("?sslmode=")[0]
+    return url
 
-# Create async engine with SQLite-compatible settings
-engine_kwargs = {
-    "echo": settings.debug,
-}
+def _create_engine(url: str, metrics: PoolMetrics):
+    # Create async engine with SQLite-compatible settings
+    engine_kwargs = {
+        "echo": settings.debug,
+    }
 
-# Add pooling only for PostgreSQL, not SQLite
-if not DATABASE_URL.startswith("sqlite"):
-    engine_kwargs.update({
-        "pool_size": 20,
-        "max_overflow": 0,
-        "pool_pre_ping": True,
-    })
+    # Add pooling only for PostgreSQL, not SQLite
+    if not url.startswith("sqlite"):
+        engine_kwargs.update({
+            "poolclass": instrumented_pool_class(metrics),
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+        })
 
-engine = create_async_engine(DATABASE_URL, **engine_kwargs)
+    new_engine = create_async_engine(url, **engine_kwargs)
+    metrics.install(new_engine)
+    return new_engine
+
+def _session_factory(bind):
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+DATABASE_URL = _async_url(settings.database_url)
+engine = _create_engine(DATABASE_URL, pool_metrics)
 
 # Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+AsyncSessionLocal = _session_factory(engine)
+
+# Optional read replica for dashboard/admin reads (see get_read_db)
+READ_DATABASE_URL = _async_url(settings.database_read_url) if settings.database_read_url else None
+read_pool_metrics = PoolMetrics()
+read_engine = _create_engine(READ_DATABASE_URL, read_pool_metrics) if READ_DATABASE_URL else None
+ReadSessionLocal = _session_factory(read_engine) if read_engine is not None else None
+
+def upsert(model):
+    """
+    Dialect-specific INSERT for the configured database.
+
+    Supports .on_conflict_do_update(...) and .returning(...) on both
+    PostgreSQL and SQLite (3.35+).
+    """
+    if DATABASE_URL.startswith("sqlite"):
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+class explain(Executable, ClauseElement):
+    """
+    EXPLAIN for a select, for checking that a query uses its indexes:
+    await db.execute(explain(query))
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+@compiles(explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models"""
     pass
 
-async def get_db() -> AsyncSession:
-    """Dependency to get database session"""
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Request-scoped session: committed when the request succeeds, rolled
+    back if it raises. The connection is taken from the pool on first use.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -51,4 +110,128 @@ async def get_db() -> AsyncSession:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    Commit the session's open transaction so its connection goes back to
+    the pool; the session checks out a new one on next use. Call before
+    awaiting something slow (LLM calls) that does not need the database.
+    """
+    if session.in_transaction():
+        await session.commit()
+
+# Seconds the replica is behind the primary. Zero when it has replayed
+# everything it received (an idle primary makes the replay timestamp age
+# without any real lag).
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() IS NOT NULL
+             AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+async def replica_lag_seconds(session: AsyncSession) -> float:
+    """Replication lag as seen by the replica; 0 for SQLite (no replication)"""
+    if session.bind.dialect.name == "sqlite":
+        await session.execute(text("SELECT 1"))
+        return 0.0
+    result = await session.execute(REPLICA_LAG_QUERY)
+    return float(result.scalar() or 0)
+
+class ReplicaRouter:
+    """
+    Decides whether read-only sessions go to the replica. The replica is
+    used while it answers and its lag is within max_lag_seconds; otherwise
+    reads fall back to the primary. Health is re-checked at most every
+    check_interval seconds, so routing adds no query per request.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker],
+        max_lag_seconds: float,
+        check_interval: float,
+        lag_probe: Callable[[AsyncSession], Awaitable[float]] = replica_lag_seconds
+    ):
+        self.session_factory = session_factory
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._lock = asyncio.Lock()
+        self._checked_at: Optional[float] = None
+        self._healthy = False
+
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    async def _check(self) -> None:
+        try:
+            async with self.session_factory() as session:
+                self.lag_seconds = await self.lag_probe(session)
+            self.last_error = None
+            healthy = self.lag_seconds <= self.max_lag_seconds
+            if not healthy:
+                print(f"⚠️ Read replica {self.lag_seconds:.1f}s behind, reading from primary")
+        except Exception as e:
+            self.lag_seconds = None
+            self.last_error = str(e)[:200]
+            healthy = False
+            print(f"⚠️ Read replica unavailable, reading from primary: {e}")
+        if healthy and not self._healthy and self._checked_at is not None:
+            print("✅ Read replica back within lag limit")
+        self._healthy = healthy
+        self._checked_at = time.monotonic()
+
+    async def use_replica(self) -> bool:
+        """True if the next read-only session should use the replica"""
+        if self.session_factory is None:
+            return False
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+            async with self._lock:
+                # Another request may have refreshed it while we waited
+                if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+                    await self._check()
+        return self._healthy
+
+    async def read_session_factory(self, primary: async_sessionmaker) -> async_sessionmaker:
+        if await self.use_replica():
+            self.replica_reads += 1
+            return self.session_factory
+        self.primary_reads += 1
+        return primary
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": self.session_factory is not None,
+            "using_replica": self._healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads
+        }
+
+replica_router = ReplicaRouter(
+    ReadSessionLocal,
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    check_interval=settings.replica_check_interval_seconds
+)
+
+async def read_session_factory() -> async_sessionmaker:
+    """Session factory for read-only work: the replica when healthy, else the primary"""
+    return await replica_router.read_session_factory(AsyncSessionLocal)
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only endpoints (dashboards, history, analytics).
+    Routed to the read replica when one is configured and within the lag
+    limit. Never committed; don't write through it.
+    """
+    factory = await read_session_factory()
+    async with factory() as session:
+        yield session
@@ -1,11 +1,10 @@
 """Dependency injection for FastAPI routes"""
 
-from typing import AsyncGenerator
 from functools import lru_cache
 from fastapi import Depends
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_db, get_read_db
 from app.agents.registry import AgentRegistry
 from app.core.config import get_settings
 
@@ -25,15 +24,6 @@ def get_agent_registry() -> AgentRegistry:
     })
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Get database session"""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
-
-
 def get_jha_service(
     db: AsyncSession = Depends(get_db),
     registry: AgentRegistry = Depends(get_agent_registry)
@@ -0,0 +1,144 @@
+"""
+Connection Pool Metrics
+
+Instruments the engine's pool so the admin API can show whether requests
+are waiting on the database pool or on the LLM:
+- checked out / overflow / idle connections right now
+- wait time to get a connection (InstrumentedPool times each checkout)
+- how long connections are held between checkout and checkin
+- age of the pool's live connections
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+RECENT_SAMPLES = 1000
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    """avg/p95/max in ms over recent samples (seconds)"""
+    if not samples:
+        return {"avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+    return {
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+class PoolMetrics:
+    """Counters and recent timings for one engine's pool"""
+
+    def __init__(self, recent_samples: int = RECENT_SAMPLES):
+        self.engine = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self._waits: Deque[float] = deque(maxlen=recent_samples)
+        self._holds: Deque[float] = deque(maxlen=recent_samples)
+        self._opened_at: Dict[int, float] = {}
+
+    def install(self, engine) -> None:
+        """Attach to an (async) engine's pool events"""
+        self.engine = target = engine.sync_engine
+
+        @event.listens_for(target, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            self.connections_opened += 1
+            connection_record.info["opened_at"] = time.monotonic()
+            self._opened_at[id(connection_record)] = connection_record.info["opened_at"]
+
+        @event.listens_for(target, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            connection_record.info["checked_out_at"] = time.monotonic()
+
+        @event.listens_for(target, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            checked_out_at = connection_record.info.pop("checked_out_at", None)
+            if checked_out_at is not None:
+                self._holds.append(time.monotonic() - checked_out_at)
+
+        @event.listens_for(target, "close")
+        def _on_close(dbapi_connection, connection_record):
+            self._forget(connection_record)
+
+        @event.listens_for(target, "close_detached")
+        def _on_close_detached(dbapi_connection):
+            self.connections_closed += 1
+
+        @event.listens_for(target, "detach")
+        def _on_detach(dbapi_connection, connection_record):
+            self._opened_at.pop(id(connection_record), None)
+
+    def _forget(self, connection_record) -> None:
+        self.connections_closed += 1
+        self._opened_at.pop(id(connection_record), None)
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        self._waits.append(seconds)
+        if timed_out:
+            self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        # Read through the engine: dispose() replaces the pool object
+        pool = self.engine.pool if self.engine is not None else None
+        now = time.monotonic()
+        ages = [now - opened_at for opened_at in self._opened_at.values()]
+
+        def gauge(name: str) -> Optional[int]:
+            # NullPool/StaticPool (SQLite) do not track these
+            method = getattr(pool, name, None)
+            return method() if callable(method) else None
+
+        return {
+            "pool_class": type(pool).__name__ if pool is not None else None,
+            "size": gauge("size"),
+            "checked_out": gauge("checkedout"),
+            "idle": gauge("checkedin"),
+            "overflow": gauge("overflow"),
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connections_opened": self.connections_opened,
+            "connections_closed": self.connections_closed,
+            "wait": _summary(self._waits),
+            "hold": _summary(self._holds),
+            "connection_age": {
+                "count": len(ages),
+                "avg_s": round(sum(ages) / len(ages), 1) if ages else 0.0,
+                "max_s": round(max(ages), 1) if ages else 0.0
+            }
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long each checkout waited"""
+
+    # Class attribute so it survives pool.recreate()
+    metrics: PoolMetrics = pool_metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> type:
+    """InstrumentedPool subclass reporting to the given metrics (one per engine)"""
+    return type("InstrumentedPool", (InstrumentedPool,), {"metrics": metrics})
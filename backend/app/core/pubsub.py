@@ -0,0 +1,150 @@
+"""
+Cross-worker Notifications
+
+Small publish/subscribe layer used to tell every worker process that
+shared state (such as agent configuration) changed.
+
+- PostgresPubSub: LISTEN/NOTIFY on a dedicated asyncpg connection, so
+  all workers connected to the same database hear each other.
+- LocalPubSub: in-process stand-in for SQLite and single-worker setups.
+
+Callbacks receive the payload string and must be cheap and non-blocking.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+Callback = Callable[[str], None]
+
+RECONNECT_DELAY_SECONDS = 5.0
+
+
+class LocalPubSub:
+    """In-process publish/subscribe"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callback]] = {}
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        for callback in self._subscribers.get(channel, []):
+            callback(payload)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresPubSub(LocalPubSub):
+    """Postgres LISTEN/NOTIFY publish/subscribe"""
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._conn = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def _dispatch(self, connection, pid, channel: str, payload: str) -> None:
+        for callback in self._subscribers.get(channel, []):
+            callback(payload)
+
+    def _on_terminated(self, connection) -> None:
+        self._conn = None
+        if not self._stopping:
+            print("⚠️ Notification connection lost, reconnecting...")
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _connect(self) -> None:
+        conn = await asyncpg.connect(self.dsn)
+        conn.add_termination_listener(self._on_terminated)
+        for channel in self._subscribers:
+            await conn.add_listener(channel, self._dispatch)
+        self._conn = conn
+
+    async def _reconnect(self) -> None:
+        while not self._stopping and not self.connected:
+            try:
+                await self._connect()
+                print("✅ Notification connection restored")
+                # Anything published while disconnected was missed
+                for channel in self._subscribers:
+                    self._dispatch(None, None, channel, "")
+            except Exception as e:
+                print(f"⚠️ Notification reconnect failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        new_channel = channel not in self._subscribers
+        super().subscribe(channel, callback)
+        if new_channel and self.connected:
+            asyncio.ensure_future(self._conn.add_listener(channel, self._dispatch))
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        if self.connected:
+            # Delivered to every listener, including this process
+            await self._conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+        else:
+            await super().publish(channel, payload)
+
+    async def start(self) -> None:
+        self._stopping = False
+        try:
+            await self._connect()
+        except Exception as e:
+            print(f"⚠️ Could not open notification connection: {e}")
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self.connected:
+            await self._conn.close()
+        self._conn = None
+
+
+def _listen_dsn(database_url: str) -> Optional[str]:
+    """Plain libpq-style DSN for asyncpg, or None for non-Postgres databases"""
+    if database_url.startswith("postgres://"):
+        return "postgresql://" + database_url[len("postgres://"):]
+    if database_url.startswith("postgresql+asyncpg://"):
+        return "postgresql://" + database_url[len("postgresql+asyncpg://"):]
+    if database_url.startswith("postgresql://"):
+        return database_url
+    return None
+
+
+_pubsub: Optional[LocalPubSub] = None
+
+
+def get_pubsub() -> LocalPubSub:
+    """Process-wide pub/sub for the configured database"""
+    global _pubsub
+    if _pubsub is None:
+        dsn = _listen_dsn(get_settings().database_url)
+        if dsn and ASYNCPG_AVAILABLE:
+            _pubsub = PostgresPubSub(dsn)
+        else:
+            _pubsub = LocalPubSub()
+    return _pubsub
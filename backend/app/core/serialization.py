@@ -0,0 +1,63 @@
+"""
+Row Serialization
+
+JSON encoding for database rows that must round-trip through files (for
+example the analysis spool). UUIDs, datetimes and Decimals are tagged so
+they come back as the same Python types the models expect.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+_TAGS = {
+    "__uuid__": UUID,
+    "__datetime__": datetime.fromisoformat,
+    "__date__": date.fromisoformat,
+    "__decimal__": Decimal
+}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return {"__uuid__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict) -> Any:
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag in _TAGS and isinstance(value, str):
+            return _TAGS[tag](value)
+    return obj
+
+
+def dumps_row(row: Any) -> str:
+    """Single-line JSON for a row (or list of rows) with typed values tagged"""
+    return json.dumps(row, default=_encode, separators=(",", ":"))
+
+
+def loads_row(line: str) -> Any:
+    """Inverse of dumps_row"""
+    return json.loads(line, object_hook=_decode)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Plain JSON-compatible copy (UUIDs and datetimes as strings) for API and JSONB payloads"""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,352 @@
+"""
+Transcript Log
+
+Append-only store for full agent prompts and raw model responses, kept on
+local disk rather than in Postgres.
+
+Layout under TRANSCRIPT_DIR:
+- segment-00000001.log: records, each
+  [u32 length][u32 crc32][u64 unix ms] followed by `length` bytes of
+  compressed JSON (zstd when available, zlib otherwise; the codec is a
+  1-byte prefix of the payload)
+- segment-00000001.idx: fixed-width sidecar entries
+  [16-byte analysis id][u64 offset][u32 record length], one per record
+
+Writes are queued and appended in batches by a background task (one
+write + fsync per batch). A segment is sealed once it reaches
+TRANSCRIPT_SEGMENT_MB or is a day old, and sealed segments older than
+TRANSCRIPT_RETENTION_DAYS are deleted. Reads by analysis id look up the
+in-memory index (rebuilt from the .idx files at startup) and read records
+through mmap.
+
+At startup the newest segment is trimmed to its last indexed record, so a
+crash mid-batch never leaves a half-written record visible.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import get_settings
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+RECORD_HEADER = struct.Struct("<IIQ")  # length, crc32, unix ms
+INDEX_ENTRY = struct.Struct("<16sQI")  # analysis id, offset, record length (header included)
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+NO_ANALYSIS = UUID(int=0)
+
+MAX_QUEUE_SIZE = 10000
+BATCH_SIZE = 100
+FLUSH_INTERVAL_MS = 200
+SEGMENT_MAX_AGE_SECONDS = 24 * 3600
+MAPPED_SEGMENTS = 8  # Sealed segments kept mmapped for reads
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """Header + codec byte + compressed JSON"""
+    data = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+    if ZSTD_AVAILABLE:
+        payload = CODEC_ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        payload = CODEC_ZLIB + zlib.compress(data, 6)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload), int(time.time() * 1000)) + payload
+
+
+def decode_record(buffer, offset: int) -> Dict[str, Any]:
+    length, crc, _ = RECORD_HEADER.unpack_from(buffer, offset)
+    start = offset + RECORD_HEADER.size
+    payload = bytes(buffer[start:start + length])
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise ValueError(f"Corrupt transcript record at offset {offset}")
+    codec, body = payload[:1], payload[1:]
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read this transcript")
+        data = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        data = zlib.decompress(body)
+    return json.loads(data)
+
+
+class TranscriptLog:
+    """Segmented, append-only transcript store with per-segment offset indexes"""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        segment_max_bytes: Optional[int] = None,
+        retention_days: Optional[float] = None,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS
+    ):
+        settings = get_settings()
+        self.enabled = settings.transcript_enabled
+        self.directory = directory or Path(settings.transcript_dir)
+        self.segment_max_bytes = segment_max_bytes or settings.transcript_segment_mb * 1024 * 1024
+        self.retention_seconds = (retention_days if retention_days is not None else settings.transcript_retention_days) * 86400
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # analysis id -> [(segment number, offset, length)]
+        self._index: Dict[UUID, List[Tuple[int, int, int]]] = {}
+        self._segment: Optional[int] = None
+        self._segment_started = 0.0
+        self._segment_size = 0
+        self._log_file = None
+        self._idx_file = None
+        self._mapped: Dict[int, Tuple[Any, mmap.mmap]] = {}
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    # Paths
+
+    def _log_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:08d}.log"
+
+    def _idx_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:08d}.idx"
+
+    def _segments(self) -> List[int]:
+        return sorted(int(path.stem.split("-")[1]) for path in self.directory.glob("segment-*.log"))
+
+    # Recording
+
+    def record(
+        self,
+        analysis_id: Optional[UUID],
+        agent: str,
+        model: str,
+        prompt: str,
+        response: str,
+        **metadata: Any
+    ) -> None:
+        """Queue one prompt/response pair. Never blocks; drops (and counts) if the queue is full."""
+        if not self.enabled:
+            return
+        self.recorded += 1
+        entry = {
+            "analysis_id": str(analysis_id) if analysis_id else None,
+            "agent": agent,
+            "model": model,
+            "prompt": prompt,
+            "response": response,
+            "recorded_at": time.time(),
+            **metadata
+        }
+        try:
+            self._queue.put_nowait((analysis_id or NO_ANALYSIS, entry))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def start(self) -> None:
+        if self._task is None and self.enabled:
+            await asyncio.to_thread(self._open)
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while not self._queue.empty():
+            await asyncio.to_thread(self._write_batch, self._take(self.batch_size))
+        await asyncio.to_thread(self._close)
+
+    def _take(self, limit: int) -> List[Tuple[UUID, Dict[str, Any]]]:
+        batch = []
+        while not self._queue.empty() and len(batch) < limit:
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while not (self._stopping and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+            await asyncio.sleep(self.flush_interval)
+            batch = [first] + self._take(self.batch_size - 1)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                print(f"⚠️ Transcript write failed, {len(batch)} records lost: {e}")
+
+    # Segment files (blocking; run in a worker thread)
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self._segments()
+        if segments:
+            self._repair(segments[-1])
+        for segment in segments:
+            self._load_index(segment)
+        self._apply_retention()
+        # Always append to a fresh segment; earlier ones are sealed
+        self._rotate((segments[-1] if segments else 0) + 1)
+
+    def _repair(self, segment: int) -> None:
+        """Trim a torn index entry and any records written after the last indexed one"""
+        idx_path, log_path = self._idx_path(segment), self._log_path(segment)
+        idx_size = idx_path.stat().st_size if idx_path.exists() else 0
+        whole = idx_size - idx_size % INDEX_ENTRY.size
+        if whole != idx_size:
+            os.truncate(idx_path, whole)
+        end = 0
+        if whole:
+            with open(idx_path, "rb") as f:
+                f.seek(whole - INDEX_ENTRY.size)
+                _, offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                end = offset + length
+        if log_path.stat().st_size > end:
+            os.truncate(log_path, end)
+
+    def _load_index(self, segment: int) -> None:
+        idx_path = self._idx_path(segment)
+        if not idx_path.exists() or idx_path.stat().st_size < INDEX_ENTRY.size:
+            return
+        with open(idx_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for position in range(0, len(view) - len(view) % INDEX_ENTRY.size, INDEX_ENTRY.size):
+                raw_id, offset, length = INDEX_ENTRY.unpack_from(view, position)
+                self._index.setdefault(UUID(bytes=raw_id), []).append((segment, offset, length))
+
+    def _rotate(self, segment: int) -> None:
+        self._close()
+        self._segment = segment
+        self._log_file = open(self._log_path(segment), "ab")
+        self._idx_file = open(self._idx_path(segment), "ab")
+        self._segment_size = self._log_file.tell()
+        self._segment_started = time.time()
+
+    def _close(self) -> None:
+        for handle in (self._log_file, self._idx_file):
+            if handle is not None:
+                handle.flush()
+                os.fsync(handle.fileno())
+                handle.close()
+        self._log_file = self._idx_file = None
+
+    def _write_batch(self, batch: List[Tuple[UUID, Dict[str, Any]]]) -> None:
+        if not batch:
+            return
+        if self._log_file is None:
+            self._open()
+        if self._segment_size >= self.segment_max_bytes or time.time() - self._segment_started >= SEGMENT_MAX_AGE_SECONDS:
+            self._rotate(self._segment + 1)
+            self._apply_retention()
+
+        records, entries, positions = [], [], []
+        offset = self._segment_size
+        for analysis_id, entry in batch:
+            encoded = encode_record(entry)
+            records.append(encoded)
+            entries.append(INDEX_ENTRY.pack(analysis_id.bytes, offset, len(encoded)))
+            positions.append((analysis_id, offset, len(encoded)))
+            offset += len(encoded)
+
+        # Records first, then their index entries: an entry never points
+        # at bytes that are not on disk
+        self._log_file.write(b"".join(records))
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+        self._idx_file.write(b"".join(entries))
+        self._idx_file.flush()
+        os.fsync(self._idx_file.fileno())
+
+        self._segment_size = offset
+        for analysis_id, position, length in positions:
+            self._index.setdefault(analysis_id, []).append((self._segment, position, length))
+        self.written += len(batch)
+
+    def _apply_retention(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            segment for segment in self._segments()
+            if segment != self._segment and self._log_path(segment).stat().st_mtime < cutoff
+        ]
+        if not expired:
+            return
+        for segment in expired:
+            mapped = self._mapped.pop(segment, None)
+            if mapped:
+                mapped[1].close()
+                mapped[0].close()
+            self._log_path(segment).unlink(missing_ok=True)
+            self._idx_path(segment).unlink(missing_ok=True)
+        gone = set(expired)
+        for analysis_id in list(self._index):
+            kept = [position for position in self._index[analysis_id] if position[0] not in gone]
+            if kept:
+                self._index[analysis_id] = kept
+            else:
+                del self._index[analysis_id]
+        print(f"🧹 Deleted {len(expired)} expired transcript segments")
+
+    # Reads
+
+    def _view(self, segment: int) -> mmap.mmap:
+        """mmap of a segment; sealed ones are cached, the active one is mapped per read"""
+        if segment == self._segment:
+            with open(self._log_path(segment), "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if segment not in self._mapped:
+            if len(self._mapped) >= MAPPED_SEGMENTS:
+                oldest = next(iter(self._mapped))
+                handle, view = self._mapped.pop(oldest)
+                view.close()
+                handle.close()
+            handle = open(self._log_path(segment), "rb")
+            self._mapped[segment] = (handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._mapped[segment][1]
+
+    def _read(self, analysis_id: UUID) -> List[Dict[str, Any]]:
+        records = []
+        for segment, offset, _ in list(self._index.get(analysis_id, [])):
+            view = self._view(segment)
+            try:
+                records.append(decode_record(view, offset))
+            finally:
+                if segment == self._segment:
+                    view.close()
+        return records
+
+    async def read(self, analysis_id: UUID) -> List[Dict[str, Any]]:
+        """All transcripts recorded for an analysis, oldest first"""
+        return await asyncio.to_thread(self._read, analysis_id)
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segments() if self.directory.exists() else []
+        return {
+            "enabled": self.enabled,
+            "segments": len(segments),
+            "active_segment": self._segment,
+            "bytes": sum(self._log_path(segment).stat().st_size for segment in segments),
+            "indexed_analyses": len(self._index),
+            "queued": self._queue.qsize(),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped
+        }
+
+
+transcript_log = TranscriptLog()
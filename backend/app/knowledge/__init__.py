@@ -0,0 +1,15 @@
+from app.knowledge.injury_rates import InjuryRateTable, get_injury_rate_table, osha_data_for_naics
+from app.knowledge.osha_index import OSHAClauseIndex, get_osha_index, retrieve_osha_references
+from app.knowledge.trade_profiles import TradeProfile, TradeProfileRegistry, get_trade_registry
+
+__all__ = [
+    "InjuryRateTable",
+    "get_injury_rate_table",
+    "osha_data_for_naics",
+    "OSHAClauseIndex",
+    "get_osha_index",
+    "retrieve_osha_references",
+    "TradeProfile",
+    "TradeProfileRegistry",
+    "get_trade_registry",
+]
@@ -0,0 +1,3 @@
+from app.knowledge.osha_index import main
+
+main()
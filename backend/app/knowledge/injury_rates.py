@@ -0,0 +1,77 @@
+"""
+BLS Injury Rates
+
+Industry injury-rate baselines keyed by NAICS code, loaded once from
+data/bls_injury_rates.json. Lookups fall back through shorter prefixes, so
+a company filed under 238161 resolves to 238160 (Roofing) if listed,
+otherwise 2381, then 238, then 23.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DATA_DIR = Path(__file__).parent / "data"
+INJURY_RATES_PATH = DATA_DIR / "bls_injury_rates.json"
+
+MIN_PREFIX_LENGTH = 2
+
+
+class InjuryRateTable:
+    """Prefix lookup from NAICS code to the pipeline's osha_data"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data_source = data["data_source"]
+        self.default_naics = data["default_naics"]
+        scale = data["injury_rate_scale"]
+
+        # Prebuilt osha_data per code; lookups hand out copies
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        for code, row in data["industries"].items():
+            name, trc_rate = row[0], row[1]
+            self._rows[code] = {
+                "industryName": name,
+                "naicsCode": code,
+                "injuryRate": round(trc_rate * scale),
+                "totalCases": row[2] if len(row) > 2 else 0,
+                "dataSource": self.data_source
+            }
+
+        if self.default_naics not in self._rows:
+            raise ValueError(f"Default NAICS {self.default_naics} missing from injury rate table")
+
+    @classmethod
+    def load(cls, path: Path = INJURY_RATES_PATH) -> "InjuryRateTable":
+        return cls(json.loads(path.read_text()))
+
+    def lookup(self, naics_code: Optional[str]) -> Dict[str, Any]:
+        """
+        osha_data for the longest listed prefix of naics_code.
+        Unknown or missing codes get the default (NAICS 238) baseline.
+        """
+        digits = "".join(ch for ch in str(naics_code or "") if ch.isdigit())[:6]
+        for length in range(len(digits), MIN_PREFIX_LENGTH - 1, -1):
+            row = self._rows.get(digits[:length])
+            if row is not None:
+                return dict(row)
+        return dict(self._rows[self.default_naics])
+
+
+_table: Optional[InjuryRateTable] = None
+_table_lock = threading.Lock()
+
+
+def get_injury_rate_table() -> InjuryRateTable:
+    """Process-wide table, loaded on first use"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = InjuryRateTable.load()
+    return _table
+
+
+def osha_data_for_naics(naics_code: Optional[str]) -> Dict[str, Any]:
+    """Industry baseline passed to the agents as osha_data"""
+    return get_injury_rate_table().lookup(naics_code)
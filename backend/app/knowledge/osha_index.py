@@ -0,0 +1,255 @@
+"""
+OSHA Clause Retrieval
+
+In-process BM25 index over the OSHA 1926 / Fatal Four reference corpus in
+data/osha_1926_clauses.json. Agents retrieve only the clauses relevant to
+a checklist instead of carrying generic methodology text in every prompt.
+
+The index is prebuilt into two files next to the corpus:
+- osha_1926.postings: (doc_id, term_frequency) uint16 pairs, memory-mapped
+- osha_1926.terms.json: term -> [offset, document_frequency] plus doc stats
+
+The files are rebuilt automatically when the corpus changes. To rebuild
+manually:
+
+    python -m app.knowledge
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import re
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent / "data"
+CORPUS_PATH = DATA_DIR / "osha_1926_clauses.json"
+POSTINGS_PATH = DATA_DIR / "osha_1926.postings"
+TERMS_PATH = DATA_DIR / "osha_1926.terms.json"
+
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query terms from the work type count more than terms from answers
+WORK_TYPE_BOOST = 2.0
+
+MAX_QUERY_CHARS = 8000
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "by", "can", "do", "does", "each", "for",
+    "from", "has", "have", "if", "in", "into", "is", "it", "its", "may", "must", "no", "not", "of",
+    "on", "or", "other", "per", "so", "such", "than", "that", "the", "their", "then", "there",
+    "these", "this", "to", "under", "up", "was", "we", "were", "when", "where", "which", "while",
+    "will", "with", "yes", "na", "none", "all", "any", "our", "being", "used", "use"
+}
+
+_WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words with stopwords removed and plurals folded"""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _corpus_digest(corpus_bytes: bytes) -> str:
+    return hashlib.sha256(corpus_bytes).hexdigest()
+
+
+def build_index(
+    corpus_path: Path = CORPUS_PATH,
+    postings_path: Optional[Path] = POSTINGS_PATH,
+    terms_path: Optional[Path] = TERMS_PATH
+) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Build the BM25 index from the corpus.
+
+    Writes the postings and term dictionary when paths are given and
+    returns (term_dictionary, postings_bytes) either way.
+    """
+    corpus_bytes = corpus_path.read_bytes()
+    clauses = json.loads(corpus_bytes)
+
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    doc_lengths = []
+    for doc_id, clause in enumerate(clauses):
+        tokens = tokenize(" ".join([
+            clause.get("citation", ""),
+            clause.get("title", ""),
+            clause.get("keywords", ""),
+            clause.get("text", "")
+        ]))
+        doc_lengths.append(len(tokens))
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    data = array("H")
+    terms = {}
+    for term in sorted(postings):
+        terms[term] = [len(data) // 2, len(postings[term])]
+        for doc_id, tf in postings[term]:
+            data.extend((doc_id, min(tf, 65535)))
+
+    # Postings are stored little-endian
+    if sys.byteorder == "big":
+        data.byteswap()
+    postings_bytes = data.tobytes()
+
+    term_dictionary = {
+        "version": INDEX_VERSION,
+        "corpus_sha256": _corpus_digest(corpus_bytes),
+        "doc_count": len(clauses),
+        "avgdl": sum(doc_lengths) / max(len(doc_lengths), 1),
+        "doc_lengths": doc_lengths,
+        "terms": terms
+    }
+
+    if postings_path is not None and terms_path is not None:
+        postings_path.write_bytes(postings_bytes)
+        terms_path.write_text(json.dumps(term_dictionary, separators=(",", ":")))
+
+    return term_dictionary, postings_bytes
+
+
+class OSHAClauseIndex:
+    """Read-only BM25 index over the OSHA clause corpus"""
+
+    def __init__(self, clauses: List[Dict[str, Any]], term_dictionary: Dict[str, Any], postings):
+        self.clauses = clauses
+        self.terms: Dict[str, List[int]] = term_dictionary["terms"]
+        self.doc_count: int = term_dictionary["doc_count"]
+        avgdl = term_dictionary["avgdl"] or 1.0
+
+        # Per-document length normalisation, precomputed once
+        self._norms = [K1 * (1 - B + B * dl / avgdl) for dl in term_dictionary["doc_lengths"]]
+        self._idf = {
+            term: math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for term, (_, df) in self.terms.items()
+        }
+        self._postings = postings
+        self._pairs = memoryview(postings).cast("H")
+
+    @classmethod
+    def load(cls) -> "OSHAClauseIndex":
+        """Load the prebuilt index, rebuilding it first if missing or stale"""
+        corpus_bytes = CORPUS_PATH.read_bytes()
+        clauses = json.loads(corpus_bytes)
+
+        term_dictionary = None
+        if TERMS_PATH.exists() and POSTINGS_PATH.exists():
+            term_dictionary = json.loads(TERMS_PATH.read_text())
+            if (term_dictionary.get("version") != INDEX_VERSION
+                    or term_dictionary.get("corpus_sha256") != _corpus_digest(corpus_bytes)):
+                term_dictionary = None
+
+        if term_dictionary is None or sys.byteorder == "big":
+            print("📚 Building OSHA clause index...")
+            try:
+                term_dictionary, postings_bytes = build_index()
+            except OSError as e:
+                # Read-only deployment: keep the index in memory
+                print(f"⚠️ Could not write OSHA index files, using in-memory index: {e}")
+                term_dictionary, postings_bytes = build_index(postings_path=None, terms_path=None)
+            if sys.byteorder == "big":
+                swapped = array("H", postings_bytes)
+                swapped.byteswap()
+                postings_bytes = swapped.tobytes()
+            return cls(clauses, term_dictionary, postings_bytes)
+
+        with open(POSTINGS_PATH, "rb") as f:
+            if POSTINGS_PATH.stat().st_size == 0:
+                return cls(clauses, term_dictionary, b"")
+            postings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(clauses, term_dictionary, postings)
+
+    def search(self, query: str, k: int = 6, boost_query: str = "") -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k clauses for the query; terms in boost_query are weighted higher"""
+        weights: Dict[str, float] = {}
+        for term in tokenize(query[:MAX_QUERY_CHARS]):
+            if term in self.terms:
+                weights[term] = 1.0
+        for term in tokenize(boost_query):
+            if term in self.terms:
+                weights[term] = WORK_TYPE_BOOST
+
+        scores: Dict[int, float] = {}
+        pairs = self._pairs
+        for term, weight in weights.items():
+            offset, df = self.terms[term]
+            idf = self._idf[term] * weight
+            for i in range(offset * 2, (offset + df) * 2, 2):
+                doc_id, tf = pairs[i], pairs[i + 1]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + self._norms[doc_id])
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, self.clauses[doc_id]) for doc_id, score in top]
+
+
+_index: Optional[OSHAClauseIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_osha_index() -> OSHAClauseIndex:
+    """Process-wide index, loaded on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = OSHAClauseIndex.load()
+    return _index
+
+
+def _collect_text(value: Any, parts: List[str]) -> None:
+    """Flatten every string in a checklist payload"""
+    if isinstance(value, str):
+        parts.append(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            parts.append(str(key))
+            _collect_text(item, parts)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_text(item, parts)
+
+
+def retrieve_osha_references(checklist: Dict[str, Any], work_type: str, k: int = 6) -> str:
+    """Format the clauses most relevant to a checklist for prompt injection"""
+    parts: List[str] = []
+    _collect_text(checklist, parts)
+
+    results = get_osha_index().search(" ".join(parts), k=k, boost_query=work_type)
+    if not results:
+        return "- 1926.20(b): Frequent and regular inspections of job sites by competent persons"
+
+    return "\n".join(
+        f"- {clause['citation']} {clause['title']}: {clause['text']}"
+        for _, clause in results
+    )
+
+
+def main() -> None:
+    """Rebuild the prebuilt index files from the corpus"""
+    start = time.perf_counter()
+    term_dictionary, postings_bytes = build_index()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ OSHA clause index built in {elapsed_ms:.1f}ms")
+    print(f"   Clauses: {term_dictionary['doc_count']}")
+    print(f"   Terms: {len(term_dictionary['terms'])}")
+    print(f"   Postings: {len(postings_bytes)} bytes → {POSTINGS_PATH}")
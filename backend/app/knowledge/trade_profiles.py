@@ -0,0 +1,148 @@
+"""
+Trade Profiles
+
+Registry of trade-specific critical fields loaded from
+data/trade_profiles.json. A work type such as "Rooftop solar + electrical
+tie-in" is resolved to every trade it mentions in a single pass of an
+Aho-Corasick automaton built over all trade synonyms, so resolution cost
+depends on the length of the work type, not the number of trades.
+
+Synonyms match at the start of a word and may end mid-word, so "excavat"
+matches "excavation" and "excavating" but "roof" does not match "proof".
+"""
+
+import json
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent / "data"
+TRADE_PROFILES_PATH = DATA_DIR / "trade_profiles.json"
+
+
+class TradeProfile:
+    """Critical fields for one trade"""
+
+    def __init__(self, id: str, heading: str, synonyms: List[str], critical_fields: List[str]):
+        self.id = id
+        self.heading = heading
+        self.synonyms = synonyms
+        self.critical_fields = critical_fields
+
+    def __repr__(self):
+        return f"<TradeProfile(id={self.id})>"
+
+
+class AhoCorasick:
+    """Character-level multi-pattern matcher with word-start boundaries"""
+
+    def __init__(self, patterns: List[Tuple[str, Any]]):
+        # Trie as parallel lists: transitions, failure links, outputs per node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, value in patterns:
+            node = 0
+            for char in pattern.lower():
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].append((len(pattern), value))
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                # Depth-1 nodes fail to the root, never to themselves
+                self._fail[child] = candidate if candidate != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, Any]]:
+        """(start_index, value) for every pattern that starts at a word boundary"""
+        text = text.lower()
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, value in self._out[node]:
+                start = index - length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    matches.append((start, value))
+        return matches
+
+
+class TradeProfileRegistry:
+    """Resolves work types to trade profiles and their critical fields"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.default = TradeProfile(**data["default"])
+        self.trades = [TradeProfile(**trade) for trade in data["trades"]]
+        self._order = {trade.id: position for position, trade in enumerate(self.trades)}
+        self._matcher = AhoCorasick([
+            (synonym, trade) for trade in self.trades for synonym in trade.synonyms
+        ])
+
+    @classmethod
+    def load(cls, path: Path = TRADE_PROFILES_PATH) -> "TradeProfileRegistry":
+        return cls(json.loads(path.read_text()))
+
+    def resolve(self, work_type: str) -> List[TradeProfile]:
+        """
+        Trades mentioned in the work type, in registry order.
+        Falls back to the general construction profile when nothing matches.
+        """
+        found = {trade.id: trade for _, trade in self._matcher.find(work_type or "")}
+        if not found:
+            return [self.default]
+        return sorted(found.values(), key=lambda trade: self._order[trade.id])
+
+    def critical_fields(self, work_type: str) -> List[str]:
+        """Combined, de-duplicated critical fields for every matched trade"""
+        fields: List[str] = []
+        seen = set()
+        for trade in self.resolve(work_type):
+            for field in trade.critical_fields:
+                if field not in seen:
+                    seen.add(field)
+                    fields.append(field)
+        return fields
+
+    def format_critical_fields(self, work_type: str) -> str:
+        """Prompt section listing trade-specific critical fields"""
+        sections = []
+        seen = set()
+        for trade in self.resolve(work_type):
+            fields = [field for field in trade.critical_fields if field not in seen]
+            seen.update(fields)
+            if fields:
+                sections.append(trade.heading + ":\n" + "\n".join(f"   - {field}" for field in fields))
+        return "\n\n   ".join(sections)
+
+
+_registry: Optional[TradeProfileRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_trade_registry() -> TradeProfileRegistry:
+    """Process-wide registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TradeProfileRegistry.load()
+    return _registry
@@ -1,16 +1,78 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.pubsub import get_pubsub
 from app.api.v1.jha import router as jha_router, analyze_checklist
 from app.api.v1.admin import router as admin_router
+from app.api.v1.alerts import router as alerts_router
 from app.schemas.jha import JHAAnalysisRequest
-from app.core.deps import get_jha_service
+from app.core.deps import get_db, get_jha_service
 from app.services.jha_service import JHAService
+from app.services.agent_config_service import AgentConfigService, agent_config_cache
+from app.services.company_cache import company_naics_cache
+from app.services.metrics_sink import metrics_sink
+from app.services.analysis_persister import analysis_persister
+from app.services.partitioning import partition_manager
+from app.core.transcript_log import transcript_log
+from app.services.alert_hub import alert_hub
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Seed defaults and warm process-wide caches before serving requests"""
+    pubsub = get_pubsub()
+    agent_config_cache.attach(pubsub)
+    alert_hub.attach(pubsub)
+    await pubsub.start()
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await AgentConfigService(session).ensure_default_configs_exist()
+        print("⚙️ Agent configurations ready")
+    except Exception as e:
+        # The orchestrator falls back to DEFAULT_AGENT_CONFIGS for missing rows
+        print(f"⚠️ Agent config seeding failed: {e}")
+
+    try:
+        async with AsyncSessionLocal() as session:
+            count = await company_naics_cache.warm(session)
+        print(f"🏭 Cached NAICS codes for {count} companies")
+    except Exception as e:
+        # Analyses still work; companies are loaded on first use instead
+        print(f"⚠️ Company NAICS cache warm-up failed: {e}")
+
+    await metrics_sink.start()
+    await transcript_log.start()
+
+    # Creates upcoming monthly partitions before the persister writes, then
+    # archives expired months daily
+    await partition_manager.start()
+
+    # Analyses spooled while the database was unavailable
+    try:
+        await analysis_persister.replay_spool()
+    except Exception as e:
+        print(f"⚠️ Analysis spool replay failed: {e}")
+    await analysis_persister.start()
+
+    yield
+
+    await partition_manager.stop()
+    # Drain queued analyses and agent metrics before the process exits
+    await analysis_persister.stop()
+    await metrics_sink.stop()
+    await transcript_log.stop()
+    await pubsub.stop()
+
+
 app = FastAPI(
     title=settings.app_name,
+    lifespan=lifespan,
     debug=settings.debug,
     description="Safety Companion API - Python Backend with Multi-Agent JHA Analysis",
     version="2.0.0-python"
@@ -28,6 +90,7 @@ app.add_middleware(
 # Include API routes
 app.include_router(jha_router, prefix="/api/v1")
 app.include_router(admin_router, prefix="/api/v1")
+app.include_router(alerts_router, prefix="/api/v1")
 
 # Legacy compatibility routes for old frontend
 app.include_router(jha_router, prefix="/api", tags=["legacy"])
@@ -64,7 +127,8 @@ async def health_check():
 @app.post("/api/jha-update")
 async def legacy_jha_update(
     request: JHAAnalysisRequest,
+    db: AsyncSession = Depends(get_db),
     jha_service: JHAService = Depends(get_jha_service)
 ):
     """Legacy endpoint for old frontend - redirects to new analyze"""
-    return await analyze_checklist(request, jha_service)
\ No newline at end of file
+    return await analyze_checklist(request, db=db, jha_service=jha_service)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from app.models.base import Base
 from app.models.user import User
-from app.models.analysis import AnalysisHistory, AgentOutput
+from app.models.analysis import AnalysisHistory, AgentOutput, AnalysisHazard
+from app.models.blob import Blob
 from app.models.safety import SafetyReport, RiskAssessment
 from app.models.jha_updates import JHAUpdate  # NEW - replaces ChatMessage
 from app.models.company import Company, Project
@@ -12,6 +13,8 @@ __all__ = [
     "User",
     "AnalysisHistory",
     "AgentOutput",
+    "AnalysisHazard",
+    "Blob",
     "SafetyReport",
     "RiskAssessment",
     "JHAUpdate",  # Purpose-built live updates
@@ -8,7 +8,7 @@ Database model for storing AI agent configurations including:
 - Performance tracking
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -34,6 +34,8 @@ class AgentConfiguration(Base):
     model = Column(String(100), nullable=False)  # "deepseek/deepseek-chat-v3.1:free"
     temperature = Column(Float, default=0.7, nullable=False)  # 0.0 - 1.0
     max_tokens = Column(Integer, default=4000, nullable=False)  # Token limit
+    # "verbose" or "compact"; the server default fills rows written before the column existed
+    output_mode = Column(String(20), default="verbose", server_default="verbose", nullable=False)
 
     # Metadata
     is_active = Column(Boolean, default=True, nullable=False)
@@ -67,6 +69,8 @@ class AgentPerformanceLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     config_id = Column(Integer, ForeignKey("agent_configurations.id"), nullable=False)
+    agent_name = Column(String(50), nullable=True, index=True)  # Denormalized for per-agent queries
+    model = Column(String(100), nullable=True)  # Model that actually served the run
 
     # Execution details
     execution_id = Column(String(50), nullable=False, index=True)  # Links to JHA execution
@@ -91,30 +95,66 @@ class AgentPerformanceLog(Base):
         return f"<AgentPerformanceLog(config_id={self.config_id}, execution_time={self.execution_time_ms}ms)>"
 
 
+class AgentPerformanceHourly(Base):
+    """
+    Hourly rollup of AgentPerformanceLog, maintained incrementally by the
+    metrics sink.
+
+    One row per (hour, agent, model, latency bucket). Latency buckets are
+    logarithmic (see app.services.performance_analytics), so percentiles
+    over any window are computed from a few hundred rows instead of
+    scanning the raw logs.
+    """
+    __tablename__ = "agent_performance_hourly"
+
+    id = Column(Integer, primary_key=True)
+    hour = Column(DateTime, nullable=False)  # executed_at truncated to the hour
+    agent_name = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False, default="")
+    latency_bucket = Column(Integer, nullable=False)
+
+    executions = Column(Integer, default=0, nullable=False)
+    successes = Column(Integer, default=0, nullable=False)
+    total_time_ms = Column(Float, default=0.0, nullable=False)
+    output_tokens = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('hour', 'agent_name', 'model', 'latency_bucket', name='_perf_hourly_bucket'),
+        Index('agent_performance_hourly_agent_hour_idx', 'agent_name', 'hour'),
+    )
+
+    def __repr__(self):
+        return f"<AgentPerformanceHourly(hour={self.hour}, agent={self.agent_name}, bucket={self.latency_bucket})>"
+
+
 # Default configurations for the 4 agents
 DEFAULT_AGENT_CONFIGS = {
     "validator": {
         "model": "deepseek/deepseek-chat-v3.1:free",
         "temperature": 0.3,
         "max_tokens": 3000,
+        "output_mode": "verbose",
         "notes": "Data validation requires precise, consistent responses"
     },
     "risk_assessor": {
         "model": "google/gemini-2.0-flash-exp:free",
         "temperature": 0.7,
         "max_tokens": 4000,
+        "output_mode": "verbose",
         "notes": "Risk assessment benefits from balanced creativity and accuracy"
     },
     "swiss_cheese": {
         "model": "deepseek/deepseek-chat-v3.1:free",
         "temperature": 1.0,
         "max_tokens": 5000,
+        "output_mode": "verbose",
         "notes": "Incident prediction requires high creativity for scenario generation"
     },
     "synthesizer": {
         "model": "google/gemini-2.0-flash-exp:free",
         "temperature": 0.5,
         "max_tokens": 6000,
+        "output_mode": "verbose",
         "notes": "Final synthesis needs structured, comprehensive reporting"
     }
 }
\ No newline at end of file
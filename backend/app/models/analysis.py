@@ -5,20 +5,38 @@ import uuid
 from app.models.base import Base, APP_SCHEMA
 
 class AnalysisHistory(Base):
-    """Analysis history - matches Drizzle analysisHistory table"""
+    """
+    Analysis history - matches Drizzle analysisHistory table.
+
+    Range-partitioned by month on created_at (see
+    app/services/partitioning.py), so the primary key includes created_at
+    and other tables reference analyses by id without a foreign key.
+    """
     __tablename__ = "analysis_history"
     __table_args__ = (
         Index('analysis_history_user_id_idx', 'user_id'),
         Index('analysis_history_type_idx', 'type'),
         Index('analysis_history_risk_score_idx', 'risk_score'),
         Index('analysis_history_created_at_idx', 'created_at'),
-        {'schema': APP_SCHEMA}
+        # Keyset pagination of a user's history; INCLUDE lets list pages
+        # read the small summary columns from the index on Postgres
+        Index(
+            'analysis_history_user_created_id_idx', 'user_id', 'created_at', 'id',
+            postgresql_include=['type', 'risk_score', 'urgency_level']
+        ),
+        # Company/project risk boards filter on these summary columns
+        Index('analysis_history_company_created_idx', 'company_id', 'created_at'),
+        Index('analysis_history_company_decision_created_idx', 'company_id', 'go_no_go_decision', 'created_at'),
+        Index('analysis_history_company_hazard_created_idx', 'company_id', 'top_hazard_category', 'created_at'),
+        Index('analysis_history_project_created_idx', 'project_id', 'created_at'),
+        {'schema': APP_SCHEMA, 'postgresql_partition_by': 'RANGE (created_at)'}
     )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey(f'{APP_SCHEMA}.users.id', ondelete='CASCADE'))
     query = Column(Text, nullable=False)
-    response = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)  # Empty when stored in response_blob
+    response_blob = Column(Text, name="response_blob")  # Blob.hash
     type = Column(Text, nullable=False)
     risk_score = Column(Integer)
     sentiment_score = Column(Integer)
@@ -29,26 +47,66 @@ class AnalysisHistory(Base):
     behavior_indicators = Column(JSONB, name="behavior_indicators")
     compliance_score = Column(Integer, name="compliance_score")
     metadata_json = Column(JSONB, name="metadata")
-    created_at = Column(DateTime(timezone=True), name="created_at", default=datetime.utcnow, nullable=False)
+    # Denormalized from the final report when the analysis is stored; no
+    # foreign keys so an unknown company/project never blocks the write
+    company_id = Column(UUID(as_uuid=True), name="company_id")
+    project_id = Column(UUID(as_uuid=True), name="project_id")
+    go_no_go_decision = Column(Text, name="go_no_go_decision")
+    top_hazard_category = Column(Text, name="top_hazard_category")
+    created_at = Column(DateTime(timezone=True), name="created_at", primary_key=True, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime(timezone=True), name="updated_at", onupdate=datetime.utcnow)
 
 class AgentOutput(Base):
-    """Agent outputs - matches Drizzle agentOutputs table"""
+    """Agent outputs - matches Drizzle agentOutputs table. Partitioned like AnalysisHistory."""
     __tablename__ = "agent_outputs"
     __table_args__ = (
         Index('agent_outputs_analysis_id_idx', 'analysis_id'),
         Index('agent_outputs_agent_type_idx', 'agent_type'),
         Index('agent_outputs_created_at_idx', 'created_at'),
-        {'schema': APP_SCHEMA}
+        {'schema': APP_SCHEMA, 'postgresql_partition_by': 'RANGE (created_at)'}
     )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    analysis_id = Column(UUID(as_uuid=True), ForeignKey(f'{APP_SCHEMA}.analysis_history.id', ondelete='CASCADE'))
+    analysis_id = Column(UUID(as_uuid=True))  # AnalysisHistory.id; no FK into a partitioned table
     agent_id = Column(Text, name="agent_id", nullable=False)
     agent_name = Column(Text, name="agent_name", nullable=False)
     agent_type = Column(Text, name="agent_type", nullable=False)
-    output_data = Column(JSONB, name="output_data", nullable=False)
+    output_data = Column(JSONB, name="output_data", nullable=False)  # {} when stored in output_blob
+    output_blob = Column(Text, name="output_blob")  # Blob.hash
     execution_metadata = Column(JSONB, name="execution_metadata")
     success = Column(Boolean, default=True, nullable=False)
     error_details = Column(Text, name="error_details")
-    created_at = Column(DateTime(timezone=True), name="created_at", default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), name="created_at", primary_key=True, default=datetime.utcnow, nullable=False)
+
+class AnalysisHazard(Base):
+    """
+    Hazards extracted from each analysis's risk assessment, one row per
+    hazard, so cross-analysis searches ("falls scored >= 75 in the last
+    90 days") hit btree indexes instead of scanning output JSON.
+
+    analysis_id / company_id / project_id are copied from the analysis
+    without foreign keys so hazard rows never block the analysis write.
+    Hazard rows are archived and restored with their analysis's month
+    (see app/services/partitioning.py), so searches only return analyses
+    that are online.
+    """
+    __tablename__ = "analysis_hazards"
+    __table_args__ = (
+        Index('analysis_hazards_analysis_id_idx', 'analysis_id'),
+        Index('analysis_hazards_category_created_idx', 'category', 'created_at', 'risk_score'),
+        Index('analysis_hazards_company_created_idx', 'company_id', 'created_at'),
+        Index('analysis_hazards_project_created_idx', 'project_id', 'created_at'),
+        Index('analysis_hazards_osha_standard_idx', 'osha_standard'),
+        {'schema': APP_SCHEMA}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    analysis_id = Column(UUID(as_uuid=True), nullable=False)
+    company_id = Column(UUID(as_uuid=True), name="company_id")
+    project_id = Column(UUID(as_uuid=True), name="project_id")
+    category = Column(Text, nullable=False)
+    name = Column(Text, nullable=False)
+    risk_score = Column(Integer, name="risk_score", nullable=False)
+    risk_level = Column(Text, name="risk_level")
+    osha_standard = Column(Text, name="osha_standard")  # Normalized citation, e.g. "1926.501"
+    created_at = Column(DateTime(timezone=True), name="created_at", default=datetime.utcnow, nullable=False)
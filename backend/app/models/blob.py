@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime, Text, LargeBinary
+from datetime import datetime
+from app.models.base import Base, APP_SCHEMA
+
+class Blob(Base):
+    """
+    Compressed, content-addressed payloads (see app/services/blob_store.py).
+    Rows elsewhere reference a blob by its SHA-256 in a *_blob column, so
+    identical payloads are stored once.
+    """
+    __tablename__ = "blobs"
+    __table_args__ = {'schema': APP_SCHEMA}
+
+    hash = Column(Text, primary_key=True)  # SHA-256 hex of the uncompressed bytes
+    codec = Column(Text, nullable=False)  # 'zstd' or 'zlib'
+    size = Column(Integer, nullable=False)  # Uncompressed bytes
+    stored_size = Column(Integer, name="stored_size", nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), name="created_at", default=datetime.utcnow, nullable=False)
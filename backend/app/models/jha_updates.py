@@ -20,12 +20,9 @@ class JHAUpdate(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
-    # Link to original JHA analysis
-    original_jha_id = Column(
-        UUID(as_uuid=True),
-        ForeignKey(f'{APP_SCHEMA}.analysis_history.id', ondelete='CASCADE'),
-        nullable=False
-    )
+    # Link to original JHA analysis (AnalysisHistory.id; analysis_history is
+    # partitioned, so there is no foreign key)
+    original_jha_id = Column(UUID(as_uuid=True), nullable=False)
     user_id = Column(
         UUID(as_uuid=True),
         ForeignKey(f'{APP_SCHEMA}.users.id', ondelete='CASCADE'),
@@ -68,6 +65,7 @@ class JHAUpdate(Base):
 
     # Analysis metadata
     gemini_response = Column(JSONB, name="gemini_response")  # Full AI analysis for audit
+    gemini_response_blob = Column(Text, name="gemini_response_blob")  # Blob.hash when gemini_response is offloaded
     processing_time_ms = Column(Integer, name="processing_time_ms")
 
     created_at = Column(DateTime(timezone=True), name="created_at", default=datetime.utcnow, nullable=False)
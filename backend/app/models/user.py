@@ -4,6 +4,9 @@ from datetime import datetime
 import uuid
 from app.models.base import Base, APP_SCHEMA
 
+# Owner of every analysis until authentication lands; init_db.py creates it
+PLACEHOLDER_USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000000")
+
 class User(Base):
     """User model - matches Drizzle users table"""
     __tablename__ = "users"
@@ -15,6 +15,7 @@ class AgentConfigBase(BaseModel):
     model: str = Field(..., description="OpenRouter model identifier")
     temperature: float = Field(0.7, ge=0.0, le=1.0, description="Model temperature (0.0-1.0)")
     max_tokens: int = Field(4000, ge=100, le=10000, description="Maximum output tokens")
+    output_mode: str = Field("verbose", pattern="^(verbose|compact)$", description="Output shape: verbose JSON or compact short-key JSON")
     notes: Optional[str] = Field(None, description="Admin notes for this configuration")
 
     @validator('agent_name')
@@ -57,6 +58,7 @@ class AgentConfigUpdate(AgentConfigBase):
     model: Optional[str] = None
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
+    output_mode: Optional[str] = None
 
 
 class AgentConfigResponse(AgentConfigBase):
@@ -127,8 +129,34 @@ class PerformanceMetrics(BaseModel):
     total_executions: int
     avg_execution_time_ms: float
     success_rate: float
-    last_30_days_executions: int
+    last_30_days_executions: int  # Executions in the requested period
     model_performance: Dict[str, Any]
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+
+
+class TokenBudget(BaseModel):
+    """Learned max_tokens budget for one agent/model pair"""
+    agent: str
+    model: str
+    samples: int
+    p50: int
+    p95: int
+    max: int
+    truncations: int
+    learned_max_tokens: Optional[int] = None
+    configured_max_tokens: Optional[int] = None
+    effective_max_tokens: Optional[int] = None
+
+
+class TokenBudgetResponse(BaseModel):
+    """Learned completion budgets for all agents"""
+    budgets: List[TokenBudget]
+    percentile: float
+    margin: float
+    min_samples: int
 
 
 class AgentPerformanceResponse(BaseModel):
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, UUID4, Field
 from datetime import datetime
+from uuid import UUID
 from typing import Optional, Dict, List, Any
 
 # JHA Analysis schemas
@@ -8,6 +9,8 @@ class JHAAnalysisRequest(BaseModel):
     checklist_data: dict  # Master JHA responses with sa-1, sa-2, etc.
     weather_conditions: Optional[dict] = None
     project_data: Optional[dict] = None
+    company_id: Optional[UUID4] = Field(None, description="Company whose NAICS code sets the injury-rate baseline")
+    project_id: Optional[UUID4] = Field(None, description="Project the analysis belongs to (indexed for hazard search)")
 
     class Config:
         json_schema_extra = {
@@ -42,23 +45,29 @@ class JHAAnalysisResponse(BaseModel):
         from_attributes = True
 
 # Live Update schemas
-class JHALiveUpdateRequest(BaseModel):
-    """Request to update existing JHA with field conditions"""
-    original_jha_id: UUID4 = Field(..., description="ID of the JHA being updated")
-    voice_input: str = Field(..., min_length=5, description="Natural language update from field")
-    update_type: Optional[str] = Field(None, pattern="^(environmental|crew|scope|equipment)$")
-
 class ExtractedVariables(BaseModel):
     """Structured variables extracted from voice input"""
     wind_speed: Optional[int] = None
     temperature: Optional[int] = None
     precipitation: Optional[bool] = None
     crew_size: Optional[int] = None
+    crew_experience: Optional[str] = Field(None, pattern="^(expert|experienced|new|unknown)$")
     equipment_changes: Optional[List[str]] = None
     time_of_day: Optional[str] = None
     visibility: Optional[str] = None
     concern_keywords: Optional[List[str]] = None
 
+class JHALiveUpdateRequest(BaseModel):
+    """Request to update existing JHA with field conditions"""
+    original_jha_id: UUID4 = Field(..., description="ID of the JHA being updated")
+    voice_input: str = Field(..., min_length=5, description="Natural language update from field")
+    update_type: Optional[str] = Field(None, pattern="^(environmental|crew|scope|equipment)$")
+    extracted_variables: Optional[ExtractedVariables] = Field(None, description="Structured field changes")
+    changes: Optional[Dict[str, Any]] = Field(
+        None,
+        description='Pipeline context paths to set, e.g. {"weather.windSpeed": 35}; only weather.* and checklist.*'
+    )
+
 class HazardChange(BaseModel):
     """Individual hazard that changed"""
     hazard: str
@@ -68,9 +77,9 @@ class HazardChange(BaseModel):
 
 class JHALiveUpdateResponse(BaseModel):
     """Response from live JHA update"""
-    id: UUID4
-    original_jha_id: UUID4
-    user_id: UUID4
+    id: UUID
+    original_jha_id: UUID
+    user_id: UUID
     voice_input: str
     update_type: Optional[str] = None
 
@@ -90,6 +99,16 @@ class JHALiveUpdateResponse(BaseModel):
     requires_action: bool
     action_required: Optional[str] = None
 
+    project_id: Optional[UUID] = None
+
+    # Incremental re-run
+    changes: Optional[Dict[str, Any]] = None
+    stages_rerun: List[str] = []
+    stages_rescored: List[str] = []  # Re-scored locally by the risk engine
+    stages_reused: List[str] = []
+    go_no_go_decision: Optional[str] = None
+    processing_time_ms: Optional[int] = None
+
     # Status
     acknowledged: bool
     created_at: datetime
@@ -97,6 +116,83 @@ class JHALiveUpdateResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Analysis history schemas
+class AnalysisSummary(BaseModel):
+    """Summary columns of a stored analysis (no report body)"""
+    id: UUID
+    user_id: Optional[UUID] = None
+    query: str
+    type: str
+    risk_score: Optional[int] = None
+    urgency_level: Optional[str] = None
+    safety_categories: Optional[List[str]] = None
+    company_id: Optional[UUID] = None
+    project_id: Optional[UUID] = None
+    go_no_go_decision: Optional[str] = None
+    top_hazard_category: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalysisListResponse(BaseModel):
+    """One page of analyses, newest first"""
+    items: List[AnalysisSummary]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page; null on the last page")
+
+class AgentOutputSummary(BaseModel):
+    """Stored output of one agent in an analysis"""
+    id: UUID
+    agent_id: str
+    agent_name: str
+    agent_type: str
+    success: bool
+    execution_metadata: Optional[Dict[str, Any]] = None
+    error_details: Optional[str] = None
+    output_data: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalysisDetail(AnalysisSummary):
+    """Stored analysis; the report body is served by /analysis/{id}/response"""
+    metadata_json: Optional[Dict[str, Any]] = None
+    response_length: int = 0
+    agent_outputs: Optional[List[AgentOutputSummary]] = None
+
+class RiskBoardResponse(BaseModel):
+    """Company or project risk overview, from indexed summary columns"""
+    company_id: Optional[UUID] = None
+    project_id: Optional[UUID] = None
+    days: int
+    analyses: int
+    avg_risk_score: Optional[float] = None
+    max_risk_score: Optional[int] = None
+    by_decision: Dict[str, int]
+    by_urgency: Dict[str, int]
+    by_top_hazard_category: Dict[str, int]
+    highest_risk: List[AnalysisSummary]
+
+# Hazard search schemas
+class HazardSearchResult(BaseModel):
+    """One indexed hazard from a stored analysis"""
+    analysis_id: UUID
+    category: str
+    name: str
+    risk_score: int
+    risk_level: Optional[str] = None
+    osha_standard: Optional[str] = None
+    company_id: Optional[UUID] = None
+    project_id: Optional[UUID] = None
+    created_at: datetime
+
+class HazardSearchResponse(BaseModel):
+    """Matching hazards (newest first) and the analyses they come from"""
+    items: List[HazardSearchResult]
+    analysis_ids: List[UUID]
+    query_plan: Optional[List[Any]] = Field(None, description="Database plan for the search query (explain=true)")
+
 class JHAUpdateAcknowledge(BaseModel):
     """Schema for acknowledging a JHA update alert"""
     update_id: UUID4
@@ -1,7 +1,25 @@
+from app.services.alert_hub import AlertHub, alert_hub
+from app.services.analysis_persister import AnalysisPersister, analysis_persister
+from app.services.blob_store import BlobStore, blob_store
+from app.services.company_cache import CompanyNaicsCache, company_naics_cache
 from app.services.gemini_service import GeminiService
 from app.services.jha_service import JHAService
+from app.services.metrics_sink import AgentMetricsSink, metrics_sink
+from app.services.voice_extractor import VoiceExtractor, voice_extractor
 
 __all__ = [
+    "AlertHub",
+    "alert_hub",
+    "AnalysisPersister",
+    "analysis_persister",
+    "BlobStore",
+    "blob_store",
+    "CompanyNaicsCache",
+    "company_naics_cache",
     "GeminiService",
     "JHAService",
+    "AgentMetricsSink",
+    "metrics_sink",
+    "VoiceExtractor",
+    "voice_extractor",
 ]
\ No newline at end of file
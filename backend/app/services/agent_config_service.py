@@ -2,13 +2,81 @@
 Agent Configuration Service
 
 Service for retrieving and managing agent configurations from the database.
+
+The orchestrator config is served from a process-local versioned cache.
+Admin writes call agent_config_cache.invalidate(), which bumps the local
+version and notifies other workers over the pub/sub channel; the TTL is a
+backstop for notifications missed while disconnected.
 """
 
-from typing import Dict, Any, Optional
+import copy
+import time
+from typing import Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from app.core.pubsub import LocalPubSub, get_pubsub
 from app.models.agent_config import AgentConfiguration, DEFAULT_AGENT_CONFIGS
 
+AGENT_CONFIG_CHANNEL = "agent_config_changed"
+CONFIG_CACHE_TTL_SECONDS = 300
+
+
+class AgentConfigCache:
+    """Versioned per-user cache of orchestrator configs"""
+
+    def __init__(self, ttl_seconds: float = CONFIG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # user_id -> (version, loaded_at, orchestrator_config)
+        self._entries: Dict[str, Tuple[int, float, Dict[str, Dict[str, Any]]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._global_version = 0
+        self._pubsub: Optional[LocalPubSub] = None
+
+    def version(self, user_id: str) -> int:
+        """Current version; changes whenever the user's configs may have changed"""
+        return self._global_version + self._versions.get(user_id, 0)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        version, loaded_at, config = entry
+        if version != self.version(user_id) or time.monotonic() - loaded_at >= self.ttl_seconds:
+            return None
+        return copy.deepcopy(config)
+
+    def put(self, user_id: str, version: int, config: Dict[str, Dict[str, Any]]) -> None:
+        """Store a config loaded at version; dropped if invalidated meanwhile"""
+        if version == self.version(user_id):
+            self._entries[user_id] = (version, time.monotonic(), copy.deepcopy(config))
+
+    def bump(self, user_id: str = "") -> None:
+        """Invalidate locally; an empty user_id invalidates every user"""
+        if user_id:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+        else:
+            self._global_version += 1
+            self._entries.clear()
+
+    def attach(self, pubsub: LocalPubSub) -> None:
+        """Listen for invalidations published by other workers"""
+        self._pubsub = pubsub
+        pubsub.subscribe(AGENT_CONFIG_CHANNEL, self.bump)
+
+    async def invalidate(self, user_id: str = "") -> None:
+        """Invalidate here and in every other worker"""
+        self.bump(user_id)
+        pubsub = self._pubsub or get_pubsub()
+        try:
+            await pubsub.publish(AGENT_CONFIG_CHANNEL, user_id)
+        except Exception as e:
+            # Other workers pick the change up when their TTL expires
+            print(f"⚠️ Could not publish agent config invalidation: {e}")
+
+
+agent_config_cache = AgentConfigCache()
+
 
 class AgentConfigService:
     """Service for agent configuration management"""
@@ -51,7 +119,19 @@ class AgentConfigService:
         """
         Get orchestrator configuration for all agents.
         Returns configuration in a format suitable for the orchestrator.
+        Served from agent_config_cache; the database is read only on a miss.
         """
+        cached = agent_config_cache.get(self.user_id)
+        if cached is not None:
+            return cached
+
+        version = agent_config_cache.version(self.user_id)
+        orchestrator_config = await self._load_orchestrator_config()
+        agent_config_cache.put(self.user_id, version, orchestrator_config)
+        return orchestrator_config
+
+    async def _load_orchestrator_config(self) -> Dict[str, Dict[str, Any]]:
+        """Build the orchestrator configuration from the database"""
         configs = await self.get_all_agent_configs()
 
         orchestrator_config = {}
@@ -71,6 +151,7 @@ class AgentConfigService:
                     "model": config.model,
                     "temperature": config.temperature,
                     "max_tokens": config.max_tokens,
+                    "output_mode": config.output_mode,
                     "notes": config.notes
                 }
             else:
@@ -81,15 +162,20 @@ class AgentConfigService:
                         "model": default_config["model"],
                         "temperature": default_config["temperature"],
                         "max_tokens": default_config["max_tokens"],
+                        "output_mode": default_config.get("output_mode", "verbose"),
                         "notes": default_config.get("notes", "")
                     }
 
         return orchestrator_config
 
     async def ensure_default_configs_exist(self) -> None:
-        """Ensure default configurations exist in the database"""
+        """
+        Ensure default configurations exist in the database.
+        Called once at startup, not per analysis.
+        """
         existing_configs = await self.get_all_agent_configs()
 
+        created = False
         for agent_name, default_config in DEFAULT_AGENT_CONFIGS.items():
             if agent_name not in existing_configs:
                 # Create default configuration
@@ -99,5 +185,8 @@ class AgentConfigService:
                     **default_config
                 )
                 self.db.add(new_config)
+                created = True
 
-        await self.db.commit()
\ No newline at end of file
+        if created:
+            await self.db.commit()
+            await agent_config_cache.invalidate(self.user_id)
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Crew Alert Hub
+
+Fans JHA update alerts out to devices connected over WebSocket
+(/api/v1/alerts/ws). Devices subscribe to a project and/or a JHA; an alert
+goes to every subscriber of its project and of its original JHA.
+
+Alerts are published on the "jha_alerts" channel of the process pub/sub,
+so with Postgres every worker receives them through LISTEN/NOTIFY and
+delivers to its own connections (LocalPubSub stands in for tests and
+single-worker setups).
+
+Each connection has a bounded send queue. A device that falls
+ALERT_QUEUE_SIZE alerts behind, or takes longer than
+ALERT_SEND_TIMEOUT_SECONDS to accept one, is evicted (closed with 1013,
+try again later) rather than holding up delivery or growing memory; it is
+expected to reconnect and re-read missed updates over REST.
+
+Latency is measured end to end, from publish on the originating worker to
+the completed WebSocket send on the delivering one.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.core.pubsub import LocalPubSub, get_pubsub
+
+ALERT_CHANNEL = "jha_alerts"
+RECENT_SAMPLES = 1000
+
+# Fields sent to devices
+ALERT_FIELDS = (
+    "update_id", "original_jha_id", "project_id", "alert_severity", "crew_alert",
+    "requires_action", "action_required", "previous_risk_score", "updated_risk_score",
+    "risk_delta", "go_no_go_decision", "created_at"
+)
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; the free-text
+# fields are shortened to fit (the full text stays readable over REST)
+MAX_PAYLOAD_BYTES = 7900
+TRUNCATED_FIELDS = ("crew_alert", "action_required")
+TRUNCATION_MARK = "..."
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    """avg/p50/p95/p99/max in ms over recent samples (seconds)"""
+    if not samples:
+        return {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2)
+
+    return {
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+def _truncate(text: str, limit: int) -> Optional[str]:
+    """text cut to at most limit bytes once JSON-escaped, marked when cut"""
+    excess = len(json.dumps(text)) - 2 - limit
+    if excess <= 0:
+        return text
+    # Non-ASCII characters are escaped and take up to 12 bytes each
+    excess += len(TRUNCATION_MARK)
+    keep = len(text)
+    while keep > 0 and excess > 0:
+        keep -= 1
+        excess -= len(json.dumps(text[keep])) - 2
+    return text[:keep] + TRUNCATION_MARK if keep > 0 else None
+
+
+def alert_payload(alert: Dict[str, Any]) -> str:
+    """JSON for an alert, with the free-text fields shortened until it fits a NOTIFY"""
+    payload = json.dumps(alert, default=str)
+    if len(payload.encode("utf-8")) <= MAX_PAYLOAD_BYTES:
+        return payload
+    alert = dict(alert)
+    texts = {name: alert[name] for name in TRUNCATED_FIELDS if isinstance(alert.get(name), str)}
+    alert.update(dict.fromkeys(texts, ""))
+    budget = MAX_PAYLOAD_BYTES - len(json.dumps(alert, default=str).encode("utf-8"))
+    # Shortest first, so what a short field leaves over goes to the longer ones
+    ordered = sorted(texts.items(), key=lambda item: len(json.dumps(item[1])))
+    for i, (name, text) in enumerate(ordered):
+        alert[name] = _truncate(text, max(budget // (len(ordered) - i), 0))
+        budget -= len(json.dumps(alert[name])) - 2
+    return json.dumps(alert, default=str)
+
+
+def alert_topics(alert: Dict[str, Any]) -> List[str]:
+    topics = []
+    if alert.get("original_jha_id"):
+        topics.append(f"jha:{alert['original_jha_id']}")
+    if alert.get("project_id"):
+        topics.append(f"project:{alert['project_id']}")
+    return topics
+
+
+class AlertSubscriber:
+    """One connected device: its topics and bounded send queue"""
+
+    def __init__(self, topics: List[str], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = asyncio.Event()
+        self.delivered = 0
+
+
+class AlertHub:
+    """In-process fan-out of crew alerts with slow-consumer eviction"""
+
+    def __init__(self, queue_size: Optional[int] = None, send_timeout: Optional[float] = None):
+        settings = get_settings()
+        self.queue_size = queue_size or settings.alert_queue_size
+        self.send_timeout = send_timeout or settings.alert_send_timeout_seconds
+        self._pubsub: Optional[LocalPubSub] = None
+        self._topics: Dict[str, Set[AlertSubscriber]] = {}
+
+        self.published = 0
+        self.received = 0
+        self.queued = 0
+        self.delivered = 0
+        self.evictions = 0
+        self._latencies: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+
+    def attach(self, pubsub: LocalPubSub) -> None:
+        """Receive alerts published by any worker"""
+        self._pubsub = pubsub
+        pubsub.subscribe(ALERT_CHANNEL, self._on_message)
+
+    # Publishing
+
+    async def publish(self, update: Dict[str, Any]) -> None:
+        """Send a live update's crew alert to every worker's subscribers"""
+        alert = {field: update.get(field) for field in ALERT_FIELDS}
+        alert["update_id"] = alert["update_id"] or update.get("id")
+        alert["published_at"] = time.time()
+        payload = alert_payload(alert)
+        pubsub = self._pubsub or get_pubsub()
+        try:
+            await pubsub.publish(ALERT_CHANNEL, payload)
+            self.published += 1
+        except Exception as e:
+            print(f"⚠️ Crew alert publish failed: {e}")
+
+    def _on_message(self, payload: str) -> None:
+        # Empty payloads are reconnect notices from the pub/sub layer
+        if not payload:
+            return
+        try:
+            alert = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        self.received += 1
+        self.dispatch(alert)
+
+    def dispatch(self, alert: Dict[str, Any]) -> None:
+        """Queue an alert for local subscribers; evict any whose queue is full"""
+        subscribers: Set[AlertSubscriber] = set()
+        for topic in alert_topics(alert):
+            subscribers |= self._topics.get(topic, set())
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(alert)
+                self.queued += 1
+            except asyncio.QueueFull:
+                self.evict(subscriber)
+
+    # Connections
+
+    def subscribe(self, topics: List[str]) -> AlertSubscriber:
+        subscriber = AlertSubscriber(topics, self.queue_size)
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: AlertSubscriber) -> None:
+        for topic in subscriber.topics:
+            members = self._topics.get(topic)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self._topics[topic]
+
+    def evict(self, subscriber: AlertSubscriber) -> None:
+        """Drop a slow consumer; its connection handler closes the socket"""
+        if subscriber.evicted.is_set():
+            return
+        self.unsubscribe(subscriber)
+        subscriber.evicted.set()
+        self.evictions += 1
+        print(f"⚠️ Evicted slow crew alert subscriber ({', '.join(subscriber.topics)})")
+
+    def record_delivery(self, subscriber: AlertSubscriber, alert: Dict[str, Any]) -> None:
+        subscriber.delivered += 1
+        self.delivered += 1
+        published_at = alert.get("published_at")
+        if published_at:
+            self._latencies.append(max(0.0, time.time() - published_at))
+
+    def stats(self) -> Dict[str, Any]:
+        connections = set()
+        for members in self._topics.values():
+            connections |= members
+        return {
+            "connections": len(connections),
+            "topics": len(self._topics),
+            "published": self.published,
+            "received": self.received,
+            "queued": self.queued,
+            "delivered": self.delivered,
+            "evictions": self.evictions,
+            "queue_size": self.queue_size,
+            "send_timeout_seconds": self.send_timeout,
+            "delivery_latency": _summary(self._latencies)
+        }
+
+
+alert_hub = AlertHub()
@@ -0,0 +1,225 @@
+"""
+Analysis History Service
+
+Read access to stored analyses. Lists use keyset pagination on
+(user_id, created_at, id), served by analysis_history_user_created_id_idx,
+so page N costs the same as page 1. List and detail queries select
+summary columns only; the report body (`response`) is streamed separately
+in chunks when a client asks for it. Report bodies and agent outputs
+offloaded to the blob store are resolved transparently.
+
+Company and project risk boards aggregate the denormalized summary
+columns (go_no_go_decision, top_hazard_category, urgency_level,
+risk_score) through the (company_id, ...) and (project_id, created_at)
+indexes; the JSON report is never parsed.
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.database import read_session_factory
+from app.models.analysis import AgentOutput, AnalysisHistory
+from app.services.blob_store import blob_store
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+RESPONSE_CHUNK_CHARS = 64 * 1024
+RISK_BOARD_TOP_N = 10
+
+SUMMARY_COLUMNS = (
+    AnalysisHistory.id,
+    AnalysisHistory.user_id,
+    AnalysisHistory.query,
+    AnalysisHistory.type,
+    AnalysisHistory.risk_score,
+    AnalysisHistory.urgency_level,
+    AnalysisHistory.safety_categories,
+    AnalysisHistory.company_id,
+    AnalysisHistory.project_id,
+    AnalysisHistory.go_no_go_decision,
+    AnalysisHistory.top_hazard_category,
+    AnalysisHistory.created_at
+)
+
+
+def encode_cursor(created_at: datetime, analysis_id: UUID) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    raw = f"{created_at.isoformat()}|{analysis_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, analysis_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(analysis_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class AnalysisHistoryService:
+    """Queries over AnalysisHistory and AgentOutput"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_for_user(
+        self,
+        user_id: UUID,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        analysis_type: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest-first page of summaries and the cursor for the next page"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        query = select(*SUMMARY_COLUMNS).where(AnalysisHistory.user_id == user_id)
+        if analysis_type:
+            query = query.where(AnalysisHistory.type == analysis_type)
+        if cursor:
+            created_at, analysis_id = decode_cursor(cursor)
+            # Row-value comparison so Postgres turns it into a single index range
+            query = query.where(
+                tuple_(AnalysisHistory.created_at, AnalysisHistory.id) < tuple_(created_at, analysis_id)
+            )
+
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(AnalysisHistory.created_at.desc(), AnalysisHistory.id.desc()).limit(limit + 1)
+        rows = [dict(row) for row in (await self.db.execute(query)).mappings()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def get_detail(self, analysis_id: UUID, include_outputs: bool = False) -> Optional[Dict[str, Any]]:
+        """Summary, metadata and response length; agent outputs on request"""
+        result = await self.db.execute(
+            select(
+                *SUMMARY_COLUMNS,
+                AnalysisHistory.metadata_json,
+                AnalysisHistory.response_blob,
+                func.coalesce(func.length(AnalysisHistory.response), 0).label("response_length")
+            ).where(AnalysisHistory.id == analysis_id)
+        )
+        row = result.mappings().one_or_none()
+        if row is None:
+            return None
+
+        detail = dict(row)
+        response_blob = detail.pop("response_blob")
+        if response_blob:
+            detail["response_length"] = await blob_store.size(self.db, response_blob) or 0
+        if include_outputs:
+            outputs = list((await self.db.execute(
+                select(AgentOutput)
+                .where(AgentOutput.analysis_id == analysis_id)
+                .order_by(AgentOutput.created_at)
+            )).scalars())
+            for output in outputs:
+                if output.output_blob:
+                    # Not a change to the row; keep the session clean
+                    set_committed_value(output, "output_data", await blob_store.get_json(self.db, output.output_blob))
+            detail["agent_outputs"] = outputs
+        return detail
+
+    async def response_source(self, analysis_id: UUID) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        (length, blob hash) of the stored report body - hash None when it
+        is inline - or None if the analysis does not exist
+        """
+        row = (await self.db.execute(
+            select(func.coalesce(func.length(AnalysisHistory.response), 0), AnalysisHistory.response_blob)
+            .where(AnalysisHistory.id == analysis_id)
+        )).one_or_none()
+        if row is None:
+            return None
+        length, response_blob = row
+        if response_blob:
+            length = await blob_store.size(self.db, response_blob) or 0
+        return length, response_blob
+
+    async def risk_board(
+        self,
+        company_id: Optional[UUID] = None,
+        project_id: Optional[UUID] = None,
+        days: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Risk overview for a company or project over the last N days:
+        counts by decision, urgency and top hazard category, average and
+        highest risk score, and the highest-risk analyses.
+        """
+        if company_id is None and project_id is None:
+            raise ValueError("company_id or project_id is required")
+
+        scope = [AnalysisHistory.created_at >= datetime.utcnow() - timedelta(days=days)]
+        if company_id is not None:
+            scope.append(AnalysisHistory.company_id == company_id)
+        if project_id is not None:
+            scope.append(AnalysisHistory.project_id == project_id)
+
+        totals = (await self.db.execute(
+            select(
+                func.count().label("analyses"),
+                func.avg(AnalysisHistory.risk_score).label("avg_risk_score"),
+                func.max(AnalysisHistory.risk_score).label("max_risk_score")
+            ).where(*scope)
+        )).mappings().one()
+
+        board: Dict[str, Any] = {
+            "analyses": totals["analyses"],
+            "avg_risk_score": round(float(totals["avg_risk_score"]), 1) if totals["avg_risk_score"] is not None else None,
+            "max_risk_score": totals["max_risk_score"]
+        }
+        for key, column in (
+            ("by_decision", AnalysisHistory.go_no_go_decision),
+            ("by_urgency", AnalysisHistory.urgency_level),
+            ("by_top_hazard_category", AnalysisHistory.top_hazard_category)
+        ):
+            result = await self.db.execute(
+                select(column, func.count()).where(*scope, column.isnot(None)).group_by(column)
+            )
+            board[key] = dict(sorted(result.all(), key=lambda item: -item[1]))
+
+        highest = await self.db.execute(
+            select(*SUMMARY_COLUMNS)
+            .where(*scope)
+            .order_by(AnalysisHistory.risk_score.desc().nulls_last(), AnalysisHistory.created_at.desc())
+            .limit(RISK_BOARD_TOP_N)
+        )
+        board["highest_risk"] = [dict(row) for row in highest.mappings()]
+        return board
+
+
+async def stream_response(analysis_id: UUID, length: int, blob_hash: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Yield the report body in RESPONSE_CHUNK_CHARS pieces.
+
+    Uses its own (read-routed) session because streaming outlives the
+    request's dependency-scoped session.
+    """
+    factory = await read_session_factory()
+    async with factory() as session:
+        if blob_hash:
+            body = await blob_store.get_text(session, blob_hash)
+            for start in range(0, len(body), RESPONSE_CHUNK_CHARS):
+                yield body[start:start + RESPONSE_CHUNK_CHARS]
+            return
+        for start in range(0, length, RESPONSE_CHUNK_CHARS):
+            result = await session.execute(
+                select(func.substr(AnalysisHistory.response, start + 1, RESPONSE_CHUNK_CHARS))
+                .where(AnalysisHistory.id == analysis_id)
+            )
+            chunk = result.scalar_one_or_none()
+            if not chunk:
+                return
+            yield chunk
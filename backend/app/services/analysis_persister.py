@@ -0,0 +1,324 @@
+"""
+Analysis Persister
+
+Write-behind storage for AnalysisHistory, AgentOutput and AnalysisHazard
+rows. The orchestrator assigns ids client-side and submits the rows
+without waiting; a background task writes batches of analyses with their
+agent outputs and extracted hazards in a single transaction with
+multi-row INSERTs.
+
+Durability guarantees:
+- A submitted analysis is durable once its batch commits or once it is
+  appended (and fsynced) to the spool file.
+- Transient database errors are retried with backoff (RETRY_DELAYS); if
+  the database is still unavailable the batch goes to the spool file.
+  The spool is replayed at startup and by the background writer, after
+  a successful write or, when idle, every SPOOL_REPLAY_INTERVAL.
+- Rows the database rejects outright (constraint or data errors) are
+  moved to <spool>.rejected.jsonl for manual inspection, never retried.
+- Inserts use ON CONFLICT (primary key) DO NOTHING, so replaying a batch
+  that did commit before a crash is harmless.
+- Records still queued in memory are lost only if the process dies
+  without a graceful shutdown; shutdown drains the queue (to the database
+  or the spool). The window is at most FLUSH_INTERVAL_MS plus retries.
+
+Readers that need an analysis right after it was submitted (live
+updates) call wait_written(analysis_id) first; a spooled analysis does
+not count as written until the replay stores it.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, upsert
+from app.core.serialization import dumps_row, loads_row
+from app.services.blob_store import blob_store
+from app.models.analysis import AgentOutput, AnalysisHazard, AnalysisHistory
+
+MAX_QUEUE_SIZE = 1000
+BATCH_SIZE = 50  # Analyses per transaction (keeps multi-row INSERTs under parameter limits)
+FLUSH_INTERVAL_MS = 200
+RETRY_DELAYS = (0.5, 2.0, 5.0)
+WAIT_WRITTEN_TIMEOUT = 10.0  # Seconds; covers the flush interval plus all retries
+SPOOL_REPLAY_INTERVAL = 30.0  # Seconds between replays by the background writer
+
+# Errors that will fail the same way on every retry
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+
+def _uniform(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Give every row the same keys (missing ones as None) for multi-row VALUES"""
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    return [{key: row.get(key) for key in keys} for row in rows]
+
+
+class AnalysisPersister:
+    """Batched, spool-backed writer for analysis records"""
+
+    def __init__(
+        self,
+        spool_path: Optional[Path] = None,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        spool_replay_interval: float = SPOOL_REPLAY_INTERVAL,
+        session_factory=AsyncSessionLocal
+    ):
+        if spool_path is None:
+            spool_path = Path(get_settings().analysis_spool_dir) / "analysis_spool.jsonl"
+        self.spool_path = spool_path
+        self.rejected_path = spool_path.with_suffix(".rejected.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.spool_replay_interval = spool_replay_interval
+        self.session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Analysis id -> future resolved True once stored in the database,
+        # False if rejected or lost; spooled analyses stay pending
+        self._pending: Dict[Any, asyncio.Future] = {}
+
+        self.submitted = 0
+        self.written = 0
+        self.spooled = 0
+        self.rejected = 0
+
+    def submit(
+        self,
+        analysis: Dict[str, Any],
+        outputs: List[Dict[str, Any]],
+        hazards: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Queue one analysis (AnalysisHistory column values, including id)
+        with its AgentOutput and AnalysisHazard rows. Every analysis dict
+        must have the same keys (likewise the outputs and hazards) since
+        batches use multi-row VALUES. Never blocks; spools if the queue is full.
+        """
+        record = {"analysis": analysis, "outputs": outputs, "hazards": hazards or []}
+        self.submitted += 1
+        self._pending[analysis["id"]] = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            print("⚠️ Analysis persister queue full, spooling to disk")
+            self._spool([record])
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write or spool everything still queued"""
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while not self._queue.empty():
+            await self._write_with_retry(self._take(self.batch_size))
+
+    async def wait_written(self, analysis_id: Any, timeout: float = WAIT_WRITTEN_TIMEOUT) -> bool:
+        """
+        Wait until a submitted analysis is stored in the database. Writes
+        the queue (and replays the spool) directly when no writer task is
+        running. False if it was rejected, or is still queued or spooled
+        after timeout.
+        """
+        written = self._pending.get(analysis_id)
+        if written is None:
+            return True
+        if self._task is None:
+            while not written.done() and not self._queue.empty():
+                await self._write_with_retry(self._take(self.batch_size))
+            if not written.done() and self.spool_path.exists():
+                await self.replay_spool()
+        try:
+            return await asyncio.wait_for(asyncio.shield(written), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Analysis {analysis_id} not written after {timeout}s (queued or spooled)")
+            return False
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while not self._queue.empty() and len(batch) < limit:
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_replay = loop.time() + self.spool_replay_interval
+        while not (self._stopping and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                first = None
+            if first is not None:
+                # Let concurrent requests land in the same transaction
+                await asyncio.sleep(self.flush_interval)
+                batch = [first] + self._take(self.batch_size - 1)
+                if not await self._write_with_retry(batch):
+                    continue  # Database still down; leave the spool alone
+                replay_due = True  # The database is reachable again
+            else:
+                replay_due = loop.time() >= next_replay
+
+            if replay_due and not self._stopping and self._spool_exists():
+                next_replay = loop.time() + self.spool_replay_interval
+                try:
+                    await self.replay_spool()
+                except Exception as e:
+                    print(f"⚠️ Analysis spool replay failed: {e}")
+
+    def _spool_exists(self) -> bool:
+        return self.spool_path.exists() or self.spool_path.with_suffix(".replaying.jsonl").exists()
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        """One transaction: blobs, then all analyses, agent outputs and hazards"""
+        # Spooled records may predate newer columns
+        analyses = _uniform([record["analysis"] for record in batch])
+        outputs = [row for record in batch for row in record["outputs"]]
+        # Records spooled before hazards were indexed have no "hazards" key
+        hazards = [row for record in batch for row in record.get("hazards", [])]
+        async with self.session_factory() as session:
+            # Large report bodies and agent outputs go to the blob store
+            # (same transaction for the db backend); rows keep the hash
+            analyses = await blob_store.offload(session, analyses, "response", "response_blob", text=True)
+            outputs = await blob_store.offload(session, outputs, "output_data", "output_blob")
+            await session.execute(
+                upsert(AnalysisHistory).values(analyses).on_conflict_do_nothing(index_elements=["id", "created_at"])
+            )
+            if outputs:
+                await session.execute(
+                    upsert(AgentOutput).values(outputs).on_conflict_do_nothing(index_elements=["id", "created_at"])
+                )
+            if hazards:
+                await session.execute(
+                    upsert(AnalysisHazard).values(hazards).on_conflict_do_nothing(index_elements=["id"])
+                )
+            await session.commit()
+
+    async def _write_with_retry(self, batch: List[Dict[str, Any]]) -> bool:
+        """Write a batch; True if it reached the database (possibly minus rejected rows)"""
+        try:
+            return await self._write_batch(batch)
+        except BaseException:
+            # Cancelled mid-write: nobody will resolve these now
+            for record in batch:
+                self._resolve(record, False)
+            raise
+
+    def _resolve(self, record: Dict[str, Any], written: bool) -> None:
+        """Wake wait_written() callers for a record that is written, rejected or lost"""
+        future = self._pending.pop(record["analysis"].get("id"), None)
+        if future is not None and not future.done():
+            future.set_result(written)
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> bool:
+        if not batch:
+            return True
+        for attempt, delay in enumerate((0.0,) + RETRY_DELAYS):
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                await self._insert(batch)
+                self.written += len(batch)
+                for record in batch:
+                    self._resolve(record, True)
+                return True
+            except PERMANENT_ERRORS as e:
+                print(f"⚠️ Analysis batch rejected ({e.__class__.__name__}), isolating bad records")
+                await self._insert_individually(batch)
+                return True
+            except Exception as e:
+                print(f"⚠️ Analysis batch write failed (attempt {attempt + 1}/{len(RETRY_DELAYS) + 1}): {e}")
+
+        self._spool(batch)
+        return False
+
+    async def _insert_individually(self, batch: List[Dict[str, Any]]) -> None:
+        for record in batch:
+            try:
+                await self._insert([record])
+                self.written += 1
+                self._resolve(record, True)
+            except PERMANENT_ERRORS as e:
+                self._append(self.rejected_path, [{**record, "error": str(e)[:500]}])
+                self.rejected += 1
+                self._resolve(record, False)
+            except Exception:
+                self._spool([record])
+
+    def _append(self, path: Path, records: List[Dict[str, Any]]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(dumps_row(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _spool(self, records: List[Dict[str, Any]]) -> None:
+        try:
+            self._append(self.spool_path, records)
+            self.spooled += len(records)
+        except OSError as e:
+            print(f"❌ Could not spool {len(records)} analyses, records lost: {e}")
+            for record in records:
+                self._resolve(record, False)
+
+    async def replay_spool(self) -> int:
+        """
+        Re-submit spooled analyses to the database. Called at startup and
+        by the background writer. Returns the number written; records that still fail are re-spooled.
+        """
+        replay_path = self.spool_path.with_suffix(".replaying.jsonl")
+        replayed = 0
+
+        # A replay interrupted by a crash is finished first
+        if replay_path.exists():
+            replayed += await self._replay_file(replay_path)
+        if self.spool_path.exists():
+            # Claim the spool so failures during replay go to a fresh file
+            os.replace(self.spool_path, replay_path)
+            replayed += await self._replay_file(replay_path)
+        return replayed
+
+    async def _replay_file(self, path: Path) -> int:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(loads_row(line))
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    print(f"⚠️ Skipping unreadable spool line {line_number}")
+
+        written_before = self.written
+        for start in range(0, len(records), self.batch_size):
+            await self._write_with_retry(records[start:start + self.batch_size])
+
+        path.unlink()
+        replayed = self.written - written_before
+        if records:
+            print(f"📼 Replayed {replayed}/{len(records)} spooled analyses")
+        return replayed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "spooled": self.spooled,
+            "rejected": self.rejected
+        }
+
+
+analysis_persister = AnalysisPersister()
@@ -0,0 +1,226 @@
+"""
+Blob Store
+
+Content-addressed, compressed storage for large payloads (final reports,
+agent outputs, raw model responses). A payload is keyed by the SHA-256 of
+its bytes - JSON is serialized canonically (sorted keys) first - so
+identical payloads, such as the validator output for a repeated
+checklist, are stored once. Rows keep only the hash in a *_blob column.
+
+Payloads are compressed with zstd when `zstandard` is installed, zlib
+otherwise; the codec is recorded per blob so both can be read back.
+
+Backends (BLOB_BACKEND):
+- "db": the blobs table (INSERT ... ON CONFLICT DO NOTHING), written in
+  the caller's transaction
+- "filesystem": <BLOB_DIR>/ab/<hash>.<ext>, written atomically before the
+  caller commits; a rolled-back transaction can leave an unreferenced
+  file, which is harmless
+
+Payloads smaller than BLOB_MIN_BYTES stay inline. Blobs are immutable and
+may be shared by many rows, so the application never deletes them.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import upsert
+from app.models.blob import Blob
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+CODEC_EXTENSIONS = {"zstd": ".zst", "zlib": ".zz"}
+
+
+def encode_json(value: Any) -> bytes:
+    """Canonical JSON bytes, so equal values hash the same"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read zstd blobs")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+def pack(data: bytes) -> Dict[str, Any]:
+    """Blob row for some bytes: hash, codec, sizes and compressed data"""
+    codec, stored = compress(data)
+    return {
+        "hash": hashlib.sha256(data).hexdigest(),
+        "codec": codec,
+        "size": len(data),
+        "stored_size": len(stored),
+        "data": stored
+    }
+
+
+class BlobStore:
+    """Content-addressed payload storage in the database or on disk"""
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        root: Optional[Path] = None,
+        min_bytes: Optional[int] = None
+    ):
+        settings = get_settings()
+        self.backend = backend or settings.blob_backend
+        if self.backend not in ("db", "filesystem"):
+            raise ValueError(f"Unknown blob backend: {self.backend}")
+        self.root = root or Path(settings.blob_dir)
+        self.min_bytes = settings.blob_min_bytes if min_bytes is None else min_bytes
+
+        self.blobs_written = 0
+        self.dedup_hits = 0
+        self.bytes_in = 0
+        self.bytes_stored = 0
+
+    # Filesystem backend
+
+    def _path(self, blob_hash: str, codec: str) -> Path:
+        return self.root / blob_hash[:2] / f"{blob_hash}{CODEC_EXTENSIONS[codec]}"
+
+    def _write_files(self, blobs: List[Dict[str, Any]]) -> int:
+        written = 0
+        for blob in blobs:
+            path = self._path(blob["hash"], blob["codec"])
+            if path.exists():
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(blob["data"])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            written += 1
+        return written
+
+    def _read_file(self, blob_hash: str) -> Optional[bytes]:
+        for codec in CODEC_EXTENSIONS:
+            path = self._path(blob_hash, codec)
+            if path.exists():
+                return decompress(codec, path.read_bytes())
+        return None
+
+    # Writes
+
+    async def put_many(self, session: AsyncSession, blobs: List[Dict[str, Any]]) -> None:
+        """Store packed blobs; ones that already exist are skipped"""
+        unique = list({blob["hash"]: blob for blob in blobs}.values())
+        if not unique:
+            return
+        if self.backend == "filesystem":
+            written = await asyncio.to_thread(self._write_files, unique)
+        else:
+            result = await session.execute(
+                upsert(Blob).values(unique).on_conflict_do_nothing(index_elements=["hash"]).returning(Blob.hash)
+            )
+            written = len(result.all())
+
+        self.blobs_written += written
+        self.dedup_hits += len(blobs) - written
+        self.bytes_in += sum(blob["size"] for blob in unique)
+        self.bytes_stored += sum(blob["stored_size"] for blob in unique)
+
+    async def offload(
+        self,
+        session: AsyncSession,
+        rows: List[Dict[str, Any]],
+        column: str,
+        blob_column: str,
+        text: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Copies of rows with large `column` payloads moved to blobs: the
+        blob hash goes in `blob_column` and `column` gets an empty
+        placeholder ("" for text, {} for JSON). Every copy has
+        `blob_column` set (None when inline) so rows stay uniform.
+        """
+        def encode() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+            copies, blobs = [], []
+            for row in rows:
+                copy = {**row, blob_column: None}
+                value = row.get(column)
+                if value is not None:
+                    data = value.encode("utf-8") if text else encode_json(value)
+                    if len(data) >= self.min_bytes:
+                        blob = pack(data)
+                        blobs.append(blob)
+                        copy[blob_column] = blob["hash"]
+                        copy[column] = "" if text else {}
+                copies.append(copy)
+            return copies, blobs
+
+        # Hashing and compression run off the event loop
+        copies, blobs = await asyncio.to_thread(encode)
+        await self.put_many(session, blobs)
+        return copies
+
+    # Reads
+
+    async def get(self, session: AsyncSession, blob_hash: str) -> bytes:
+        if self.backend == "filesystem":
+            data = await asyncio.to_thread(self._read_file, blob_hash)
+        else:
+            row = (await session.execute(
+                select(Blob.codec, Blob.data).where(Blob.hash == blob_hash)
+            )).one_or_none()
+            data = await asyncio.to_thread(decompress, row.codec, row.data) if row else None
+        if data is None:
+            raise KeyError(f"Blob {blob_hash} not found")
+        return data
+
+    async def get_text(self, session: AsyncSession, blob_hash: str) -> str:
+        return (await self.get(session, blob_hash)).decode("utf-8")
+
+    async def get_json(self, session: AsyncSession, blob_hash: str) -> Any:
+        return json.loads(await self.get(session, blob_hash))
+
+    async def size(self, session: AsyncSession, blob_hash: str) -> Optional[int]:
+        """Uncompressed size in bytes, or None if the blob does not exist"""
+        if self.backend == "filesystem":
+            try:
+                return len(await self.get(session, blob_hash))
+            except KeyError:
+                return None
+        return (await session.execute(select(Blob.size).where(Blob.hash == blob_hash))).scalar_one_or_none()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "codec": "zstd" if ZSTD_AVAILABLE else "zlib",
+            "blobs_written": self.blobs_written,
+            "dedup_hits": self.dedup_hits,
+            "bytes_in": self.bytes_in,
+            "bytes_stored": self.bytes_stored
+        }
+
+
+blob_store = BlobStore()
@@ -0,0 +1,82 @@
+"""
+Company NAICS Cache
+
+Process-wide cache of company_id -> NAICS code so the orchestrator can pick
+the right industry injury-rate baseline without a database round-trip per
+analysis. The cache is warmed with every company at startup; companies
+created afterwards are loaded on first use and refreshed after the TTL.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.company import Company
+
+DEFAULT_TTL_SECONDS = 15 * 60
+
+
+class CompanyNaicsCache:
+    """TTL cache of company NAICS codes"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # company_id -> (naics_code or None, loaded_at)
+        self._entries: Dict[UUID, Tuple[Optional[str], float]] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, company_id: UUID) -> Optional[Tuple[Optional[str], float]]:
+        entry = self._entries.get(company_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry
+        return None
+
+    async def warm(self, db: AsyncSession) -> int:
+        """Load every company's NAICS code in one query"""
+        result = await db.execute(select(Company.id, Company.naics_code))
+        now = time.monotonic()
+        rows = result.all()
+        self._entries = {company_id: (naics_code, now) for company_id, naics_code in rows}
+        return len(rows)
+
+    async def get(self, db: AsyncSession, company_id: Optional[UUID]) -> Optional[str]:
+        """NAICS code for the company, or None if unknown or unset"""
+        if company_id is None:
+            return None
+
+        entry = self._fresh(company_id)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+
+        async with self._lock:
+            # Another request may have loaded it while we waited
+            entry = self._fresh(company_id)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            result = await db.execute(
+                select(Company.naics_code).where(Company.id == company_id)
+            )
+            # Unknown companies are cached as None too, until the TTL expires
+            naics_code = result.scalar_one_or_none()
+            self._entries[company_id] = (naics_code, time.monotonic())
+            return naics_code
+
+    def invalidate(self, company_id: Optional[UUID] = None) -> None:
+        """Drop one company, or everything when company_id is None"""
+        if company_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(company_id, None)
+
+
+company_naics_cache = CompanyNaicsCache()
@@ -0,0 +1,129 @@
+"""
+Hazard Index
+
+Normalizes the hazards in each risk assessment into analysis_hazards rows
+as analyses are stored, and searches them across analyses.
+
+Search filters map onto the table's indexes:
+- category + days (+ min_risk_score) -> (category, created_at, risk_score)
+- company_id + days                 -> (company_id, created_at)
+- project_id + days                 -> (project_id, created_at)
+- osha_standard                     -> (osha_standard)
+Pass explain=True to get the database's plan for the exact query run.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import explain
+from app.models.analysis import AnalysisHazard
+
+DEFAULT_SEARCH_LIMIT = 100
+MAX_SEARCH_LIMIT = 1000
+
+_OSHA_CITATION = re.compile(r"\b(19(?:10|26))\.(\d+)")
+
+
+def normalize_osha_standard(text: Optional[str]) -> Optional[str]:
+    """First OSHA part/section citation in the text, e.g. '1926.501(b)(1)' -> '1926.501'"""
+    if not text:
+        return None
+    match = _OSHA_CITATION.search(text)
+    return f"{match.group(1)}.{match.group(2)}" if match else None
+
+
+def extract_hazard_rows(
+    analysis_id: UUID,
+    risk_data: Dict[str, Any],
+    created_at: datetime,
+    company_id: Optional[UUID] = None,
+    project_id: Optional[UUID] = None
+) -> List[Dict[str, Any]]:
+    """analysis_hazards rows for the hazards in a risk assessment"""
+    rows = []
+    for hazard in risk_data.get("hazards", []) or []:
+        if not isinstance(hazard, dict):
+            continue
+        try:
+            risk_score = int(hazard.get("riskScore") or 0)
+        except (TypeError, ValueError):
+            risk_score = 0
+        rows.append({
+            "id": uuid4(),
+            "analysis_id": analysis_id,
+            "company_id": company_id,
+            "project_id": project_id,
+            "category": hazard.get("category") or "Other",
+            "name": str(hazard.get("name") or "Unnamed hazard")[:500],
+            "risk_score": risk_score,
+            "risk_level": hazard.get("riskLevel"),
+            "osha_standard": normalize_osha_standard(
+                hazard.get("regulatoryRequirement") or hazard.get("oshaContext")
+            ),
+            "created_at": created_at
+        })
+    return rows
+
+
+class HazardSearchService:
+    """Indexed search over analysis_hazards"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def build_query(
+        self,
+        category: Optional[str] = None,
+        min_risk_score: Optional[int] = None,
+        days: Optional[int] = None,
+        company_id: Optional[UUID] = None,
+        project_id: Optional[UUID] = None,
+        osha_standard: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT
+    ):
+        hazard = AnalysisHazard
+        query = select(
+            hazard.analysis_id,
+            hazard.category,
+            hazard.name,
+            hazard.risk_score,
+            hazard.risk_level,
+            hazard.osha_standard,
+            hazard.company_id,
+            hazard.project_id,
+            hazard.created_at
+        )
+        if category:
+            query = query.where(hazard.category == category)
+        if min_risk_score is not None:
+            query = query.where(hazard.risk_score >= min_risk_score)
+        if days:
+            query = query.where(hazard.created_at >= datetime.utcnow() - timedelta(days=days))
+        if company_id:
+            query = query.where(hazard.company_id == company_id)
+        if project_id:
+            query = query.where(hazard.project_id == project_id)
+        if osha_standard:
+            query = query.where(hazard.osha_standard == (normalize_osha_standard(osha_standard) or osha_standard))
+
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        return query.order_by(hazard.created_at.desc()).limit(limit)
+
+    async def search(self, explain_plan: bool = False, **filters) -> Dict[str, Any]:
+        """Matching hazards (newest first), the distinct analyses, and optionally the plan"""
+        query = self.build_query(**filters)
+        rows = [dict(row) for row in (await self.db.execute(query)).mappings()]
+
+        result: Dict[str, Any] = {
+            "items": rows,
+            "analysis_ids": list(dict.fromkeys(row["analysis_id"] for row in rows))
+        }
+        if explain_plan:
+            plan = await self.db.execute(explain(query))
+            result["query_plan"] = [list(row) for row in plan.all()]
+        return result
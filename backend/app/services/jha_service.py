@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.agents.orchestrator import JHAOrchestrator
 from app.agents.registry import AgentRegistry
+from app.services.alert_hub import alert_hub
 from app.schemas.jha import JHAAnalysisRequest, JHAAnalysisResponse, JHALiveUpdateRequest, JHALiveUpdateResponse
 
 
@@ -42,15 +43,24 @@ class JHAService:
     async def live_update(
         self,
         analysis_id: UUID,
-        update_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
+        update_data: Dict[str, Any],
+        user_id: UUID
+    ) -> JHALiveUpdateResponse:
         """
         Update existing JHA with new conditions (e.g., weather changes).
 
-        Re-runs Agent 2 (Risk) and Agent 3 (Swiss Cheese) only.
+        Re-runs only the agents whose inputs the change touches. The
+        response is validated before the update is stored, and crew
+        alerts are pushed to subscribed devices only once it is.
         """
 
-        return await self.orchestrator.execute_live_update(
+        update = await self.orchestrator.execute_live_update(
             analysis_id=analysis_id,
-            update_data=update_data
-        )
\ No newline at end of file
+            update_data=update_data,
+            user_id=user_id
+        )
+        response = JHALiveUpdateResponse(**update)
+        await self.db.commit()
+        if update.get("crew_alert"):
+            await alert_hub.publish(update)
+        return response
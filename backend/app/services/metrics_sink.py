@@ -0,0 +1,216 @@
+"""
+Agent Metrics Sink
+
+Records agent executions off the request path. The orchestrator enqueues
+one record per agent run (never blocking); a background task flushes them
+every FLUSH_INTERVAL_MS or BATCH_SIZE records, whichever comes first:
+
+- one executemany INSERT into agent_performance_logs
+- one upsert adding the batch to the agent_performance_hourly rollup
+- one UPDATE folding the batch into AgentConfiguration.total_executions,
+  avg_execution_time_ms and last_used_at
+
+The queue is bounded; when it is full new records are dropped and counted
+rather than growing memory. Pending records are drained on shutdown.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, update
+
+from app.core.database import AsyncSessionLocal
+from app.models.agent_config import AgentConfiguration, AgentPerformanceLog
+from app.services.performance_analytics import hourly_rollup_rows, upsert_hourly_rollup
+
+MAX_QUEUE_SIZE = 10000
+BATCH_SIZE = 200
+FLUSH_INTERVAL_MS = 500
+
+
+class AgentMetricsSink:
+    """Bounded, batched writer for agent execution metrics"""
+
+    def __init__(
+        self,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        session_factory=AsyncSessionLocal
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # (user_id, agent_name) -> AgentConfiguration.id
+        self._config_ids: Dict[Tuple[str, str], int] = {}
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def record(
+        self,
+        agent_name: str,
+        execution_id: str,
+        execution_time_ms: float,
+        token_usage: Optional[Dict[str, int]],
+        success: bool,
+        model: Optional[str] = None,
+        error: Optional[str] = None,
+        user_id: str = "admin"
+    ) -> bool:
+        """
+        Enqueue one agent execution. agent_name is the AgentConfiguration
+        name (validator, risk_assessor, ...). Returns False if dropped.
+        """
+        token_usage = token_usage or {}
+        try:
+            self._queue.put_nowait({
+                "user_id": user_id,
+                "agent_name": agent_name,
+                "model": model,
+                "execution_id": execution_id,
+                "execution_time_ms": float(execution_time_ms),
+                "token_usage_input": token_usage.get("prompt_tokens"),
+                "token_usage_output": token_usage.get("completion_tokens"),
+                "token_usage_total": token_usage.get("total_tokens"),
+                "success": success,
+                "error_message": error[:2000] if error else None,
+                "executed_at": datetime.utcnow()
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.recorded += 1
+        return True
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background task"""
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while not self._queue.empty():
+            await self._flush(self._take_all())
+
+    def _take_all(self) -> List[Dict[str, Any]]:
+        batch = []
+        while not self._queue.empty() and len(batch) < self.batch_size:
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for the first record, then collect until full or the interval ends"""
+        batch: List[Dict[str, Any]] = []
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                if batch or self._stopping:
+                    break
+                continue
+            if deadline is None:
+                deadline = loop.time() + self.flush_interval
+        return batch
+
+    async def _run(self) -> None:
+        while not (self._stopping and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _resolve_config_ids(self, session, batch: List[Dict[str, Any]]) -> None:
+        missing = {(r["user_id"], r["agent_name"]) for r in batch} - self._config_ids.keys()
+        if not missing:
+            return
+        result = await session.execute(
+            select(AgentConfiguration.id, AgentConfiguration.user_id, AgentConfiguration.agent_name)
+            .where(AgentConfiguration.user_id.in_({user_id for user_id, _ in missing}))
+        )
+        for config_id, user_id, agent_name in result:
+            self._config_ids[(user_id, agent_name)] = config_id
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            async with self.session_factory() as session:
+                await self._resolve_config_ids(session, batch)
+
+                rows = []
+                totals: Dict[int, List[float]] = {}  # config_id -> [count, sum_ms, last_used]
+                for record in batch:
+                    config_id = self._config_ids.get((record["user_id"], record["agent_name"]))
+                    if config_id is None:
+                        continue
+                    rows.append({
+                        "config_id": config_id,
+                        **{k: v for k, v in record.items() if k != "user_id"}
+                    })
+                    entry = totals.setdefault(config_id, [0, 0.0, record["executed_at"]])
+                    entry[0] += 1
+                    entry[1] += record["execution_time_ms"]
+                    entry[2] = max(entry[2], record["executed_at"])
+
+                skipped = len(batch) - len(rows)
+                if skipped:
+                    print(f"⚠️ Metrics sink: {skipped} records for unconfigured agents skipped")
+                if not rows:
+                    return
+
+                await session.execute(insert(AgentPerformanceLog), rows)
+                await upsert_hourly_rollup(session, hourly_rollup_rows(rows))
+
+                # Fold the batch into running averages: SET expressions all
+                # read the pre-update row, so avg uses the old total.
+                config_pk = AgentConfiguration.id
+                count = case({cid: t[0] for cid, t in totals.items()}, value=config_pk)
+                total_ms = case({cid: t[1] for cid, t in totals.items()}, value=config_pk)
+                last_used = case({cid: t[2] for cid, t in totals.items()}, value=config_pk)
+                await session.execute(
+                    update(AgentConfiguration)
+                    .where(config_pk.in_(list(totals)))
+                    .values(
+                        avg_execution_time_ms=(
+                            func.coalesce(AgentConfiguration.avg_execution_time_ms, 0.0)
+                            * AgentConfiguration.total_executions + total_ms
+                        ) / (AgentConfiguration.total_executions + count),
+                        total_executions=AgentConfiguration.total_executions + count,
+                        last_used_at=last_used
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+                self.written += len(rows)
+
+        except Exception as e:
+            # Metrics are best-effort; never let them back up the pipeline
+            self.failed += len(batch)
+            self._config_ids.clear()
+            print(f"⚠️ Metrics sink flush failed ({len(batch)} records dropped): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+
+metrics_sink = AgentMetricsSink()
@@ -0,0 +1,565 @@
+"""
+Partition Management and Archival
+
+analysis_history and agent_outputs are range-partitioned by month on
+created_at (PostgreSQL only; SQLite keeps plain tables). This module:
+- creates monthly partitions ahead of time (PARTITION_MONTHS_AHEAD)
+- converts existing unpartitioned tables once, from init_db.py
+- archives partitions older than the retention window to compressed JSONL
+  files (zstd when `zstandard` is installed, gzip otherwise), recorded in
+  <archive_dir>/manifest.json with row counts and SHA-256, then detaches
+  and drops them. Rows in other tables that reference the month's
+  analyses (DEPENDENT_TABLES) are archived and deleted with it, so no
+  index or update points at an analysis that is no longer online
+- restores an archived month on demand (for audits), dependents included;
+  restored months are kept for RESTORE_HOLD_DAYS before the archiver
+  takes them again
+
+The maintenance loop runs both jobs daily under a Postgres advisory lock,
+so only one worker does it.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select, text
+
+from app.core.config import get_settings
+from app.core.database import engine, upsert
+from app.core.serialization import dumps_row, loads_row
+from app.models.analysis import AgentOutput, AnalysisHazard, AnalysisHistory
+from app.models.jha_updates import JHAUpdate
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+PARTITIONED_TABLES = (AnalysisHistory.__table__, AgentOutput.__table__)
+
+# Unpartitioned tables whose rows belong to an analysis (by the given
+# column; there are no foreign keys into partitioned tables). They are
+# archived, deleted and restored together with the analysis's month.
+DEPENDENT_TABLES = {
+    AnalysisHistory.__tablename__: (
+        (AnalysisHazard.__table__, "analysis_id"),
+        (JHAUpdate.__table__, "original_jha_id")
+    )
+}
+
+ARCHIVE_BATCH_ROWS = 1000
+RESTORE_BATCH_ROWS = 500
+RESTORE_HOLD_DAYS = 7
+ZSTD_LEVEL = 10
+MAINTENANCE_LOCK_KEY = 4_404_202_610  # pg_try_advisory_lock key for the maintenance job
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return month.replace(year=month.year + years, month=month_index + 1)
+
+
+def parse_month(value: str) -> datetime:
+    """'2025-03' -> datetime(2025, 3, 1); raises ValueError"""
+    return datetime.strptime(value, "%Y-%m")
+
+
+def partition_name(table, month: datetime) -> str:
+    return f"{table.name}_p{month:%Y_%m}"
+
+
+def _qualified(table_or_schema, name: Optional[str] = None) -> str:
+    if name is None:
+        schema, name = table_or_schema.schema, table_or_schema.name
+    else:
+        schema = table_or_schema
+    return f'"{schema}"."{name}"' if schema else f'"{name}"'
+
+
+def _table(table_name: str):
+    for table in PARTITIONED_TABLES:
+        if table.name == table_name:
+            return table
+    raise ValueError(f"{table_name} is not a partitioned table")
+
+
+# --- DDL (synchronous; run through AsyncConnection.run_sync) ---------------
+
+def is_partitioned(sync_conn, table) -> bool:
+    relkind = sync_conn.execute(
+        text(
+            "SELECT c.relkind::text FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relname = :name"
+        ),
+        {"schema": table.schema or "public", "name": table.name}
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(sync_conn, table) -> Dict[datetime, str]:
+    """Monthly partitions of a table: {month: partition name}"""
+    rows = sync_conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "JOIN pg_namespace n ON n.oid = parent.relnamespace "
+            "WHERE n.nspname = :schema AND parent.relname = :name"
+        ),
+        {"schema": table.schema or "public", "name": table.name}
+    ).scalars()
+    prefix = f"{table.name}_p"
+    partitions = {}
+    for name in rows:
+        try:
+            partitions[datetime.strptime(name[len(prefix):], "%Y_%m")] = name
+        except ValueError:
+            continue  # Not one of ours
+    return partitions
+
+
+def create_partition(sync_conn, table, month: datetime) -> str:
+    name = partition_name(table, month)
+    sync_conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {_qualified(table.schema, name)} "
+        f"PARTITION OF {_qualified(table)} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+    return name
+
+
+def ensure_partitions(sync_conn, months_ahead: int, start: Optional[datetime] = None) -> List[str]:
+    """Create monthly partitions from start (default: this month) to months_ahead; returns new ones"""
+    first = month_start(start or datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), months_ahead)
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = list_partitions(sync_conn, table)
+        month = first
+        while month <= last:
+            if month not in existing:
+                created.append(create_partition(sync_conn, table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def convert_to_partitioned(sync_conn, table, months_ahead: int) -> int:
+    """
+    One-time conversion of an existing plain table: rename it, create the
+    partitioned table, copy the rows into monthly partitions and drop the
+    old table. Foreign keys from other tables into it are dropped (a
+    partitioned table's key includes created_at, so they cannot be
+    re-pointed); any other dependent object, such as a view, makes the
+    DROP fail and the caller's transaction roll back with the table
+    untouched. Returns the number of rows copied.
+    """
+    legacy = f"{table.name}_legacy"
+    sync_conn.exec_driver_sql(f'ALTER TABLE {_qualified(table)} RENAME TO "{legacy}"')
+    legacy_relation = {"relation": _qualified(table.schema, legacy)}
+
+    references = sync_conn.execute(
+        text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = CAST(:relation AS regclass) AND contype = 'f'"
+        ),
+        legacy_relation
+    ).all()
+    for referencing_table, constraint in references:
+        sync_conn.exec_driver_sql(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{constraint}"')
+        print(f"  - foreign key {referencing_table}.{constraint} -> {table.name} dropped")
+
+    # Free constraint and index names for the new table
+    constraints = sync_conn.execute(
+        text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:relation AS regclass) "
+            "AND contype IN ('p', 'u')"
+        ),
+        legacy_relation
+    ).scalars().all()
+    for constraint in constraints:
+        sync_conn.exec_driver_sql(f'ALTER TABLE {_qualified(table.schema, legacy)} DROP CONSTRAINT "{constraint}"')
+    indexes = sync_conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = :schema AND tablename = :name"),
+        {"schema": table.schema or "public", "name": legacy}
+    ).scalars().all()
+    for index in indexes:
+        sync_conn.exec_driver_sql(f"DROP INDEX {_qualified(table.schema, index)}")
+
+    table.create(sync_conn)
+    oldest = sync_conn.exec_driver_sql(f"SELECT min(created_at) FROM {_qualified(table.schema, legacy)}").scalar()
+    month = month_start(oldest) if oldest else month_start(datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), months_ahead)
+    while month <= last:
+        create_partition(sync_conn, table, month)
+        month = add_months(month, 1)
+
+    columns = ", ".join(f'"{column.name}"' for column in table.columns)
+    copied = sync_conn.exec_driver_sql(
+        f"INSERT INTO {_qualified(table)} ({columns}) SELECT {columns} FROM {_qualified(table.schema, legacy)}"
+    ).rowcount
+    sync_conn.exec_driver_sql(f"DROP TABLE {_qualified(table.schema, legacy)}")
+    return copied
+
+
+def setup_partitions(sync_conn) -> None:
+    """init_db step: convert plain tables if needed and create upcoming partitions"""
+    if sync_conn.dialect.name != "postgresql":
+        print("  (partitioning skipped: not PostgreSQL)")
+        return
+    months_ahead = get_settings().partition_months_ahead
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(sync_conn, table):
+            copied = convert_to_partitioned(sync_conn, table, months_ahead)
+            print(f"  ~ {table.fullname} converted to monthly partitions ({copied} rows)")
+    for name in ensure_partitions(sync_conn, months_ahead):
+        print(f"  + partition {name}")
+
+
+# --- Archive files ------------------------------------------------------------
+
+def _archive_suffix() -> str:
+    return ".jsonl.zst" if ZSTD_AVAILABLE else ".jsonl.gz"
+
+
+class _ArchiveWriter:
+    """Compressed JSONL file written in batches (blocking; call from a thread)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self._raw = open(path, "wb")
+        # Written as <name>.partial first; compress for the final name
+        if path.name.removesuffix(".partial").endswith(".zst"):
+            self._stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+
+    def write(self, lines: List[str]) -> None:
+        self._stream.write("".join(line + "\n" for line in lines).encode("utf-8"))
+        self.count += len(lines)
+
+    def close(self) -> None:
+        self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+    def abort(self) -> None:
+        self._raw.close()
+        self.path.unlink(missing_ok=True)
+
+
+def _read_archive(path: Path, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    with open(path, "rb") as raw:
+        if path.name.endswith(".zst"):
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is required to restore .zst archives")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        else:
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        batch = []
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                batch.append(loads_row(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PartitionManager:
+    """Partition creation, archival and restore for the partitioned tables"""
+
+    def __init__(self, db_engine=engine, archive_dir: Optional[Path] = None):
+        settings = get_settings()
+        self.engine = db_engine
+        self.archive_dir = archive_dir or Path(settings.archive_dir)
+        self.manifest_path = self.archive_dir / "manifest.json"
+        self.retention_months = settings.archive_retention_months
+        self.months_ahead = settings.partition_months_ahead
+        self.interval = settings.partition_maintenance_interval_hours * 3600
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    # Manifest
+
+    def load_manifest(self) -> List[Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return []
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, entries: List[Dict[str, Any]]) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+
+    def _manifest_entry(self, table_name: str, month: datetime) -> Optional[Dict[str, Any]]:
+        for entry in self.load_manifest():
+            if entry["table"] == table_name and entry["month"] == f"{month:%Y-%m}":
+                return entry
+        return None
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        entries = [
+            e for e in self.load_manifest()
+            if not (e["table"] == entry["table"] and e["month"] == entry["month"])
+        ]
+        entries.append(entry)
+        entries.sort(key=lambda e: (e["table"], e["month"]))
+        self._save_manifest(entries)
+
+    # Partitions
+
+    async def ensure(self) -> List[str]:
+        """Create partitions for this month through partition_months_ahead"""
+        async with self.engine.begin() as conn:
+            return await conn.run_sync(ensure_partitions, self.months_ahead)
+
+    async def partitions(self) -> Dict[str, Any]:
+        """Live partitions (approximate rows, size) and archived months"""
+        live: Dict[str, List[Dict[str, Any]]] = {}
+        if self.enabled:
+            async with self.engine.connect() as conn:
+                for table in PARTITIONED_TABLES:
+                    months = await conn.run_sync(list_partitions, table)
+                    stats = []
+                    for month, name in sorted(months.items()):
+                        row = (await conn.execute(
+                            text(
+                                "SELECT c.reltuples::bigint, pg_total_relation_size(c.oid) FROM pg_class c "
+                                "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND c.relname = :name"
+                            ),
+                            {"schema": table.schema or "public", "name": name}
+                        )).one()
+                        stats.append({"month": f"{month:%Y-%m}", "partition": name, "approx_rows": max(row[0], 0), "bytes": row[1]})
+                    live[table.name] = stats
+        return {
+            "enabled": self.enabled,
+            "retention_months": self.retention_months,
+            "partitions": live,
+            "archived": self.load_manifest()
+        }
+
+    # Archival
+
+    def _held(self, table_name: str, month: datetime) -> bool:
+        """True if the month was restored recently and should stay online"""
+        entry = self._manifest_entry(table_name, month)
+        restored_at = entry.get("restored_at") if entry else None
+        return bool(restored_at) and datetime.utcnow() - datetime.fromisoformat(restored_at) < timedelta(days=RESTORE_HOLD_DAYS)
+
+    async def archive_expired(self) -> List[Dict[str, Any]]:
+        """Archive every partition older than the retention window"""
+        if not self.enabled or self.retention_months <= 0:
+            return []
+        cutoff = add_months(month_start(datetime.utcnow()), -self.retention_months)
+        archived = []
+        for table in PARTITIONED_TABLES:
+            async with self.engine.connect() as conn:
+                months = await conn.run_sync(list_partitions, table)
+            for month in sorted(months):
+                if month < cutoff and not self._held(table.name, month):
+                    archived.append(await self.archive_partition(table.name, month))
+        return archived
+
+    async def _export(self, query, path: Path) -> int:
+        """Stream a query's rows into a compressed archive file; returns rows written"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Compression runs off the event loop
+        writer = await asyncio.to_thread(_ArchiveWriter, path)
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.stream(query.execution_options(yield_per=ARCHIVE_BATCH_ROWS))
+                async for rows in result.mappings().partitions(ARCHIVE_BATCH_ROWS):
+                    await asyncio.to_thread(writer.write, [dumps_row(dict(row)) for row in rows])
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.count
+
+    async def archive_partition(self, table_name: str, month: datetime) -> Dict[str, Any]:
+        """
+        Write one month (and its dependent rows) to compressed archives,
+        verify the row counts, then delete the dependent rows and detach
+        and drop the partition.
+        """
+        table = _table(table_name)
+        month = month_start(month)
+        name = partition_name(table, month)
+        in_month = (table.c.created_at >= month, table.c.created_at < add_months(month, 1))
+        month_ids = select(table.c.id).where(*in_month)
+
+        # (table, rows to archive, filter on that table, archive path); each
+        # dependent's file is named after the partition it belongs to
+        exports = [(table, select(table).where(*in_month), None, self.archive_dir / table.name / f"{name}{_archive_suffix()}")]
+        for dependent, column in DEPENDENT_TABLES.get(table.name, ()):
+            belongs = dependent.c[column].in_(month_ids)
+            exports.append((dependent, select(dependent).where(belongs), belongs, self.archive_dir / dependent.name / f"{name}{_archive_suffix()}"))
+
+        partials = []
+        written = []
+        try:
+            for _, query, _, path in exports:
+                partial = path.with_name(path.name + ".partial")
+                partials.append(partial)
+                written.append(await self._export(query, partial))
+
+            async with self.engine.begin() as conn:
+                for (export_table, query, _, _), rows in zip(exports, written):
+                    count = (await conn.execute(select(func.count()).select_from(query.subquery()))).scalar()
+                    if count != rows:
+                        raise RuntimeError(f"{name}: archived {rows} {export_table.name} rows but found {count}; not dropped")
+                for partial, (_, _, _, path) in zip(partials, exports):
+                    os.replace(partial, path)
+                for export_table, _, belongs, _ in exports[1:]:
+                    await conn.execute(delete(export_table).where(belongs))
+                await conn.exec_driver_sql(f"ALTER TABLE {_qualified(table)} DETACH PARTITION {_qualified(table.schema, name)}")
+                await conn.exec_driver_sql(f"DROP TABLE {_qualified(table.schema, name)}")
+        finally:
+            for partial in partials:
+                partial.unlink(missing_ok=True)
+
+        files = []
+        for (export_table, _, _, path), rows in zip(exports, written):
+            files.append({
+                "table": export_table.name,
+                "file": str(path.relative_to(self.archive_dir)),
+                "rows": rows,
+                "bytes": path.stat().st_size,
+                "sha256": await asyncio.to_thread(_sha256, path)
+            })
+        main, dependents = files[0], files[1:]
+
+        entry = {
+            "table": table.name,
+            "month": f"{month:%Y-%m}",
+            "partition": name,
+            "file": main["file"],
+            "compression": "zstd" if main["file"].endswith(".zst") else "gzip",
+            "rows": main["rows"],
+            "bytes": main["bytes"],
+            "sha256": main["sha256"],
+            "dependents": dependents,
+            "archived_at": datetime.utcnow().isoformat(),
+            "restored_at": None
+        }
+        self._record(entry)
+        dependent_rows = ", ".join(f"{d['rows']} {d['table']}" for d in dependents)
+        print(f"🗄️ Archived {name}: {main['rows']} rows{f' (+ {dependent_rows})' if dependents else ''} -> {entry['file']}")
+        return entry
+
+    async def _import(self, conn, table, path: Path, sha256: str) -> int:
+        """Insert an archive file's rows (skipping ones already present); returns rows read"""
+        if await asyncio.to_thread(_sha256, path) != sha256:
+            raise RuntimeError(f"Archive {path.relative_to(self.archive_dir)} does not match its manifest checksum")
+        restored = 0
+        reader = _read_archive(path, RESTORE_BATCH_ROWS)
+        primary_key = [column.name for column in table.primary_key]
+        while True:
+            batch = await asyncio.to_thread(next, reader, None)
+            if batch is None:
+                break
+            await conn.execute(upsert(table).values(batch).on_conflict_do_nothing(index_elements=primary_key))
+            restored += len(batch)
+        return restored
+
+    async def restore_partition(self, table_name: str, month: datetime) -> int:
+        """Recreate an archived month, and its dependent rows, from the archive files; returns rows restored"""
+        table = _table(table_name)
+        month = month_start(month)
+        entry = self._manifest_entry(table.name, month)
+        if entry is None:
+            raise ValueError(f"No archive for {table.name} {month:%Y-%m}")
+
+        dependent_tables = {dependent.name: dependent for dependent, _ in DEPENDENT_TABLES.get(table.name, ())}
+        async with self.engine.begin() as conn:
+            await conn.run_sync(create_partition, table, month)
+            restored = await self._import(conn, table, self.archive_dir / entry["file"], entry["sha256"])
+            # Archives written before dependents were archived have none
+            for dependent in entry.get("dependents", []):
+                await self._import(conn, dependent_tables[dependent["table"]], self.archive_dir / dependent["file"], dependent["sha256"])
+
+        self._record({**entry, "restored_at": datetime.utcnow().isoformat()})
+        print(f"📦 Restored {entry['partition']}: {restored} rows (kept {RESTORE_HOLD_DAYS} days)")
+        return restored
+
+    # Maintenance loop
+
+    async def maintain(self) -> Dict[str, Any]:
+        """Create upcoming partitions and archive expired ones, if no other worker is"""
+        if not self.enabled:
+            return {"skipped": "not PostgreSQL"}
+        async with self.engine.connect() as lock_conn:
+            locked = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})).scalar()
+            if not locked:
+                return {"skipped": "another worker holds the maintenance lock"}
+            try:
+                created = await self.ensure()
+                archived = await self.archive_expired()
+            finally:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+                await lock_conn.commit()
+        return {"created": created, "archived": archived}
+
+    async def start(self) -> None:
+        """Create upcoming partitions now, then run maintenance in the background"""
+        if self._task is not None or not self.enabled:
+            return
+        try:
+            for name in await self.ensure():
+                print(f"🗓️ Created partition {name}")
+        except Exception as e:
+            print(f"⚠️ Partition check at startup failed: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.maintain()
+                if result.get("created") or result.get("archived"):
+                    print(f"🗓️ Partition maintenance: {len(result['created'])} created, {len(result['archived'])} archived")
+            except Exception as e:
+                print(f"⚠️ Partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+partition_manager = PartitionManager()
@@ -0,0 +1,187 @@
+"""
+Agent Performance Analytics
+
+Hourly rollups of agent executions and the percentile queries behind the
+admin performance dashboard.
+
+Latencies are counted in logarithmic buckets (each bucket is 10% wider
+than the last), so p50/p95/p99 over any window come from a cumulative
+window sum over a few hundred rollup rows, with at most ~5% error, no
+matter how many raw AgentPerformanceLog rows exist.
+"""
+
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert
+from app.models.agent_config import AgentPerformanceHourly
+
+LATENCY_BUCKET_BASE = 1.1
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+def latency_bucket(execution_time_ms: float) -> int:
+    """Log bucket index for a latency; everything under 1ms is bucket 0"""
+    if execution_time_ms <= 1:
+        return 0
+    return int(math.log(execution_time_ms, LATENCY_BUCKET_BASE))
+
+
+def bucket_latency_ms(bucket: int) -> float:
+    """Representative latency (geometric midpoint) of a bucket"""
+    return LATENCY_BUCKET_BASE ** (bucket + 0.5)
+
+
+def hourly_rollup_rows(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate execution records into rollup rows (one per hour/agent/model/bucket)"""
+    rows: Dict[Tuple[datetime, str, str, int], Dict[str, Any]] = {}
+    for record in records:
+        key = (
+            record["executed_at"].replace(minute=0, second=0, microsecond=0),
+            record["agent_name"],
+            record.get("model") or "",
+            latency_bucket(record["execution_time_ms"])
+        )
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                "hour": key[0],
+                "agent_name": key[1],
+                "model": key[2],
+                "latency_bucket": key[3],
+                "executions": 0,
+                "successes": 0,
+                "total_time_ms": 0.0,
+                "output_tokens": 0
+            }
+        row["executions"] += 1
+        row["successes"] += 1 if record["success"] else 0
+        row["total_time_ms"] += record["execution_time_ms"]
+        row["output_tokens"] += record.get("token_usage_output") or 0
+    return list(rows.values())
+
+
+async def upsert_hourly_rollup(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Add rollup rows to the hourly table in one INSERT ... ON CONFLICT statement"""
+    if not rows:
+        return
+    hourly = AgentPerformanceHourly
+    stmt = upsert(hourly).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["hour", "agent_name", "model", "latency_bucket"],
+        set_={
+            "executions": hourly.executions + stmt.excluded.executions,
+            "successes": hourly.successes + stmt.excluded.successes,
+            "total_time_ms": hourly.total_time_ms + stmt.excluded.total_time_ms,
+            "output_tokens": hourly.output_tokens + stmt.excluded.output_tokens
+        }
+    )
+    await session.execute(stmt)
+
+
+def _percentile_key(p: float) -> str:
+    return f"p{round(p * 100)}"
+
+
+async def _latency_percentiles(
+    db: AsyncSession,
+    since_hour: datetime,
+    group_columns: Sequence[str]
+) -> Dict[tuple, Dict[str, float]]:
+    """p50/p95/p99 latency (ms) per group, computed in SQL over the rollup"""
+    hourly = AgentPerformanceHourly
+    group = [getattr(hourly, name) for name in group_columns]
+
+    per_bucket = (
+        select(*group, hourly.latency_bucket, func.sum(hourly.executions).label("n"))
+        .where(hourly.hour >= since_hour)
+        .group_by(*group, hourly.latency_bucket)
+        .subquery()
+    )
+    partition = [per_bucket.c[name] for name in group_columns] or None
+    ranked = select(
+        *[per_bucket.c[name] for name in group_columns],
+        per_bucket.c.latency_bucket,
+        func.sum(per_bucket.c.n).over(partition_by=partition, order_by=per_bucket.c.latency_bucket).label("cumulative"),
+        func.sum(per_bucket.c.n).over(partition_by=partition).label("total")
+    ).subquery()
+
+    # First bucket whose cumulative count reaches each percentile
+    query = select(
+        *[ranked.c[name] for name in group_columns],
+        *[
+            func.min(case((ranked.c.cumulative >= ranked.c.total * p, ranked.c.latency_bucket))).label(_percentile_key(p))
+            for p in PERCENTILES
+        ]
+    )
+    if group_columns:
+        query = query.group_by(*[ranked.c[name] for name in group_columns])
+
+    result = await db.execute(query)
+    percentiles = {}
+    for row in result.mappings():
+        key = tuple(row[name] for name in group_columns)
+        percentiles[key] = {
+            _percentile_key(p): round(bucket_latency_ms(row[_percentile_key(p)]), 1)
+            for p in PERCENTILES
+            if row[_percentile_key(p)] is not None
+        }
+    return percentiles
+
+
+async def _totals(
+    db: AsyncSession,
+    since_hour: datetime,
+    group_columns: Sequence[str]
+) -> Dict[tuple, Dict[str, Any]]:
+    hourly = AgentPerformanceHourly
+    group = [getattr(hourly, name) for name in group_columns]
+    query = select(
+        *group,
+        func.sum(hourly.executions).label("executions"),
+        func.sum(hourly.successes).label("successes"),
+        func.sum(hourly.total_time_ms).label("total_time_ms"),
+        func.sum(hourly.output_tokens).label("output_tokens")
+    ).where(hourly.hour >= since_hour)
+    if group:
+        query = query.group_by(*group)
+
+    result = await db.execute(query)
+    totals = {}
+    for row in result.mappings():
+        executions = row["executions"] or 0
+        if not executions:
+            continue
+        total_time_ms = row["total_time_ms"] or 0.0
+        totals[tuple(row[name] for name in group_columns)] = {
+            "executions": executions,
+            "avg_execution_time_ms": round(total_time_ms / executions, 1),
+            "success_rate": round((row["successes"] or 0) / executions, 4),
+            "tokens_per_second": round((row["output_tokens"] or 0) / (total_time_ms / 1000), 1) if total_time_ms else 0.0
+        }
+    return totals
+
+
+async def performance_summary(db: AsyncSession, since: datetime) -> Dict[str, Any]:
+    """
+    Aggregated performance since the given time:
+    {"by_model": {(agent, model): stats}, "by_agent": {agent: stats}, "overall": stats}
+    where stats has executions, avg_execution_time_ms, success_rate,
+    tokens_per_second and p50/p95/p99 latency in ms.
+    """
+    since_hour = since.replace(minute=0, second=0, microsecond=0)
+    summary: Dict[str, Any] = {}
+    for level, columns in (("by_model", ("agent_name", "model")), ("by_agent", ("agent_name",)), ("overall", ())):
+        totals = await _totals(db, since_hour, columns)
+        percentiles = await _latency_percentiles(db, since_hour, columns)
+        stats = {key: {**value, **percentiles.get(key, {})} for key, value in totals.items()}
+        if level == "by_agent":
+            stats = {key[0]: value for key, value in stats.items()}
+        elif level == "overall":
+            stats = stats.get((), {})
+        summary[level] = stats
+    return summary
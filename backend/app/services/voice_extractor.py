@@ -0,0 +1,395 @@
+"""
+Voice Update Extractor
+
+Deterministic fast path for pulling ExtractedVariables out of field voice
+updates ("wind 25 mph, temp 40, crew of 4"). Compiled patterns cover the
+common phrasing and normalize units (km/h, knots and m/s to mph, Celsius
+to Fahrenheit, number words to integers), locally and in microseconds.
+
+Relative changes ("dropped 10 degrees", "crew is down 2", "5 degrees
+colder") are not readings: the rules leave them unexplained rather than
+take the amount as the new value. A sustained wind with a gust reports
+the higher of the two.
+
+Whatever the patterns do not explain is checked against a list of filler
+words. If content words or numbers are left over, or too little of the
+utterance was understood (confidence below VOICE_FAST_PATH_MIN_CONFIDENCE),
+GeminiService.extract_variables_from_voice fills in the fields the rules
+could not. Values found by the rules are kept (they are unit-normalized,
+the LLM's are not) unless their match touches a word the rules did not
+understand; then the LLM's reading of the field wins.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "dozen": 12
+}
+_COUNT = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+_AMOUNT = r"(?:\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")"
+
+SPEED_TO_MPH = {
+    "mph": 1.0, "miles per hour": 1.0,
+    "kph": 0.621371, "kmh": 0.621371, "km/h": 0.621371, "kilometers per hour": 0.621371,
+    "knot": 1.15078, "knots": 1.15078, "kt": 1.15078, "kts": 1.15078,
+    "m/s": 2.23694, "meters per second": 2.23694
+}
+_SPEED_UNIT = r"(mph|miles per hour|km/h|kmh|kph|kilometers per hour|knots?|kts?|m/s|meters per second)"
+
+# Tried in order: an explicit unit beats a bare number after "wind"
+WIND_PATTERNS = [
+    re.compile(r"(\d+(?:\.\d+)?)\s*" + _SPEED_UNIT + r"(?:\s+[a-z]+)?\s+(?:winds?|gusts?)\b"),
+    re.compile(r"\b(?:winds?|gusts?|gusting)\b[a-z ]{0,30}?(\d+(?:\.\d+)?)\s*" + _SPEED_UNIT),
+    re.compile(r"\b(?:winds?|gusts?|gusting)\b[a-z ]{0,30}?(\d+(?:\.\d+)?)()"),
+    # A gust after the sustained reading ("30 mph winds gusting 45")
+    re.compile(r"\b(?:gusts?|gusting)(?:\s+(?:up|to|of|at|near|around|over)){0,3}\s+(\d+(?:\.\d+)?)\s*" + _SPEED_UNIT + r"?")
+]
+TEMPERATURE_PATTERNS = [
+    re.compile(r"\b(?:temp(?:erature)?s?|thermometer)\b[a-z ,]{0,20}?(-?\d+(?:\.\d+)?)\s*(?:°|degrees?|deg)?\s*(fahrenheit|celsius|f|c)?\b"),
+    re.compile(r"(-?\d+(?:\.\d+)?)\s*(?:°\s*|degrees?\s*|deg\s*)(fahrenheit|celsius|f|c)?\b"),
+    re.compile(r"(-?\d+(?:\.\d+)?)\s*(f|c)\b")
+]
+# Changes by an amount, not new values: "dropped 10", "down 2", "by 5",
+# "5 degrees colder". "dropped to 28" and "down to three" are readings.
+_DELTA = re.compile(
+    r"\b(?:(?:dropped|drops?|fell|falls?|falling|rose|rises?|risen|rising|climbed|increased|decreased|jumped|up|down|plus|minus)"
+    r"\s+(?:by\s+|another\s+)?|by\s+)" + _AMOUNT + r"\b"
+    r"|\b" + _AMOUNT + r"\s*(?:°|degrees?|deg|f|c|" + _SPEED_UNIT[1:-1] + r"|workers|guys|people|men)?"
+    r"\s+(?:more|fewer|less|colder|warmer|hotter|cooler|higher|lower|faster|slower|stronger|weaker)\b"
+)
+CREW_EXPERIENCE = {
+    "new": "new", "green": "new", "inexperienced": "new", "rookie": "new", "apprentice": "new",
+    "experienced": "experienced", "seasoned": "experienced", "journeyman": "experienced",
+    "veteran": "expert", "expert": "expert"
+}
+_EXPERIENCE = "(?:" + "|".join(CREW_EXPERIENCE) + ")"
+_CREW_EXPERIENCE = re.compile(
+    r"\b(" + "|".join(CREW_EXPERIENCE) + r")\s+(?:crew|workers|guys|hands|people|men|apprentices)\b"
+    r"|\bcrew\s+(?:is\s+)?(?:mostly\s+|all\s+)?(" + "|".join(CREW_EXPERIENCE) + r")\b"
+)
+CREW_PATTERNS = [
+    re.compile(r"\bcrew\b(?:\s+(?:size|count))?(?:\s+(?:is|of|at|now|down|up|to|only|just)){0,3}\s+" + _COUNT + r"\b"),
+    re.compile(r"\b" + _COUNT + r"(?:\s*-?\s*(?:man|person|member))?(?:\s+" + _EXPERIENCE + r")?\s+(?:workers|guys|people|men|crew members|hands|crew|on site|onsite)\b"),
+    re.compile(r"\b(?:down|up) to\s+" + _COUNT + r"\s+(?:workers|guys|people|men)?\b")
+]
+
+_NEGATED_PRECIPITATION = re.compile(
+    r"\b(?:no|not|stopped|without)\s+(?:more\s+)?(?:rain(?:ing)?|snow(?:ing)?|precipitation|sleet)\b"
+    r"|\b(?:rain|snow|sleet)\s+(?:has\s+)?(?:stopped|let up|cleared)\b|\bdry\b"
+)
+_PRECIPITATION = re.compile(
+    r"\b(?:rain(?:ing|y)?|drizzl(?:e|ing)|showers?|snow(?:ing)?|sleet(?:ing)?|hail(?:ing)?|downpour|pouring|precipitation|thunderstorms?|storm(?:ing)?)\b"
+)
+
+TIME_OF_DAY = {
+    "morning": "morning", "dawn": "morning", "sunrise": "morning",
+    "afternoon": "afternoon", "midday": "afternoon", "noon": "afternoon",
+    "evening": "evening", "dusk": "evening", "sunset": "evening",
+    "night": "night", "tonight": "night", "overnight": "night", "after dark": "night"
+}
+_TIME_OF_DAY = re.compile(r"\b(" + "|".join(sorted(TIME_OF_DAY, key=len, reverse=True)) + r")\b")
+
+VISIBILITY = {
+    "good": "good", "clear": "good", "excellent": "good",
+    "moderate": "moderate", "fair": "moderate", "hazy": "moderate",
+    "poor": "poor", "low": "poor", "limited": "poor", "reduced": "poor", "bad": "poor", "zero": "poor"
+}
+_VISIBILITY = re.compile(r"\bvisibility\b(?:\s+(?:is|now|getting|very|pretty|really)){0,2}\s+(" + "|".join(VISIBILITY) + r")\b")
+_VISIBILITY_CONDITIONS = {"fog": "poor", "foggy": "poor", "whiteout": "poor", "smoke": "poor", "haze": "moderate", "mist": "moderate", "misty": "moderate"}
+_VISIBILITY_CONDITION = re.compile(r"\b(?:heavy\s+|thick\s+|light\s+)?(" + "|".join(_VISIBILITY_CONDITIONS) + r")\b")
+
+EQUIPMENT = (
+    "crane", "scissor lift", "boom lift", "aerial lift", "man lift", "manlift", "forklift", "telehandler",
+    "excavator", "backhoe", "loader", "bulldozer", "dozer", "dump truck", "concrete pump", "scaffold",
+    "scaffolding", "ladder", "generator", "compressor", "welder", "harness", "lift"
+)
+EQUIPMENT_STATUS = {
+    "down": "down", "broken": "down", "broke down": "down", "out of service": "down", "offline": "down",
+    "not working": "down", "failed": "down", "leaking": "leaking", "inoperable": "down",
+    "arrived": "added", "delivered": "added", "on site": "added", "added": "added", "brought in": "added",
+    "new": "added", "extra": "added", "additional": "added", "another": "added",
+    "removed": "removed", "gone": "removed", "taken away": "removed", "no": "unavailable", "lost": "unavailable",
+    "swapped": "replaced", "replaced": "replaced"
+}
+_STATUS = "|".join(sorted(EQUIPMENT_STATUS, key=len, reverse=True))
+_EQUIPMENT = "|".join(sorted(EQUIPMENT, key=len, reverse=True))
+# Groups: status before, count, equipment, plural ending, status after
+_EQUIPMENT_PATTERN = re.compile(
+    r"(?:\b(" + _STATUS + r")\s+(?:the\s+|a\s+|an\s+|our\s+)?)?(?:\b" + _COUNT + r"\s+)?\b(" + _EQUIPMENT + r")(e?s)?\b"
+    r"(?:(?:\s+(?:is|was|has|have|were|just|now|went|got|been)){0,2}\s+(" + _STATUS + r")\b)?"
+)
+
+CONCERN_KEYWORDS = (
+    "wind", "cold", "heat", "ice", "icy", "slippery", "mud", "muddy", "lightning", "thunder", "power lines",
+    "power line", "trench", "cave in", "collapse", "unstable", "fatigue", "fire", "smoke", "gas leak",
+    "injury", "injured", "fall", "falling objects", "visibility", "flooding", "dust"
+)
+_CONCERN = re.compile(r"\b(" + "|".join(sorted(CONCERN_KEYWORDS, key=len, reverse=True)) + r")\b")
+HIGH_URGENCY = {"lightning", "collapse", "cave in", "fire", "gas leak", "injury", "injured", "power lines", "power line"}
+
+# Words that carry no field information; anything else left over means the
+# rules did not understand part of the update
+FILLER = {
+    "a", "about", "again", "also", "am", "an", "and", "approx", "approximately", "are", "around", "at", "be",
+    "been", "bit", "but", "by", "change", "changed", "changes", "condition", "conditions", "currently",
+    "degrees", "field", "for", "from", "getting", "got", "guys", "has", "have", "here", "hey", "i", "i'm", "im",
+    "in", "is", "it", "it's", "its", "just", "like", "little", "looks", "now", "of", "ok", "okay", "on", "our",
+    "out", "over", "picked", "picking", "please", "pretty", "reading", "really", "right", "roughly", "site",
+    "so", "some", "still", "team", "that", "the", "there", "this", "to", "today", "up", "update", "updated",
+    "very", "was", "we", "we're", "we've", "were", "weather", "will", "with", "down", "went", "gone", "more",
+    "less", "than", "higher", "lower", "increase", "increased", "dropped", "drop", "rising", "coming", "strong",
+    "heavy", "light", "steady", "outside", "sustained", "mph", "speed", "only", "all", "gust", "gusts", "gusting",
+    "starting", "started"
+}
+EXTRACTED_FIELDS = (
+    "wind_speed", "temperature", "precipitation", "crew_size", "crew_experience", "equipment_changes",
+    "time_of_day", "visibility", "concern_keywords"
+)
+_TOKEN = re.compile(r"[a-z][a-z']*|\d+(?:\.\d+)?")
+
+
+def _count(text: str) -> int:
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+class VoiceExtractor:
+    """Rule-based field variable extraction with an LLM fallback"""
+
+    def __init__(self, min_confidence: Optional[float] = None):
+        settings = get_settings()
+        self.min_confidence = settings.voice_fast_path_min_confidence if min_confidence is None else min_confidence
+        self.llm_fallback_enabled = settings.voice_llm_fallback
+        self._llm = None
+
+        self.requests = 0
+        self.fast_path_hits = 0
+        self.llm_fallbacks = 0
+        self.llm_failures = 0
+        self.rules_time_us = 0.0
+
+    # Rules
+
+    def extract_local(self, voice_input: str) -> Tuple[Dict[str, Any], float, List[str]]:
+        """
+        (variables, confidence, unexplained tokens) from the rules alone.
+        confidence is the share of content tokens the rules explained.
+        """
+        variables, confidence, unexplained, _ = self._extract_rules(voice_input)
+        return variables, confidence, unexplained
+
+    def _extract_rules(self, voice_input: str) -> Tuple[Dict[str, Any], float, List[str], Set[str]]:
+        """extract_local plus the fields whose match touches an unexplained token"""
+        text = voice_input.lower().replace("’", "'")
+        spans: List[Tuple[int, int]] = []
+        field_spans: Dict[str, List[Tuple[int, int]]] = {}
+        variables: Dict[str, Any] = {}
+
+        # Relative changes: nothing may match them, and they stay unexplained
+        blocked = [match.span() for match in _DELTA.finditer(text)]
+
+        def free(match: re.Match) -> bool:
+            return not any(match.start() < end and start < match.end() for start, end in spans + blocked)
+
+        def claim(match: re.Match, field: str) -> None:
+            spans.append(match.span())
+            field_spans.setdefault(field, []).append(match.span())
+
+        def first(patterns: List[re.Pattern]) -> Optional[re.Match]:
+            for pattern in patterns:
+                for match in pattern.finditer(text):
+                    if free(match):
+                        return match
+            return None
+
+        # Sustained speed and gusts; a bare gust takes the unit of the other reading
+        readings = []
+        match = first(WIND_PATTERNS)
+        while match:
+            readings.append(match)
+            claim(match, "wind_speed")
+            match = first(WIND_PATTERNS)
+        if readings:
+            unit = next((match.group(2) for match in readings if match.group(2)), "mph")
+            variables["wind_speed"] = max(
+                round(float(match.group(1)) * SPEED_TO_MPH[match.group(2) or unit]) for match in readings
+            )
+
+        match = first(TEMPERATURE_PATTERNS)
+        if match:
+            value = float(match.group(1))
+            if (match.group(2) or "f").startswith("c"):
+                value = value * 9 / 5 + 32
+            variables["temperature"] = round(value)
+            claim(match, "temperature")
+
+        match = first(CREW_PATTERNS)
+        if match:
+            variables["crew_size"] = _count(match.group(1))
+            claim(match, "crew_size")
+
+        # May sit inside the crew size phrase ("three new guys")
+        match = _CREW_EXPERIENCE.search(text)
+        if match:
+            variables["crew_experience"] = CREW_EXPERIENCE[match.group(1) or match.group(2)]
+            claim(match, "crew_experience")
+
+        negated = [m for m in _NEGATED_PRECIPITATION.finditer(text) if free(m)]
+        if negated:
+            variables["precipitation"] = False
+            for m in negated:
+                claim(m, "precipitation")
+        precipitation = [m for m in _PRECIPITATION.finditer(text) if free(m)]
+        if precipitation:
+            variables.setdefault("precipitation", True)
+            for m in precipitation:
+                claim(m, "precipitation")
+
+        match = first([_TIME_OF_DAY])
+        if match:
+            variables["time_of_day"] = TIME_OF_DAY[match.group(1)]
+            claim(match, "time_of_day")
+
+        match = first([_VISIBILITY])
+        if match:
+            variables["visibility"] = VISIBILITY[match.group(1)]
+            claim(match, "visibility")
+        else:
+            match = first([_VISIBILITY_CONDITION])
+            if match:
+                variables["visibility"] = _VISIBILITY_CONDITIONS[match.group(1)]
+                claim(match, "visibility")
+
+        equipment = []
+        for match in _EQUIPMENT_PATTERN.finditer(text):
+            if not free(match):
+                continue
+            item = match.group(3) + (match.group(4) or "")
+            if match.group(2):
+                item = f"{_count(match.group(2))} {item}"
+            status = match.group(5) or match.group(1)
+            equipment.append(f"{item} {EQUIPMENT_STATUS[status]}" if status else item)
+            claim(match, "equipment_changes")
+        if equipment:
+            variables["equipment_changes"] = equipment
+
+        # Concern keywords may overlap matched fields ("wind", "fog"), so
+        # they are collected from the whole text
+        concerns = list(dict.fromkeys(match.group(1) for match in _CONCERN.finditer(text)))
+        if variables.get("temperature") is not None:
+            if variables["temperature"] <= 32:
+                concerns.append("cold")
+            elif variables["temperature"] >= 90:
+                concerns.append("heat")
+        if variables.get("wind_speed") is not None and "wind" not in concerns:
+            concerns.append("wind")
+        if concerns:
+            variables["concern_keywords"] = list(dict.fromkeys(concerns))
+        spans.extend(match.span() for match in _CONCERN.finditer(text))
+
+        # What the rules did not explain
+        covered = [False] * len(text)
+        for start, end in spans:
+            covered[start:end] = [True] * (end - start)
+        explained, unexplained, uncertain = 0, [], set()
+        for match in _TOKEN.finditer(text):
+            token = match.group(0)
+            if token in FILLER:
+                continue
+            if all(covered[match.start():match.end()]):
+                explained += 1
+                continue
+            unexplained.append(token)
+            # Overlapping or next to a field's match (one separator apart)
+            uncertain.update(
+                field for field, matched in field_spans.items()
+                if any(match.start() <= end + 1 and start <= match.end() + 1 for start, end in matched)
+            )
+        total = explained + len(unexplained)
+        confidence = explained / total if total else 0.0
+        if not variables:
+            confidence = 0.0
+        return variables, confidence, unexplained, uncertain
+
+    def infer_update_type(self, variables: Dict[str, Any]) -> str:
+        if any(variables.get(name) is not None for name in ("wind_speed", "temperature", "precipitation", "visibility")):
+            return "environmental"
+        if variables.get("crew_size") is not None or variables.get("crew_experience"):
+            return "crew"
+        if variables.get("equipment_changes"):
+            return "equipment"
+        return "scope"
+
+    def infer_urgency(self, variables: Dict[str, Any]) -> str:
+        concerns = set(variables.get("concern_keywords") or [])
+        if concerns & HIGH_URGENCY or (variables.get("wind_speed") or 0) >= 30:
+            return "high"
+        if any(variables.get(name) is not None for name in EXTRACTED_FIELDS):
+            return "medium"
+        return "low"
+
+    # Extraction
+
+    def _gemini(self):
+        if self._llm is None:
+            from app.services.gemini_service import GeminiService
+            self._llm = GeminiService()
+        return self._llm
+
+    async def extract(self, voice_input: str, original_job_context: Optional[str] = None) -> Dict[str, Any]:
+        """
+        ExtractedVariables fields plus update_type, urgency and source
+        ("rules", "rules+llm" or "llm").
+        """
+        self.requests += 1
+        started = time.perf_counter()
+        variables, confidence, unexplained, uncertain = self._extract_rules(voice_input)
+        self.rules_time_us += (time.perf_counter() - started) * 1_000_000
+
+        source = "rules"
+        needs_llm = confidence < self.min_confidence or bool(unexplained)
+        if needs_llm and self.llm_fallback_enabled:
+            self.llm_fallbacks += 1
+            try:
+                extracted = await self._gemini().extract_variables_from_voice(voice_input, original_job_context)
+            except Exception as e:
+                print(f"⚠️ Voice extraction LLM fallback failed: {e}")
+                extracted = {"raw_error": str(e)}
+            if "raw_error" in extracted:
+                self.llm_failures += 1
+            else:
+                for name, value in extracted.items():
+                    if value is not None and (variables.get(name) is None or name in uncertain):
+                        variables[name] = value
+                source = "rules+llm" if confidence > 0 else "llm"
+        elif not needs_llm:
+            self.fast_path_hits += 1
+
+        variables.setdefault("update_type", self.infer_update_type(variables))
+        variables.setdefault("urgency", self.infer_urgency(variables))
+        variables["source"] = source
+        variables["confidence"] = round(confidence, 2)
+        if unexplained:
+            variables["unexplained"] = unexplained
+        return variables
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "fast_path_hits": self.fast_path_hits,
+            "fast_path_hit_rate": round(self.fast_path_hits / self.requests, 3) if self.requests else None,
+            "llm_fallbacks": self.llm_fallbacks,
+            "llm_failures": self.llm_failures,
+            "avg_rules_time_us": round(self.rules_time_us / self.requests, 1) if self.requests else None,
+            "min_confidence": self.min_confidence,
+            "llm_fallback_enabled": self.llm_fallback_enabled
+        }
+
+
+voice_extractor = VoiceExtractor()
@@ -8,16 +8,70 @@ This resolves the HTTP 500 errors on agent-config endpoints.
 
 import asyncio
 import sys
-from app.core.database import engine, Base
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+from app.core.database import engine, Base, upsert
 
 # Import all models to register them with Base
-from app.models.agent_config import AgentConfiguration, AgentPerformanceLog
-from app.models.analysis import AnalysisHistory, AgentOutput
+from app.models.agent_config import AgentConfiguration, AgentPerformanceLog, AgentPerformanceHourly
+from app.models.analysis import AnalysisHistory, AgentOutput, AnalysisHazard
+from app.models.blob import Blob
 from app.models.jha_updates import JHAUpdate
 from app.models.safety import SafetyReport, RiskAssessment
-from app.models.user import User
+from app.models.user import User, PLACEHOLDER_USER_ID
 from app.models.company import Company, Project
 from app.models.notifications import NotificationPreference
+from app.services.partitioning import setup_partitions
+
+def add_missing_columns(sync_conn):
+    """
+    create_all does not alter existing tables; add columns and indexes
+    introduced since a table was created. Columns with a server default
+    or a scalar default are backfilled.
+    """
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name, schema=table.schema)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            ddl = f'ALTER TABLE {table.fullname} ADD COLUMN "{column.name}" {column_type}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if column.server_default is not None:
+                # Rendered as in CREATE TABLE: type, DEFAULT and NOT NULL
+                ddl = f"ALTER TABLE {table.fullname} ADD COLUMN {CreateColumn(column).compile(dialect=sync_conn.dialect)}"
+            elif default is not None:
+                literal = f"'{default}'" if isinstance(default, str) else str(default).upper() if isinstance(default, bool) else str(default)
+                ddl += f" DEFAULT {literal}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            sync_conn.exec_driver_sql(ddl)
+            print(f"  + {table.fullname}.{column.name}")
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+def seed_placeholder_user(sync_conn):
+    """
+    The API stores analyses under PLACEHOLDER_USER_ID until authentication
+    lands; analyses.user_id references users.id, so the user must exist.
+    Inactive, with no usable password.
+    """
+    sync_conn.execute(
+        upsert(User).values(
+            id=PLACEHOLDER_USER_ID,
+            email="placeholder@safety-companion.invalid",
+            password="!",
+            role="system",
+            is_active=False,
+            created_at=datetime.utcnow()
+        ).on_conflict_do_nothing()
+    )
+
 
 async def create_tables():
     """Create all V2 tables in Neon database"""
@@ -28,12 +82,22 @@ async def create_tables():
         async with engine.begin() as conn:
             print("📊 Creating all V2 tables...")
             await conn.run_sync(Base.metadata.create_all)
+            print("🧩 Adding new columns to existing tables...")
+            await conn.run_sync(add_missing_columns)
+            print("🗓️ Setting up monthly partitions...")
+            await conn.run_sync(setup_partitions)
+            print("👤 Seeding the placeholder user...")
+            await conn.run_sync(seed_placeholder_user)
 
         print("✅ All V2 tables created successfully!")
         print("\nCreated tables:")
         print("  - agent_configurations")
         print("  - agent_performance_logs")
-        print("  - analyses")
+        print("  - agent_performance_hourly")
+        print("  - analyses (partitioned by month)")
+        print("  - agent_outputs (partitioned by month)")
+        print("  - analysis_hazards")
+        print("  - blobs")
         print("  - jha_updates")
         print("  - safety_assessments")
         print("  - users (V2)")
@@ -0,0 +1,154 @@
+"""
+Shared test setup.
+
+Tests run against a throwaway SQLite file by default. Most models use
+PostgreSQL types (JSONB, ARRAY) and the public schema, so only the agent
+config tables exist there and tests marked `postgres` are skipped. Point
+TEST_DATABASE_URL at a scratch PostgreSQL database to run everything
+(its tables are dropped and recreated):
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/safety_test python -m pytest
+"""
+
+import os
+import tempfile
+TEST_DIR = tempfile.mkdtemp(prefix="safety-companion-tests-")
+
+# Settings are read at import time, so configure them before importing app
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{TEST_DIR}/test.db"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["ANALYSIS_SPOOL_DIR"] = os.path.join(TEST_DIR, "spool")
+os.environ["BLOB_DIR"] = os.path.join(TEST_DIR, "blobs")
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archive")
+os.environ["TRANSCRIPT_ENABLED"] = "false"
+# The registry needs one provider key; no provider is called (see fake_agents)
+os.environ["GEMINI_API_KEY"] = "test-key"
+for key in ("OPENROUTER_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_MAPS_API_KEY"):
+    os.environ[key] = ""
+
+import copy
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+
+import app.main  # Registers the routers and models; import before init_db
+from init_db import create_tables
+from app.agents.base import AgentResponse, ModelProvider
+from app.agents.profiles.jha_validator import JHAValidatorAgent
+from app.agents.profiles.risk_assessor import RiskAssessorAgent
+from app.agents.profiles.swiss_cheese_analyzer import SwissCheeseAnalyzerAgent
+from app.agents.profiles.synthesis_agent import SynthesisAgent
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.models.agent_config import AgentConfiguration, AgentPerformanceHourly, AgentPerformanceLog
+from app.models.user import PLACEHOLDER_USER_ID
+
+IS_POSTGRES = engine.dialect.name == "postgresql"
+
+# Canned agent outputs: the pipeline runs end to end without LLM calls
+AGENT_OUTPUTS = {
+    JHAValidatorAgent: {
+        "validation": {"qualityScore": 8, "dataQuality": "GOOD", "completeness": "90%", "reviewStatus": "APPROVED"},
+        "missingCritical": [],
+        "concerns": {"lifeSafety": [], "environmental": [], "regulatory": [], "resources": []}
+    },
+    RiskAssessorAgent: {
+        "riskSummary": {"overallRiskLevel": "MEDIUM", "highestRiskScore": 60},
+        "hazards": [{
+            "name": "Fall from steel at 45ft",
+            "category": "Falls",
+            "probability": 0.06,
+            "probabilityCalculation": {
+                "base": 0.03, "hazardMultiplier": 2.8, "controlMultiplier": 0.7,
+                "weatherMultiplier": 1.0, "experienceMultiplier": 1.0, "final": 0.0588
+            },
+            "consequence": "Fatal",
+            "riskScore": 60,
+            "riskLevel": "MEDIUM",
+            "regulatoryRequirement": "OSHA 1926.501(b)(1)"
+        }],
+        "topThreats": ["Fall from steel at 45ft (Risk Score: 60)"]
+    },
+    SwissCheeseAnalyzerAgent: {
+        "incidentPrediction": {"incidentName": "Fall during beam placement", "confidence": "Medium"}
+    },
+    SynthesisAgent: {
+        "finalReport": {
+            "metadata": {"projectName": "Test Tower"},
+            "executiveSummary": {"decision": "GO_WITH_CONDITIONS"},
+            "hazardAnalysis": {"topThreats": ["Falls"]}
+        }
+    }
+}
+
+
+@pytest.fixture
+def fake_agents(monkeypatch):
+    """Replace each agent's LLM call with its canned output; returns the calls made"""
+    calls = []
+
+    def fake_execute(agent_class):
+        async def execute(self, task):
+            calls.append(self.name)
+            return AgentResponse(
+                success=True,
+                output_data=copy.deepcopy(AGENT_OUTPUTS[agent_class]),
+                model_used="fake-model",
+                provider=ModelProvider.GOOGLE,
+                execution_time_ms=1,
+                token_usage={"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            )
+        return execute
+
+    for agent_class in AGENT_OUTPUTS:
+        monkeypatch.setattr(agent_class, "execute", fake_execute(agent_class))
+    return calls
+
+
+SQLITE_TABLES = [AgentConfiguration.__table__, AgentPerformanceLog.__table__, AgentPerformanceHourly.__table__]
+
+
+def pytest_collection_modifyitems(config, items):
+    if IS_POSTGRES:
+        return
+    skip = pytest.mark.skip(reason="needs TEST_DATABASE_URL pointing at PostgreSQL")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def database():
+    """Fresh schema for the test session, created the way init_db.py does"""
+    async with engine.begin() as conn:
+        if IS_POSTGRES:
+            await conn.run_sync(Base.metadata.drop_all)
+        else:
+            await conn.run_sync(Base.metadata.create_all, tables=SQLITE_TABLES)
+    if IS_POSTGRES:
+        # Includes the placeholder user every analysis is stored under
+        assert await create_tables()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def client():
+    transport = ASGITransport(app=app.main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+@pytest.fixture
+async def clean_agent_configs():
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(AgentPerformanceLog))
+        await session.execute(delete(AgentPerformanceHourly))
+        await session.execute(delete(AgentConfiguration))
+        await session.commit()
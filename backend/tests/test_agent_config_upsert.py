@@ -0,0 +1,86 @@
+"""Bulk agent config writes: one INSERT ... ON CONFLICT statement per request"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+
+from app.api.v1.admin import _upsert_agent_configs
+from app.core.database import engine
+from app.models.agent_config import AgentConfiguration
+from app.schemas.agent_config import AgentConfigCreate
+
+pytestmark = pytest.mark.usefixtures("clean_agent_configs")
+
+MODEL = "deepseek/deepseek-chat-v3.1:free"
+AGENTS = ("validator", "risk_assessor", "swiss_cheese", "synthesizer")
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def bulk_body(temperature: float) -> dict:
+    return {"configs": [
+        {"agent_name": agent, "model": MODEL, "temperature": temperature, "max_tokens": 2000}
+        for agent in AGENTS
+    ]}
+
+
+def assert_single_upsert(statements):
+    assert len(statements) == 1, statements
+    assert statements[0].startswith("INSERT INTO agent_configurations")
+    assert "ON CONFLICT (user_id, agent_name) DO UPDATE" in statements[0]
+
+
+async def test_bulk_put_inserts_with_one_statement(client):
+    with captured_statements() as statements:
+        response = await client.put("/api/v1/admin/agent-config/bulk", json=bulk_body(0.4))
+
+    assert response.status_code == 200
+    assert [config["agent_name"] for config in response.json()] == list(AGENTS)
+    assert_single_upsert(statements)
+
+
+async def test_bulk_put_updates_existing_rows_with_one_statement(client, db):
+    created = await client.put("/api/v1/admin/agent-config/bulk", json=bulk_body(0.4))
+    ids = {config["agent_name"]: config["id"] for config in created.json()}
+
+    with captured_statements() as statements:
+        response = await client.put("/api/v1/admin/agent-config/bulk", json=bulk_body(0.9))
+
+    assert response.status_code == 200
+    assert_single_upsert(statements)
+    assert {config["agent_name"]: config["id"] for config in response.json()} == ids
+    assert {config["temperature"] for config in response.json()} == {0.9}
+
+    rows = (await db.scalars(select(AgentConfiguration).where(AgentConfiguration.user_id == "admin"))).all()
+    assert len(rows) == len(AGENTS)
+    assert {row.temperature for row in rows} == {0.9}
+
+
+async def test_repeated_agent_name_applies_the_last_config(db):
+    configs = [
+        AgentConfigCreate(agent_name="validator", model=MODEL, temperature=0.2),
+        AgentConfigCreate(agent_name="risk_assessor", model=MODEL, temperature=0.5),
+        AgentConfigCreate(agent_name="validator", model=MODEL, temperature=0.8)
+    ]
+
+    with captured_statements() as statements:
+        upserted = await _upsert_agent_configs(db, "admin", configs)
+
+    assert_single_upsert(statements)
+    assert [config.agent_name for config in upserted] == ["validator", "risk_assessor", "validator"]
+    assert upserted[0].temperature == upserted[2].temperature == 0.8
+    rows = (await db.scalars(select(AgentConfiguration).where(AgentConfiguration.agent_name == "validator"))).all()
+    assert len(rows) == 1 and rows[0].temperature == 0.8
@@ -0,0 +1,150 @@
+"""Crew alert fan-out, slow-consumer eviction and the alerts WebSocket"""
+
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import app.main
+from app.api.v1 import alerts
+from app.core.config import get_settings
+from app.core.pubsub import LocalPubSub
+from app.services.alert_hub import ALERT_CHANNEL, MAX_PAYLOAD_BYTES, AlertHub, alert_payload
+
+PROJECT_ID, JHA_ID = str(uuid4()), str(uuid4())
+
+
+def update(**fields):
+    return {
+        "id": str(uuid4()),
+        "original_jha_id": JHA_ID,
+        "project_id": PROJECT_ID,
+        "alert_severity": "critical",
+        "crew_alert": "STOP WORK: wind 35 mph",
+        "requires_action": True,
+        "action_required": "Lower the crane boom",
+        "updated_risk_score": 92,
+        **fields
+    }
+
+
+@pytest.fixture
+def hub():
+    hub = AlertHub(queue_size=2, send_timeout=0.5)
+    hub.attach(LocalPubSub())
+    return hub
+
+
+async def test_alerts_fan_out_to_project_and_jha_subscribers(hub):
+    by_project = hub.subscribe([f"project:{PROJECT_ID}"])
+    by_jha = hub.subscribe([f"jha:{JHA_ID}"])
+    by_both = hub.subscribe([f"jha:{JHA_ID}", f"project:{PROJECT_ID}"])
+    elsewhere = hub.subscribe([f"project:{uuid4()}"])
+
+    sent = update()
+    await hub.publish(sent)
+
+    for subscriber in (by_project, by_jha, by_both):
+        assert subscriber.queue.qsize() == 1
+        alert = subscriber.queue.get_nowait()
+        assert (alert["update_id"], alert["crew_alert"]) == (sent["id"], sent["crew_alert"])
+    assert elsewhere.queue.empty()
+    assert hub.stats()["queued"] == 3
+
+
+async def test_subscriber_that_falls_behind_is_evicted(hub):
+    slow = hub.subscribe([f"jha:{JHA_ID}"])
+    keeping_up = hub.subscribe([f"jha:{JHA_ID}"])
+    for _ in range(3):
+        await hub.publish(update())
+        keeping_up.queue.get_nowait()
+
+    assert slow.evicted.is_set() and not keeping_up.evicted.is_set()
+    assert hub.stats()["evictions"] == 1
+    # No longer receives anything
+    await hub.publish(update())
+    assert slow.queue.qsize() == 2
+    assert keeping_up.queue.qsize() == 1
+
+    hub.unsubscribe(keeping_up)
+    assert hub.stats()["connections"] == 0
+
+
+@pytest.mark.parametrize("text", ["x" * 20_000, "é" * 20_000], ids=["ascii", "non-ascii"])
+async def test_notify_payload_stays_under_the_postgres_limit(hub, text):
+    payloads = []
+    hub._pubsub.subscribe(ALERT_CHANNEL, payloads.append)
+    await hub.publish(update(crew_alert=text, action_required=text[:9000]))
+
+    [payload] = payloads
+    assert len(payload.encode("utf-8")) <= MAX_PAYLOAD_BYTES
+    alert = json.loads(payload)
+    for field in ("crew_alert", "action_required"):
+        assert alert[field].endswith("...") and alert[field].startswith(text[:100])
+    assert (alert["original_jha_id"], alert["updated_risk_score"]) == (JHA_ID, 92)
+
+
+def test_small_payload_is_unchanged():
+    alert = update()
+    assert json.loads(alert_payload(alert)) == alert
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(get_settings(), "alert_websocket_enabled", True)
+
+
+@pytest.fixture
+def ws_client(hub, monkeypatch):
+    monkeypatch.setattr(alerts, "alert_hub", hub)
+    return TestClient(app.main.app)
+
+
+async def subscribed(hub):
+    """The route subscribes just after accepting, once the client is connected"""
+    while not hub.stats()["connections"]:
+        await asyncio.sleep(0.01)
+
+
+def test_websocket_is_closed_unless_enabled(ws_client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with ws_client.websocket_connect(f"/api/v1/alerts/ws?project_id={PROJECT_ID}"):
+            pass
+    assert closed.value.code == 1008
+
+
+def test_websocket_requires_a_topic(ws_client, enabled):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with ws_client.websocket_connect("/api/v1/alerts/ws"):
+            pass
+    assert closed.value.code == 1008
+
+
+def test_websocket_delivers_alerts(ws_client, hub, enabled):
+    with ws_client.websocket_connect(f"/api/v1/alerts/ws?jha_id={JHA_ID}") as ws:
+        sent = update()
+        ws.portal.call(subscribed, hub)
+        ws.portal.call(hub.publish, update(original_jha_id=str(uuid4())))
+        ws.portal.call(hub.publish, sent)
+        alert = ws.receive_json()
+        assert (alert["update_id"], alert["alert_severity"]) == (sent["id"], "critical")
+    assert hub.stats()["delivered"] == 1
+
+
+def test_slow_websocket_is_closed_with_1013(ws_client, hub, enabled):
+    async def burst():
+        await subscribed(hub)
+        # Dispatched back to back: the send task gets no chance to drain
+        for _ in range(hub.queue_size + 1):
+            hub.dispatch(json.loads(alert_payload(update())))
+
+    with ws_client.websocket_connect(f"/api/v1/alerts/ws?project_id={PROJECT_ID}") as ws:
+        ws.portal.call(burst)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            while True:
+                ws.receive_json()
+    assert closed.value.code == 1013
+    assert hub.stats()["evictions"] == 1
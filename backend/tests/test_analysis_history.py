@@ -0,0 +1,64 @@
+"""Analyses created through /jha/analyze are listed, fetched and searchable"""
+
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.services.analysis_persister import analysis_persister
+from tests.conftest import PLACEHOLDER_USER_ID
+
+pytestmark = pytest.mark.postgres
+
+CHECKLIST = {
+    "checklist_data": {
+        "templateId": "master-jha",
+        "responses": {"sa-1": {"value": "Chicago IL, 45ft height"}, "sa-5": {"value": "18mph winds", "critical": True}}
+    },
+    "weather_conditions": {"windSpeed": 18, "temperature": 50}
+}
+
+
+async def analyze(client, **fields) -> str:
+    response = await client.post("/api/v1/jha/analyze", json={**CHECKLIST, **fields})
+    assert response.status_code == 200, response.text
+    # Write the queued analysis now instead of waiting for the background writer
+    await analysis_persister.stop()
+    return response.json()["analysis_id"]
+
+
+async def test_list_and_fetch_analysis_created_by_analyze(client, fake_agents):
+    analysis_id = await analyze(client)
+
+    listed = await client.get("/api/v1/jha/analyses")
+    assert listed.status_code == 200, listed.text
+    summary = next(item for item in listed.json()["items"] if item["id"] == analysis_id)
+    assert summary["user_id"] == str(PLACEHOLDER_USER_ID)
+    assert summary["go_no_go_decision"] == "GO_WITH_CONDITIONS"
+    assert summary["top_hazard_category"] == "Falls"
+
+    detail = await client.get(f"/api/v1/jha/analysis/{analysis_id}", params={"include_outputs": True})
+    assert detail.status_code == 200, detail.text
+    assert detail.json()["user_id"] == str(PLACEHOLDER_USER_ID)
+    assert [output["agent_id"] for output in detail.json()["agent_outputs"]] == [
+        "jha_validator", "risk_assessor", "swiss_cheese_analyzer", "synthesis_agent"
+    ]
+
+    body = await client.get(f"/api/v1/jha/analysis/{analysis_id}/response")
+    assert body.status_code == 200
+    assert json.loads(body.text)["executiveSummary"]["decision"] == "GO_WITH_CONDITIONS"
+
+
+async def test_risk_board_and_hazard_search_return_stored_analysis(client, fake_agents):
+    project_id = str(uuid4())
+    analysis_id = await analyze(client, project_id=project_id)
+
+    board = await client.get("/api/v1/jha/risk-board", params={"project_id": project_id})
+    assert board.status_code == 200, board.text
+    assert board.json()["analyses"] == 1
+    assert board.json()["highest_risk"][0]["id"] == analysis_id
+
+    hazards = await client.get("/api/v1/jha/hazards/search", params={"project_id": project_id})
+    assert hazards.status_code == 200, hazards.text
+    assert hazards.json()["analysis_ids"] == [analysis_id]
+    assert hazards.json()["items"][0]["osha_standard"] == "1926.501"
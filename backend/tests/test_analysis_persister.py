@@ -0,0 +1,118 @@
+"""Write-behind analysis storage: spooling, replay and wait_written"""
+
+import asyncio
+import sys
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.agents import orchestrator
+from app.core.database import AsyncSessionLocal
+from app.models.analysis import AnalysisHistory
+from app.services.analysis_persister import AnalysisPersister
+from tests.test_analysis_history import CHECKLIST
+from tests.test_live_update import WIND_UPDATE
+
+pytestmark = pytest.mark.postgres
+
+# app.services re-exports the singleton under the module's name
+persister_module = sys.modules[AnalysisPersister.__module__]
+
+
+def database_down():
+    raise ConnectionRefusedError("database is down")
+
+
+@pytest.fixture
+async def persister(tmp_path, monkeypatch):
+    persister = AnalysisPersister(spool_path=tmp_path / "spool.jsonl", flush_interval_ms=10, spool_replay_interval=0.05)
+    monkeypatch.setattr(orchestrator, "analysis_persister", persister)
+    monkeypatch.setattr(persister_module, "RETRY_DELAYS", ())
+    yield persister
+    persister.session_factory = AsyncSessionLocal
+    await persister.stop()
+
+
+@pytest.fixture
+def submitted(persister, monkeypatch):
+    """Records passed to submit(), in order"""
+    records = []
+    submit = persister.submit
+
+    def capture(analysis, outputs, hazards=None):
+        records.append({"analysis": analysis, "outputs": outputs, "hazards": hazards})
+        submit(analysis, outputs, hazards)
+    monkeypatch.setattr(persister, "submit", capture)
+    return records
+
+
+async def analyze(client) -> UUID:
+    response = await client.post("/api/v1/jha/analyze", json=CHECKLIST)
+    assert response.status_code == 200, response.text
+    return UUID(response.json()["analysis_id"])
+
+
+async def stored(db, analysis_id: UUID) -> bool:
+    return await db.scalar(select(AnalysisHistory.id).where(AnalysisHistory.id == analysis_id)) is not None
+
+
+async def test_queue_full_analysis_is_replayed_before_a_live_update(client, db, fake_agents, persister):
+    persister._queue = asyncio.Queue(maxsize=1)
+    queued = await analyze(client)
+    spooled = await analyze(client)
+    assert persister.stats()["spooled"] == 1
+    assert not await stored(db, spooled)
+
+    response = await client.post("/api/v1/jha/live-update", json={"original_jha_id": str(spooled), **WIND_UPDATE})
+    assert response.status_code == 200, response.text
+    assert await stored(db, spooled)
+    assert not persister.spool_path.exists()
+    assert await persister.wait_written(queued) is True
+
+
+async def test_spooled_analysis_is_not_written_until_the_writer_replays_it(client, db, fake_agents, persister):
+    await persister.start()
+    persister.session_factory = database_down
+    analysis_id = await analyze(client)
+
+    assert await persister.wait_written(analysis_id, timeout=0.5) is False
+    assert persister.spool_path.exists()
+    assert not await stored(db, analysis_id)
+
+    # The background writer replays the spool once the database is back
+    persister.session_factory = AsyncSessionLocal
+    assert await persister.wait_written(analysis_id, timeout=5) is True
+    assert await stored(db, analysis_id)
+    assert not persister.spool_path.exists()
+
+
+async def test_replay_follows_a_successful_write(client, db, fake_agents, persister):
+    # Only the successful write can trigger the replay
+    persister.spool_replay_interval = 3600
+    persister.session_factory = database_down
+    spooled = await analyze(client)
+    assert await persister.wait_written(spooled, timeout=0.1) is False
+
+    persister.session_factory = AsyncSessionLocal
+    await persister.start()
+    written = await analyze(client)
+    assert await persister.wait_written(written) is True
+    assert await persister.wait_written(spooled, timeout=5) is True
+    assert await stored(db, spooled)
+
+
+async def test_rejected_analysis_is_reported_not_written(client, fake_agents, persister, submitted):
+    await analyze(client)
+    await persister.stop()
+
+    # No such user: the foreign key rejects the row
+    orphan = {**submitted[0]["analysis"], "id": uuid4(), "user_id": uuid4()}
+    persister.submit(orphan, [])
+    assert await persister.wait_written(orphan["id"], timeout=5) is False
+    assert persister.stats()["rejected"] == 1
+    assert persister.rejected_path.exists()
+
+
+async def test_unknown_analysis_counts_as_written(persister):
+    assert await persister.wait_written(uuid4()) is True
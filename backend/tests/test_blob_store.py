@@ -0,0 +1,88 @@
+"""Content-addressed blob storage: round trips, deduplication and codecs"""
+
+import hashlib
+import sys
+
+import pytest
+
+from app.services.blob_store import BlobStore, decompress, encode_json, pack
+
+# app.services re-exports the singleton under the module's name
+blob_module = sys.modules[BlobStore.__module__]
+
+REPORT = {"finalReport": {"executiveSummary": {"decision": "NO_GO"}, "hazards": ["Falls"] * 200}}
+RESPONSE = "Wind 35 mph at 120ft: stop crane picks. " * 100
+
+
+@pytest.fixture(params=["filesystem", pytest.param("db", marks=pytest.mark.postgres)])
+async def store(request, tmp_path, db):
+    store = BlobStore(backend=request.param, root=tmp_path / "blobs", min_bytes=512)
+    yield store
+    await db.rollback()
+
+
+async def test_offload_round_trip(store, db):
+    rows = [
+        {"id": 1, "response": RESPONSE},
+        {"id": 2, "response": "short"},
+        {"id": 3, "response": None}
+    ]
+    stored = await store.offload(db, rows, "response", "response_blob", text=True)
+
+    assert [(row["response"], row["response_blob"]) for row in stored] == [
+        ("", hashlib.sha256(RESPONSE.encode()).hexdigest()), ("short", None), (None, None)
+    ]
+    assert rows[0]["response"] == RESPONSE  # Input rows are not modified
+    assert await store.get_text(db, stored[0]["response_blob"]) == RESPONSE
+    assert await store.size(db, stored[0]["response_blob"]) == len(RESPONSE)
+
+
+async def test_json_payloads_hash_canonically(store, db):
+    reordered = {"finalReport": dict(reversed(list(REPORT["finalReport"].items())))}
+    stored = await store.offload(db, [{"output_data": REPORT}, {"output_data": reordered}], "output_data", "output_blob")
+
+    assert stored[0]["output_blob"] == stored[1]["output_blob"]
+    assert stored[0]["output_data"] == {}
+    assert await store.get_json(db, stored[0]["output_blob"]) == REPORT
+
+
+async def test_identical_payloads_are_stored_once(store, db):
+    await store.offload(db, [{"output_data": REPORT}] * 3, "output_data", "output_blob")
+    await store.offload(db, [{"output_data": REPORT}, {"output_data": {"other": "x" * 1000}}], "output_data", "output_blob")
+
+    stats = store.stats()
+    assert (stats["blobs_written"], stats["dedup_hits"]) == (2, 3)
+    assert stats["bytes_stored"] < stats["bytes_in"]
+
+
+async def test_missing_blob(store, db):
+    with pytest.raises(KeyError):
+        await store.get(db, "0" * 64)
+    assert await store.size(db, "0" * 64) is None
+
+
+async def test_zlib_is_used_without_zstandard(store, db, monkeypatch):
+    monkeypatch.setattr(blob_module, "ZSTD_AVAILABLE", False)
+    blob = pack(encode_json(REPORT))
+    assert blob["codec"] == "zlib"
+    assert store.stats()["codec"] == "zlib"
+
+    await store.put_many(db, [blob])
+    assert await store.get_json(db, blob["hash"]) == REPORT
+
+
+@pytest.mark.skipif(not blob_module.ZSTD_AVAILABLE, reason="zstandard not installed")
+def test_zstd_blobs_need_zstandard_to_read(monkeypatch):
+    blob = pack(encode_json(REPORT))
+    assert blob["codec"] == "zstd"
+
+    monkeypatch.setattr(blob_module, "ZSTD_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="zstandard"):
+        decompress("zstd", blob["data"])
+
+
+def test_unknown_codec_or_backend():
+    with pytest.raises(ValueError):
+        decompress("lz4", b"")
+    with pytest.raises(ValueError):
+        BlobStore(backend="s3")
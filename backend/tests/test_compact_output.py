@@ -0,0 +1,68 @@
+"""Compact agent output expands to the verbose shape"""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from app.agents.output_schema import compact_schema
+from app.agents.profiles.jha_validator import JHAValidatorAgent
+from app.agents.profiles.risk_assessor import RiskAssessorAgent
+from app.agents.profiles.swiss_cheese_analyzer import SwissCheeseAnalyzerAgent
+
+SAMPLE_VALUES = {"string": "text", "number": 0.5, "integer": 1}
+
+
+def sample(schema: Dict[str, Any]) -> Any:
+    """A value matching the schema, with one item per array"""
+    if schema["type"] == "object":
+        return {key: sample(value) for key, value in schema["properties"].items()}
+    if schema["type"] == "array":
+        return [sample(schema["items"])]
+    return SAMPLE_VALUES[schema["type"]]
+
+
+def missing_paths(schema: Dict[str, Any], data: Any, path: str = "") -> List[str]:
+    """Schema properties absent from data, as dotted paths"""
+    if schema["type"] == "object":
+        missing = []
+        for key, value in schema["properties"].items():
+            if key not in data:
+                missing.append(f"{path}{key}")
+            else:
+                missing += missing_paths(value, data[key], f"{path}{key}.")
+        return missing
+    if schema["type"] == "array":
+        return [p for item in data for p in missing_paths(schema["items"], item, f"{path}[].")]
+    return []
+
+
+def expand(agent, compact: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(agent, JHAValidatorAgent):
+        return agent.expand_compact_output(compact, "Steel Erection", "18mph wind, 50F")
+    return agent.expand_compact_output(compact)
+
+
+@pytest.mark.parametrize("agent_class", [JHAValidatorAgent, RiskAssessorAgent, SwissCheeseAnalyzerAgent])
+def test_compact_output_expands_to_every_verbose_field(agent_class):
+    agent = agent_class(registry=None)
+    compact = sample(compact_schema(agent.OUTPUT_SCHEMA, agent.COMPACT_KEYS))
+    # The compact answer really does leave fields out
+    assert missing_paths(agent.OUTPUT_SCHEMA, compact)
+
+    expanded = expand(agent, compact)
+    assert missing_paths(agent.OUTPUT_SCHEMA, expanded) == []
+
+
+def test_dropped_narrative_fields_come_back_empty():
+    risk = expand(RiskAssessorAgent(registry=None), sample(compact_schema(RiskAssessorAgent.OUTPUT_SCHEMA, RiskAssessorAgent.COMPACT_KEYS)))
+    assert risk["riskSummary"]["industryContext"] == ""
+    assert risk["hazards"][0]["oshaContext"] == ""
+    assert risk["topThreats"] == ["text (Risk Score: 1)"]
+
+    swiss = expand(SwissCheeseAnalyzerAgent(registry=None), sample(compact_schema(SwissCheeseAnalyzerAgent.OUTPUT_SCHEMA, SwissCheeseAnalyzerAgent.COMPACT_KEYS)))
+    assert swiss["causalChain"]["organizationalInfluences"][0]["contribution"] == ""
+    assert swiss["causalChain"]["unsafeSupervision"][0]["enablement"] == ""
+    assert swiss["leadingIndicators"][0]["observability"] == ""
+    assert set(swiss["swissCheeseAlignment"].values()) == {""}
+    # Generated values are untouched
+    assert swiss["causalChain"]["organizationalInfluences"][0]["factor"] == "text"
@@ -0,0 +1,113 @@
+"""Hazard rows extracted from risk assessments and the cross-analysis search"""
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.core.database import upsert
+from app.models.analysis import AnalysisHazard
+from app.services.hazard_index import HazardSearchService, extract_hazard_rows, normalize_osha_standard
+
+NOW = datetime.utcnow()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("OSHA 1926.501(b)(1)", "1926.501"),
+    ("29 CFR 1910.147 lockout/tagout", "1910.147"),
+    ("1926.1431(a) crane hoisting, see also 1926.502", "1926.1431"),
+    ("1926.501", "1926.501"),
+    ("Per 1926 Subpart M", None),
+    ("ANSI A10.32", None),
+    ("", None),
+    (None, None)
+])
+def test_osha_citations_normalize_to_part_and_section(text, expected):
+    assert normalize_osha_standard(text) == expected
+
+
+def test_extract_hazard_rows():
+    analysis_id, company_id = uuid4(), uuid4()
+    risk_data = {"hazards": [
+        {"name": "Fall from steel", "category": "Falls", "riskScore": 82, "riskLevel": "HIGH",
+         "regulatoryRequirement": "OSHA 1926.760(a)(1)"},
+        # No regulatory requirement: the citation comes from the context
+        {"name": "Struck by load", "riskScore": "64", "oshaContext": "Crane rules in 1926.1424 apply"},
+        {"riskScore": "high"},
+        "not a hazard"
+    ]}
+    rows = extract_hazard_rows(analysis_id, risk_data, NOW, company_id=company_id)
+
+    assert [(row["name"], row["category"], row["risk_score"], row["risk_level"], row["osha_standard"]) for row in rows] == [
+        ("Fall from steel", "Falls", 82, "HIGH", "1926.760"),
+        ("Struck by load", "Other", 64, None, "1926.1424"),
+        ("Unnamed hazard", "Other", 0, None, None)
+    ]
+    assert {(row["analysis_id"], row["company_id"], row["project_id"], row["created_at"]) for row in rows} == {
+        (analysis_id, company_id, None, NOW)
+    }
+    assert len({row["id"] for row in rows}) == 3
+
+
+@pytest.mark.parametrize("risk_data", [{}, {"hazards": None}, {"hazards": []}])
+def test_assessment_without_hazards_has_no_rows(risk_data):
+    assert extract_hazard_rows(uuid4(), risk_data, NOW) == []
+
+
+@pytest.fixture
+async def indexed(db):
+    """Hazards from three analyses of one project (ids unique to the test)"""
+    project_id, company_id = uuid4(), uuid4()
+    analyses = {
+        "recent": (uuid4(), NOW - timedelta(days=2)),
+        "older": (uuid4(), NOW - timedelta(days=20)),
+        "stale": (uuid4(), NOW - timedelta(days=200))
+    }
+    hazards = {
+        "recent": [{"name": "Fall at 45ft", "category": "Falls", "riskScore": 85, "regulatoryRequirement": "1926.501(b)(1)"},
+                   {"name": "Pinch point", "category": "Caught-in", "riskScore": 40}],
+        "older": [{"name": "Ladder fall", "category": "Falls", "riskScore": 55, "regulatoryRequirement": "OSHA 1926.1053"}],
+        "stale": [{"name": "Roof edge", "category": "Falls", "riskScore": 90, "regulatoryRequirement": "1926.501(b)(10)"}]
+    }
+    rows = [
+        row
+        for key, (analysis_id, created_at) in analyses.items()
+        for row in extract_hazard_rows(analysis_id, {"hazards": hazards[key]}, created_at, company_id, project_id)
+    ]
+    await db.execute(upsert(AnalysisHazard).values(rows))
+    await db.commit()
+    return {"project_id": project_id, "company_id": company_id, **{key: value[0] for key, value in analyses.items()}}
+
+
+@pytest.mark.postgres
+async def test_search_filters_and_orders_newest_first(db, indexed):
+    search = HazardSearchService(db).search
+
+    falls = await search(project_id=indexed["project_id"], category="Falls")
+    assert [item["name"] for item in falls["items"]] == ["Fall at 45ft", "Ladder fall", "Roof edge"]
+    assert falls["analysis_ids"] == [indexed["recent"], indexed["older"], indexed["stale"]]
+
+    recent_severe = await search(company_id=indexed["company_id"], category="Falls", min_risk_score=60, days=90)
+    assert [item["name"] for item in recent_severe["items"]] == ["Fall at 45ft"]
+
+    everything = await search(project_id=indexed["project_id"], days=30)
+    assert everything["analysis_ids"] == [indexed["recent"], indexed["older"]]
+    assert len(everything["items"]) == 3
+
+    assert (await search(project_id=indexed["project_id"], limit=1))["analysis_ids"] == [indexed["recent"]]
+
+
+@pytest.mark.postgres
+async def test_search_by_osha_citation_in_any_form(db, indexed):
+    search = HazardSearchService(db).search
+    for citation in ("1926.501", "1926.501(b)(1)", "OSHA 1926.501(b)(10)"):
+        result = await search(project_id=indexed["project_id"], osha_standard=citation)
+        assert [item["name"] for item in result["items"]] == ["Fall at 45ft", "Roof edge"]
+    assert (await search(project_id=indexed["project_id"], osha_standard="1926.1053"))["analysis_ids"] == [indexed["older"]]
+
+
+@pytest.mark.postgres
+async def test_search_returns_the_query_plan_on_request(db, indexed):
+    result = await HazardSearchService(db).search(explain_plan=True, category="Falls", days=30)
+    plan = "\n".join(str(line) for row in result["query_plan"] for line in row)
+    assert "analysis_hazards" in plan
@@ -0,0 +1,56 @@
+"""init_db.py on a database created before the current models"""
+
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select, text
+
+from app.core.database import engine
+from app.models.analysis import AnalysisHistory
+from app.models.user import PLACEHOLDER_USER_ID, User
+from app.services.analysis_persister import analysis_persister
+from init_db import add_missing_columns, create_tables
+from tests.test_analysis_history import CHECKLIST
+
+pytestmark = pytest.mark.usefixtures("clean_agent_configs")
+
+OLD_SHAPE_INSERT = text(
+    "INSERT INTO agent_configurations (user_id, agent_name, model, temperature, max_tokens, is_active, "
+    "created_at, updated_at, total_executions) "
+    "VALUES ('admin', :agent_name, 'deepseek/deepseek-chat-v3.1:free', 0.7, 4000, :active, :now, :now, 0)"
+)
+
+
+async def test_output_mode_is_added_and_backfilled(capsys):
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ALTER TABLE agent_configurations DROP COLUMN output_mode")
+        await conn.execute(OLD_SHAPE_INSERT, {"agent_name": "validator", "active": True, "now": datetime.utcnow()})
+
+    async with engine.begin() as conn:
+        await conn.run_sync(add_missing_columns)
+    assert "agent_configurations.output_mode" in capsys.readouterr().out
+
+    async with engine.begin() as conn:
+        # Writers that predate the column (raw SQL, the V1 app) still insert
+        await conn.execute(OLD_SHAPE_INSERT, {"agent_name": "risk_assessor", "active": True, "now": datetime.utcnow()})
+        rows = (await conn.execute(text("SELECT agent_name, output_mode FROM agent_configurations ORDER BY id"))).all()
+    assert [tuple(row) for row in rows] == [("validator", "verbose"), ("risk_assessor", "verbose")]
+
+
+@pytest.mark.postgres
+async def test_analyses_are_stored_under_the_seeded_placeholder_user(client, db, fake_agents):
+    # The session schema came from create_tables(); running it again is harmless
+    assert await create_tables()
+    users = (await db.execute(select(User.id, User.is_active).where(User.id == PLACEHOLDER_USER_ID))).all()
+    assert [tuple(user) for user in users] == [(PLACEHOLDER_USER_ID, False)]
+
+    rejected_before = analysis_persister.rejected
+    response = await client.post("/api/v1/jha/analyze", json=CHECKLIST)
+    assert response.status_code == 200, response.text
+    analysis_id = UUID(response.json()["analysis_id"])
+    await analysis_persister.stop()
+
+    assert analysis_persister.rejected == rejected_before
+    stored = (await db.execute(select(AnalysisHistory.user_id).where(AnalysisHistory.id == analysis_id))).scalar_one()
+    assert stored == PLACEHOLDER_USER_ID
@@ -0,0 +1,67 @@
+"""Live updates of an analysis created moments earlier through /jha/analyze"""
+
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from app.models.jha_updates import JHAUpdate
+from app.services import jha_service
+from app.services.alert_hub import alert_hub
+from app.services.analysis_persister import analysis_persister
+from tests.conftest import PLACEHOLDER_USER_ID
+from tests.test_analysis_history import CHECKLIST
+
+pytestmark = pytest.mark.postgres
+
+WIND_UPDATE = {"voice_input": "wind now 35 mph gusting", "extracted_variables": {"wind_speed": 35}}
+
+
+@pytest.fixture
+def published(monkeypatch):
+    alerts = []
+
+    async def publish(update):
+        alerts.append(update)
+    monkeypatch.setattr(alert_hub, "publish", publish)
+    return alerts
+
+
+async def analyze_without_flush(client) -> str:
+    response = await client.post("/api/v1/jha/analyze", json=CHECKLIST)
+    assert response.status_code == 200, response.text
+    return response.json()["analysis_id"]
+
+
+async def stored_updates(db, analysis_id: str):
+    return (await db.scalars(select(JHAUpdate).where(JHAUpdate.original_jha_id == UUID(analysis_id)))).all()
+
+
+@pytest.mark.parametrize("writer_running", [False, True])
+async def test_live_update_right_after_analyze(client, db, fake_agents, published, writer_running):
+    if writer_running:
+        await analysis_persister.start()
+    try:
+        analysis_id = await analyze_without_flush(client)
+        response = await client.post("/api/v1/jha/live-update", json={"original_jha_id": analysis_id, **WIND_UPDATE})
+    finally:
+        await analysis_persister.stop()
+
+    assert response.status_code == 200, response.text
+    assert response.json()["original_jha_id"] == analysis_id
+    assert response.json()["user_id"] == str(PLACEHOLDER_USER_ID)
+    assert response.json()["changes"] == {"weather.windSpeed": 35}
+    assert [update.id for update in await stored_updates(db, analysis_id)] == [UUID(response.json()["id"])]
+
+
+async def test_invalid_response_stores_and_publishes_nothing(client, db, fake_agents, published, monkeypatch):
+    analysis_id = await analyze_without_flush(client)
+
+    def invalid_response(**update):
+        raise RuntimeError("response does not match JHALiveUpdateResponse")
+    monkeypatch.setattr(jha_service, "JHALiveUpdateResponse", invalid_response)
+    response = await client.post("/api/v1/jha/live-update", json={"original_jha_id": analysis_id, **WIND_UPDATE})
+
+    assert response.status_code == 500
+    assert await stored_updates(db, analysis_id) == []
+    assert published == []
@@ -0,0 +1,103 @@
+"""Batched agent metrics: log rows, hourly rollup and running averages"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.agent_config import AgentConfiguration, AgentPerformanceHourly, AgentPerformanceLog
+from app.services.metrics_sink import AgentMetricsSink
+from app.services.performance_analytics import latency_bucket
+
+pytestmark = pytest.mark.usefixtures("clean_agent_configs")
+
+MODEL = "deepseek/deepseek-chat-v3.1:free"
+HOUR = datetime(2026, 3, 2, 14)
+
+
+@pytest.fixture
+async def configs(db):
+    rows = [AgentConfiguration(user_id="admin", agent_name=name, model=MODEL) for name in ("validator", "risk_assessor")]
+    db.add_all(rows)
+    await db.commit()
+    return {row.agent_name: row.id for row in rows}
+
+
+def batch(sink: AgentMetricsSink, *runs, minute: int = 5):
+    """Record (agent_name, execution_time_ms) runs and take them off the queue"""
+    for i, (agent_name, execution_time_ms) in enumerate(runs):
+        sink.record(agent_name, f"exec-{minute}-{i}", execution_time_ms,
+                    {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+                    success=agent_name != "risk_assessor", model=MODEL)
+    records = sink._take_all()
+    for record in records:
+        record["executed_at"] = HOUR.replace(minute=minute)
+    return records
+
+
+async def test_flush_writes_one_log_row_per_configured_run(db, configs, capsys):
+    sink = AgentMetricsSink()
+    await sink._flush(batch(sink, ("validator", 120.0), ("risk_assessor", 340.0), ("unknown_agent", 10.0)))
+
+    logs = (await db.execute(select(AgentPerformanceLog).order_by(AgentPerformanceLog.execution_id))).scalars().all()
+    assert [(log.config_id, log.agent_name, log.execution_time_ms, log.success) for log in logs] == [
+        (configs["validator"], "validator", 120.0, True),
+        (configs["risk_assessor"], "risk_assessor", 340.0, False)
+    ]
+    assert {(log.model, log.token_usage_input, log.token_usage_output, log.token_usage_total) for log in logs} == {(MODEL, 100, 50, 150)}
+    assert "1 records for unconfigured agents skipped" in capsys.readouterr().out
+    assert sink.stats()["written"] == 2
+
+
+async def test_flushes_add_into_the_hourly_rollup(db, configs):
+    sink = AgentMetricsSink()
+    await sink._flush(batch(sink, ("validator", 120.0), ("validator", 121.0), ("validator", 900.0), minute=5))
+    await sink._flush(batch(sink, ("validator", 120.5), ("risk_assessor", 340.0), minute=40))
+
+    rows = (await db.execute(select(AgentPerformanceHourly))).scalars().all()
+    rollup = {(row.hour, row.agent_name, row.model, row.latency_bucket): row for row in rows}
+    assert set(rollup) == {
+        (HOUR, "validator", MODEL, latency_bucket(120.0)),
+        (HOUR, "validator", MODEL, latency_bucket(900.0)),
+        (HOUR, "risk_assessor", MODEL, latency_bucket(340.0))
+    }
+
+    # The second flush was upserted into the row the first one created
+    fast = rollup[(HOUR, "validator", MODEL, latency_bucket(120.0))]
+    assert (fast.executions, fast.successes, fast.total_time_ms, fast.output_tokens) == (3, 3, 361.5, 150)
+    failed = rollup[(HOUR, "risk_assessor", MODEL, latency_bucket(340.0))]
+    assert (failed.executions, failed.successes) == (1, 0)
+
+
+async def test_running_average_folds_in_each_flush(db, configs):
+    sink = AgentMetricsSink()
+    await sink._flush(batch(sink, ("validator", 100.0), ("validator", 200.0), ("risk_assessor", 50.0), minute=5))
+    await sink._flush(batch(sink, ("validator", 600.0), minute=30))
+
+    result = await db.execute(
+        select(AgentConfiguration.agent_name, AgentConfiguration.total_executions,
+               AgentConfiguration.avg_execution_time_ms, AgentConfiguration.last_used_at)
+    )
+    stats = {name: (total, avg, last_used) for name, total, avg, last_used in result}
+    assert stats == {
+        "validator": (3, pytest.approx(300.0), HOUR.replace(minute=30)),
+        "risk_assessor": (1, pytest.approx(50.0), HOUR.replace(minute=5))
+    }
+
+
+async def test_stop_drains_the_queue(db, configs):
+    sink = AgentMetricsSink(flush_interval_ms=10)
+    await sink.start()
+    for i in range(5):
+        sink.record("validator", f"exec-{i}", 100.0, None, success=True)
+    await sink.stop()
+
+    assert sink.stats() == {"queued": 0, "recorded": 5, "written": 5, "dropped": 0, "failed": 0}
+    total = (await db.execute(select(AgentConfiguration.total_executions).where(AgentConfiguration.agent_name == "validator"))).scalar_one()
+    assert total == 5
+
+
+def test_full_queue_drops_and_counts():
+    sink = AgentMetricsSink(max_queue_size=2)
+    assert [sink.record("validator", str(i), 1.0, None, success=True) for i in range(3)] == [True, True, False]
+    assert (sink.recorded, sink.dropped) == (2, 1)
@@ -0,0 +1,197 @@
+"""Monthly partitioning on PostgreSQL: one-time conversion, archive and restore"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import AsyncSessionLocal, engine
+from app.models.analysis import AgentOutput, AnalysisHazard, AnalysisHistory
+from app.models.jha_updates import JHAUpdate
+from app.services.hazard_index import HazardSearchService
+from app.services.partitioning import (
+    PartitionManager,
+    add_months,
+    create_partition,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    setup_partitions
+)
+from tests.conftest import PLACEHOLDER_USER_ID
+
+pytestmark = pytest.mark.postgres
+
+# Each test writes to its own months: rows left by one test would be
+# archived or restored by another
+THIS_MONTH = month_start(datetime.utcnow())
+
+ANALYSIS = AnalysisHistory.__table__
+
+
+def analysis_row(created_at: datetime, **fields) -> dict:
+    return {
+        "id": uuid4(),
+        "user_id": PLACEHOLDER_USER_ID,
+        "query": "JHA Analysis - Test Tower",
+        "response": "{}",
+        "type": "jha_multi_agent_analysis",
+        "created_at": created_at,
+        **fields
+    }
+
+
+async def relkind(conn, name: str):
+    return (await conn.execute(text("SELECT relkind::text FROM pg_class WHERE relname = :name"), {"name": name})).scalar()
+
+
+async def count(conn, table, *where) -> int:
+    return (await conn.execute(select(func.count()).select_from(table).where(*where))).scalar()
+
+
+@pytest.fixture
+async def plain_analysis_history():
+    """
+    analysis_history as it was before partitioning: a plain table keyed on
+    id, with rows in three months and a foreign key pointing at it
+    """
+    rows = [analysis_row(created_at) for created_at in (
+        add_months(THIS_MONTH, -14) + timedelta(days=2), add_months(THIS_MONTH, -1) + timedelta(days=5), datetime.utcnow()
+    )]
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE TABLE analysis_history_plain (LIKE analysis_history INCLUDING DEFAULTS)")
+        await conn.exec_driver_sql("DROP TABLE analysis_history")
+        await conn.exec_driver_sql("ALTER TABLE analysis_history_plain RENAME TO analysis_history")
+        await conn.exec_driver_sql("ALTER TABLE analysis_history ADD PRIMARY KEY (id)")
+        await conn.exec_driver_sql(
+            "CREATE TABLE legacy_links (id serial PRIMARY KEY, analysis_id uuid REFERENCES analysis_history (id))"
+        )
+        await conn.execute(insert(ANALYSIS), rows)
+        await conn.execute(text("INSERT INTO legacy_links (analysis_id) VALUES (:id)"), {"id": rows[0]["id"]})
+    yield rows
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("DROP VIEW IF EXISTS analysis_ids")
+        await conn.exec_driver_sql("DROP TABLE IF EXISTS legacy_links")
+        if not await conn.run_sync(is_partitioned, ANALYSIS):
+            await conn.run_sync(setup_partitions)
+
+
+async def test_conversion_copies_rows_into_monthly_partitions(plain_analysis_history):
+    async with engine.begin() as conn:
+        await conn.run_sync(setup_partitions)
+
+    async with engine.connect() as conn:
+        assert await conn.run_sync(is_partitioned, ANALYSIS)
+        assert await relkind(conn, "analysis_history_legacy") is None
+        months = await conn.run_sync(list_partitions, ANALYSIS)
+        assert add_months(THIS_MONTH, -14) in months and THIS_MONTH in months
+
+        stored = (await conn.execute(select(ANALYSIS.c.id))).scalars().all()
+        assert sorted(stored) == sorted(row["id"] for row in plain_analysis_history)
+
+        # The foreign key into the old table is gone; its rows are not
+        assert await count(conn, text("legacy_links")) == 1
+        foreign_keys = (await conn.execute(text(
+            "SELECT count(*) FROM pg_constraint WHERE conrelid = 'legacy_links'::regclass AND contype = 'f'"
+        ))).scalar()
+        assert foreign_keys == 0
+
+        indexes = (await conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'analysis_history'"
+        ))).scalars().all()
+        assert "analysis_history_user_created_id_idx" in indexes
+
+
+async def test_conversion_rolls_back_when_other_objects_depend_on_the_table(plain_analysis_history):
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE VIEW analysis_ids AS SELECT id FROM analysis_history")
+
+    with pytest.raises(DBAPIError, match="depend"):
+        async with engine.begin() as conn:
+            await conn.run_sync(setup_partitions)
+
+    async with engine.connect() as conn:
+        assert await relkind(conn, "analysis_history") == "r"
+        assert await count(conn, ANALYSIS) == len(plain_analysis_history)
+        assert await relkind(conn, "analysis_ids") == "v"
+
+
+async def test_archive_and_restore_month_with_dependent_rows(tmp_path: Path):
+    month = add_months(THIS_MONTH, -16)  # Past the default 12-month retention
+    project_id = uuid4()
+    expired = analysis_row(month + timedelta(days=3), project_id=project_id)
+    current = analysis_row(datetime.utcnow(), project_id=project_id)
+
+    async with engine.begin() as conn:
+        for table in (ANALYSIS, AgentOutput.__table__):
+            await conn.run_sync(create_partition, table, month)
+        await conn.execute(insert(ANALYSIS), [expired, current])
+        await conn.execute(insert(AgentOutput.__table__), [{
+            "id": uuid4(), "analysis_id": expired["id"], "agent_id": "risk_assessor", "agent_name": "agent2_risk",
+            "agent_type": "risk_assessment", "output_data": {"hazards": []}, "created_at": expired["created_at"]
+        }])
+        await conn.execute(insert(AnalysisHazard.__table__), [{
+            "id": uuid4(), "analysis_id": analysis["id"], "project_id": project_id, "category": "Falls",
+            "name": "Fall from steel", "risk_score": 80, "created_at": analysis["created_at"]
+        } for analysis in (expired, current)])
+        await conn.execute(insert(JHAUpdate.__table__), [{
+            "id": uuid4(), "original_jha_id": expired["id"], "user_id": PLACEHOLDER_USER_ID,
+            "voice_input": "wind now 35 mph", "created_at": datetime.utcnow()
+        }])
+
+    async def search_ids():
+        async with AsyncSessionLocal() as session:
+            return set((await HazardSearchService(session).search(project_id=project_id))["analysis_ids"])
+
+    assert await search_ids() == {expired["id"], current["id"]}
+
+    manager = PartitionManager(engine, archive_dir=tmp_path / "archive")
+    archived = {entry["table"]: entry for entry in await manager.archive_expired() if entry["month"] == f"{month:%Y-%m}"}
+    assert set(archived) == {"analysis_history", "agent_outputs"}
+
+    entry = archived["analysis_history"]
+    assert {dependent["table"]: dependent["rows"] for dependent in entry["dependents"]} == {"analysis_hazards": 1, "jha_updates": 1}
+    for file in [entry["file"]] + [dependent["file"] for dependent in entry["dependents"]]:
+        assert (manager.archive_dir / file).exists()
+    assert not list(manager.archive_dir.rglob("*.partial"))
+
+    async with engine.connect() as conn:
+        assert month not in await conn.run_sync(list_partitions, ANALYSIS)
+        assert await count(conn, ANALYSIS, ANALYSIS.c.id == expired["id"]) == 0
+        assert await count(conn, AnalysisHazard.__table__, AnalysisHazard.analysis_id == expired["id"]) == 0
+        assert await count(conn, JHAUpdate.__table__, JHAUpdate.original_jha_id == expired["id"]) == 0
+    # Search no longer points at the archived analysis
+    assert await search_ids() == {current["id"]}
+
+    assert await manager.restore_partition("analysis_history", month) == 1
+    assert await manager.restore_partition("agent_outputs", month) == 1
+    async with engine.connect() as conn:
+        assert await count(conn, ANALYSIS, ANALYSIS.c.id == expired["id"]) == 1
+        assert await count(conn, AgentOutput.__table__, AgentOutput.analysis_id == expired["id"]) == 1
+        assert await count(conn, JHAUpdate.__table__, JHAUpdate.original_jha_id == expired["id"]) == 1
+    assert await search_ids() == {expired["id"], current["id"]}
+
+    # Restored months are held back from the next archive run
+    rerun = await manager.archive_expired()
+    assert not [e for e in rerun if e["month"] == f"{month:%Y-%m}"]
+
+
+async def test_restore_rejects_a_tampered_archive(tmp_path: Path):
+    month = add_months(THIS_MONTH, -20)
+    async with engine.begin() as conn:
+        await conn.run_sync(create_partition, ANALYSIS, month)
+        await conn.execute(insert(ANALYSIS), [analysis_row(month + timedelta(days=1))])
+
+    manager = PartitionManager(engine, archive_dir=tmp_path / "archive")
+    entry = await manager.archive_partition("analysis_history", month)
+    with open(manager.archive_dir / entry["file"], "ab") as f:
+        f.write(b"tampered")
+
+    with pytest.raises(RuntimeError, match="checksum"):
+        await manager.restore_partition("analysis_history", month)
+    async with engine.connect() as conn:
+        assert month not in await conn.run_sync(list_partitions, ANALYSIS)
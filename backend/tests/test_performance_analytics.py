@@ -0,0 +1,112 @@
+"""Performance dashboard queries over the hourly rollup"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.performance_analytics import (
+    bucket_latency_ms,
+    hourly_rollup_rows,
+    latency_bucket,
+    performance_summary,
+    upsert_hourly_rollup
+)
+
+pytestmark = pytest.mark.usefixtures("clean_agent_configs")
+
+NOW = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+FAST, SLOW = "google/gemini-2.5-flash", "anthropic/claude-sonnet-4"
+
+
+def runs(agent_name, model, latencies, failures=0, executed_at=NOW):
+    return [
+        {
+            "agent_name": agent_name,
+            "model": model,
+            "execution_time_ms": latency,
+            "success": i >= failures,
+            "token_usage_output": 100,
+            "executed_at": executed_at
+        }
+        for i, latency in enumerate(latencies)
+    ]
+
+
+@pytest.fixture
+async def rollup(db):
+    records = (
+        # 10ms .. 1000ms, evenly spread
+        runs("validator", FAST, [10.0 * i for i in range(1, 101)], failures=5)
+        + runs("validator", SLOW, [2000.0] * 20)
+        + runs("risk_assessor", FAST, [500.0] * 10, failures=10)
+        # Outside every window used below
+        + runs("validator", FAST, [60_000.0] * 50, executed_at=NOW - timedelta(days=40))
+    )
+    # Split across two upserts, as two sink flushes would be
+    await upsert_hourly_rollup(db, hourly_rollup_rows(records[:60]))
+    await upsert_hourly_rollup(db, hourly_rollup_rows(records[60:]))
+    await db.commit()
+
+
+def test_latency_buckets_are_ten_percent_wide():
+    for latency in (3.0, 120.0, 4_321.0, 95_000.0):
+        assert bucket_latency_ms(latency_bucket(latency)) == pytest.approx(latency, rel=0.05)
+    assert latency_bucket(110.0) == latency_bucket(100.0) + 1
+    assert latency_bucket(0.2) == latency_bucket(1.0) == 0
+
+
+def test_rollup_rows_group_by_hour_agent_model_and_bucket():
+    rows = hourly_rollup_rows(runs("validator", None, [100.0, 101.0, 400.0], failures=1))
+    assert sorted((row["model"], row["executions"], row["successes"], row["total_time_ms"]) for row in rows) == [
+        ("", 1, 1, 400.0), ("", 2, 1, 201.0)
+    ]
+    assert {row["hour"] for row in rows} == {NOW.replace(minute=0)}
+
+
+async def test_summary_by_model_agent_and_overall(db, rollup):
+    summary = await performance_summary(db, NOW - timedelta(days=30))
+
+    fast = summary["by_model"][("validator", FAST)]
+    assert fast["executions"] == 100
+    assert fast["avg_execution_time_ms"] == 505.0
+    assert fast["success_rate"] == 0.95
+    assert fast["tokens_per_second"] == round(100 * 100 / 50.5, 1)
+    assert fast["p50"] == pytest.approx(500, rel=0.1)
+    assert fast["p95"] == pytest.approx(950, rel=0.1)
+    assert fast["p99"] == pytest.approx(990, rel=0.1)
+
+    validator = summary["by_agent"]["validator"]
+    assert validator["executions"] == 120
+    assert validator["p50"] == pytest.approx(600, rel=0.1)
+    # The slow model owns the tail
+    assert validator["p95"] == validator["p99"] == pytest.approx(2000, rel=0.05)
+
+    assert summary["by_agent"]["risk_assessor"]["success_rate"] == 0.0
+    assert summary["overall"]["executions"] == 130
+    assert summary["overall"]["success_rate"] == round(115 / 130, 4)
+
+
+async def test_summary_window_excludes_older_hours(db, rollup):
+    summary = await performance_summary(db, NOW - timedelta(days=60))
+    assert summary["by_model"][("validator", FAST)]["executions"] == 150
+    assert summary["by_model"][("validator", FAST)]["p99"] == pytest.approx(60_000, rel=0.05)
+
+    empty = await performance_summary(db, NOW + timedelta(hours=2))
+    assert empty == {"by_model": {}, "by_agent": {}, "overall": {}}
+
+
+async def test_performance_endpoint_reports_the_rollup(client, rollup):
+    response = await client.get("/api/v1/admin/agent-config/performance", params={"days": 30})
+    assert response.status_code == 200
+    body = response.json()
+
+    metrics = {metric["agent_name"]: metric for metric in body["metrics"]}
+    assert list(metrics) == ["risk_assessor", "validator"]
+    validator = metrics["validator"]
+    assert validator["last_30_days_executions"] == 120
+    assert set(validator["model_performance"]) == {FAST, SLOW}
+    assert validator["model_performance"][SLOW]["p50_ms"] == pytest.approx(2000, rel=0.05)
+
+    assert body["overall_stats"]["total_executions"] == 130
+    assert body["overall_stats"]["period_days"] == 30
+    assert body["period"] == "last_30_days"
@@ -0,0 +1,88 @@
+"""Read routing between a primary and a replica, with two SQLite files standing in"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import ReplicaRouter, _session_factory
+from tests.conftest import TEST_DIR
+
+MAX_LAG_SECONDS = 5.0
+
+
+async def sqlite_database(name: str, lag_seconds: float = 0.0):
+    """A database file that knows its own name and its simulated replication lag"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DIR}/{name}.db")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS role (name TEXT, lag_seconds REAL)"))
+        await conn.execute(text("DELETE FROM role"))
+        await conn.execute(text("INSERT INTO role VALUES (:name, :lag)"), {"name": name, "lag": lag_seconds})
+    return engine
+
+
+async def simulated_lag(session) -> float:
+    # SQLite does not replicate; read the lag the test stored instead
+    return (await session.execute(text("SELECT lag_seconds FROM role"))).scalar()
+
+
+async def read_role(router: ReplicaRouter, primary) -> str:
+    factory = await router.read_session_factory(primary)
+    async with factory() as session:
+        return (await session.execute(text("SELECT name FROM role"))).scalar()
+
+
+@pytest.fixture
+async def primary():
+    engine = await sqlite_database("primary")
+    yield _session_factory(engine)
+    await engine.dispose()
+
+
+async def test_healthy_replica_serves_reads(primary):
+    replica = await sqlite_database("replica", lag_seconds=0.5)
+    router = ReplicaRouter(_session_factory(replica), MAX_LAG_SECONDS, check_interval=0, lag_probe=simulated_lag)
+
+    assert await read_role(router, primary) == "replica"
+    assert router.stats()["using_replica"] is True
+    assert router.stats()["lag_seconds"] == 0.5
+    assert (router.replica_reads, router.primary_reads) == (1, 0)
+    await replica.dispose()
+
+
+async def test_lagging_replica_falls_back_to_primary(primary):
+    replica = await sqlite_database("replica", lag_seconds=30.0)
+    router = ReplicaRouter(_session_factory(replica), MAX_LAG_SECONDS, check_interval=0, lag_probe=simulated_lag)
+
+    assert await read_role(router, primary) == "primary"
+    assert router.stats()["using_replica"] is False
+    assert router.stats()["lag_seconds"] == 30.0
+
+    # Caught up: reads move back on the next check
+    async with replica.begin() as conn:
+        await conn.execute(text("UPDATE role SET lag_seconds = 1"))
+    assert await read_role(router, primary) == "replica"
+    assert (router.replica_reads, router.primary_reads) == (1, 1)
+    await replica.dispose()
+
+
+async def test_unreachable_replica_falls_back_to_primary(primary):
+    replica = create_async_engine(f"sqlite+aiosqlite:///{TEST_DIR}/missing-dir/replica.db")
+    router = ReplicaRouter(_session_factory(replica), MAX_LAG_SECONDS, check_interval=0)
+
+    assert await read_role(router, primary) == "primary"
+    assert router.stats()["using_replica"] is False
+    assert router.stats()["last_error"]
+    assert router.stats()["lag_seconds"] is None
+    await replica.dispose()
+
+
+async def test_replica_health_is_cached_between_checks(primary):
+    replica = await sqlite_database("replica")
+    router = ReplicaRouter(_session_factory(replica), MAX_LAG_SECONDS, check_interval=60, lag_probe=simulated_lag)
+
+    assert await read_role(router, primary) == "replica"
+    async with replica.begin() as conn:
+        await conn.execute(text("UPDATE role SET lag_seconds = 30"))
+    # Still within the check interval: the cached health decides
+    assert await read_role(router, primary) == "replica"
+    await replica.dispose()
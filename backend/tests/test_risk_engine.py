@@ -0,0 +1,160 @@
+"""Local hazard re-scoring and when live updates use it instead of the agents"""
+
+import copy
+
+import pytest
+
+from app.agents.risk_engine import (
+    EXTREME_TEMPERATURE_MULTIPLIER,
+    HIGH_WIND_MULTIPLIER,
+    PRECIPITATION_MULTIPLIER,
+    RiskEngine
+)
+from app.agents.profiles.risk_assessor import RiskAssessorAgent
+from app.core.config import get_settings
+from tests.conftest import AGENT_OUTPUTS
+from tests.test_live_update import analyze_without_flush
+
+engine = RiskEngine()
+
+CALM = {"windSpeed": 10, "temperature": 50}
+# Fall hazard: probability 0.0588 under calm conditions, Fatal, stored score 60
+RISK_DATA = AGENT_OUTPUTS[RiskAssessorAgent]
+
+
+@pytest.mark.parametrize("weather, factors", [
+    ({"temperature": 32}, []),
+    ({"temperature": 31.9}, ["Extreme temp"]),
+    ({"temperature": 95}, []),
+    ({"temperature": "96"}, ["Extreme temp"]),
+    ({"windSpeed": 25}, []),
+    ({"windSpeed": 25.5}, ["High winds"]),
+    ({"precipitation": True}, ["Precipitation"]),
+    ({"precipitation": False}, []),
+    ({"temperature": "n/a", "windSpeed": None}, []),
+    ({"temperature": 20, "windSpeed": 40, "precipitation": True}, ["Extreme temp", "High winds", "Precipitation"])
+])
+def test_weather_factor_thresholds(weather, factors):
+    assert [label for label, _ in engine.weather_factors(weather)] == factors
+
+
+def test_weather_multipliers_compound():
+    stormy = {"temperature": 20, "windSpeed": 40, "precipitation": True}
+    assert engine.weather_multiplier(stormy) == pytest.approx(
+        EXTREME_TEMPERATURE_MULTIPLIER * HIGH_WIND_MULTIPLIER * PRECIPITATION_MULTIPLIER
+    )
+    assert engine.weather_multiplier({}) == 1.0
+
+
+def test_risk_score_is_capped_between_1_and_100():
+    assert engine.risk_score(0.0588, "Fatal") == 59
+    assert engine.risk_score(0.5, "Fatal") == 100
+    assert engine.risk_score(3.0, "Minor") == 100  # Probability itself caps at 1
+    assert engine.risk_score(0.0001, "Minor") == 1
+
+
+@pytest.mark.parametrize("score, level", [
+    (100, "EXTREME"), (95, "EXTREME"), (94, "HIGH"), (75, "HIGH"), (74, "MEDIUM"),
+    (50, "MEDIUM"), (49, "LOW"), (1, "LOW"), (0, "LOW")
+])
+def test_risk_level_bands(score, level):
+    assert engine.risk_level(score) == level
+
+
+def test_rescore_moves_the_stored_score_by_the_formula_change():
+    cold = engine.rescore(RISK_DATA, CALM, {**CALM, "temperature": 20})
+    [hazard] = cold["hazards"]
+    # Formula: 59 -> 82 (x1.4); the stored 60 moves by the same 23
+    assert hazard["riskScore"] == 83
+    assert hazard["riskLevel"] == "HIGH"
+    assert hazard["probability"] == round(0.06 + 0.0588 * 0.4, 4)
+    assert hazard["probabilityCalculation"]["weatherMultiplier"] == EXTREME_TEMPERATURE_MULTIPLIER
+    assert cold["riskSummary"] == {"overallRiskLevel": "HIGH", "highestRiskScore": 83}
+    assert cold["topThreats"] == ["Fall from steel at 45ft (Risk Score: 83)"]
+    # The stored output is not modified
+    assert RISK_DATA["hazards"][0]["riskScore"] == 60
+
+
+def test_rescore_under_unchanged_conditions_keeps_the_stored_score():
+    assert engine.rescore(RISK_DATA, CALM, dict(CALM))["hazards"][0]["riskScore"] == 60
+
+
+def test_rescore_caps_score_and_probability():
+    risk_data = copy.deepcopy(RISK_DATA)
+    risk_data["hazards"][0]["probability"] = 0.95
+    storm = engine.rescore(risk_data, CALM, {"windSpeed": 45, "temperature": 10, "precipitation": True}, experience="new")
+    hazard = storm["hazards"][0]
+    assert (hazard["riskScore"], hazard["riskLevel"], hazard["probability"]) == (100, "EXTREME", 1.0)
+    assert hazard["probabilityCalculation"]["experienceMultiplier"] == 2.1
+
+    # Back to calm with an expert crew: the formula drops 100 -> 35
+    calmer = engine.rescore(storm, {"windSpeed": 45, "temperature": 10, "precipitation": True}, CALM, experience="expert")
+    assert (calmer["hazards"][0]["riskScore"], calmer["hazards"][0]["riskLevel"]) == (35, "LOW")
+
+
+def hazard_with(**changes):
+    risk_data = copy.deepcopy(RISK_DATA)
+    hazard = risk_data["hazards"][0]
+    for key, value in changes.items():
+        if key in hazard["probabilityCalculation"]:
+            hazard["probabilityCalculation"][key] = value
+        else:
+            hazard[key] = value
+    return risk_data
+
+
+def test_missing_stored_values_are_recomputed():
+    # No stored score or probability: taken from the formula
+    [hazard] = engine.rescore(hazard_with(riskScore=None, probability=None), CALM, CALM)["hazards"]
+    assert (hazard["riskScore"], hazard["probability"]) == (59, 0.0588)
+
+    # No hazard multiplier: the category's; no experience multiplier: 1.0
+    [hazard] = engine.rescore(hazard_with(hazardMultiplier=None, experienceMultiplier=None), CALM, CALM)["hazards"]
+    assert hazard["riskScore"] == 60
+    assert hazard["probabilityCalculation"]["experienceMultiplier"] == 1.0
+
+
+@pytest.mark.parametrize("risk_data, experience", [
+    (hazard_with(probabilityCalculation=None), None),
+    (hazard_with(base=None), None),
+    (hazard_with(controlMultiplier="adequate"), None),
+    (hazard_with(hazardMultiplier=None, category="Unlisted"), None),
+    (hazard_with(consequence="Bad"), None),
+    (RISK_DATA, "unknown-level"),
+    ({"hazards": []}, None),
+    ({}, None)
+])
+def test_rescore_gives_up_without_the_stored_calculation(risk_data, experience):
+    assert engine.rescore(risk_data, CALM, {"windSpeed": 30}, experience=experience) is None
+
+
+LIVE_UPDATES = [
+    ({"wind_speed": 35}, True),
+    ({"temperature": 20, "precipitation": True}, True),
+    ({"crew_experience": "new"}, True),
+    ({"wind_speed": 35, "crew_size": 3}, False),
+    ({"crew_size": 3}, False),
+    ({"visibility": "poor"}, False)
+]
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("extracted_variables, local", LIVE_UPDATES)
+async def test_live_update_rescores_locally_only_for_rescorable_changes(client, fake_agents, extracted_variables, local):
+    assert get_settings().live_update_local_rescoring
+    analysis_id = await analyze_without_flush(client)
+    fake_agents.clear()
+
+    response = await client.post("/api/v1/jha/live-update", json={
+        "original_jha_id": analysis_id, "voice_input": "update", "extracted_variables": extracted_variables
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    if local:
+        assert body["stages_rescored"] == ["risk_assessor"]
+        assert set(body["stages_reused"]) == {"jha_validator", "swiss_cheese_analyzer"}
+        # Only the synthesis is an agent call
+        assert fake_agents == ["synthesis_agent"]
+    else:
+        assert body["stages_rescored"] == []
+        assert "risk_assessor" in body["stages_rerun"]
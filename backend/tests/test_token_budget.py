@@ -0,0 +1,160 @@
+"""Prompt fitting, output budgets and context-window routing"""
+
+import json
+
+import pytest
+
+from app.agents.base import AgentTask, ModelCapability
+from app.agents.registry import AgentRegistry
+from app.agents.token_budget import MIN_OUTPUT_TOKENS, estimate_tokens, fit_prompt_to_window, output_token_budget
+
+TEMPLATE = "Review this checklist and answer in JSON.\n{checklist}"
+
+
+def render(checklist_json: str) -> str:
+    return TEMPLATE.format(checklist=checklist_json)
+
+
+def checklist() -> dict:
+    responses = {"q-empty": {"value": "N/A"}}
+    responses.update({f"q-{i}": {"value": f"answer {i} " + "detail " * 120} for i in range(6)})
+    responses["q-critical"] = {"value": "wind 35 mph at 120ft " + "gusting " * 200, "critical": True}
+    return {"templateId": "master-jha", "responses": responses}
+
+
+def window_for(data: dict, reserve: int = MIN_OUTPUT_TOKENS) -> int:
+    """A context window the compact rendering of data just fits into"""
+    return estimate_tokens(render(json.dumps(data))) + reserve
+
+
+def answers(prompt: str) -> dict:
+    return json.loads(prompt[len(TEMPLATE.format(checklist="")):])["responses"]
+
+
+def test_prompt_that_fits_is_unchanged():
+    prompt, report = fit_prompt_to_window(render, checklist(), 1_000_000, 4000)
+    assert report["steps"] == []
+    assert prompt == render(json.dumps(checklist(), indent=2))
+
+
+def test_compact_json_comes_first():
+    prompt, report = fit_prompt_to_window(render, checklist(), window_for(checklist()), MIN_OUTPUT_TOKENS)
+    assert report["steps"] == ["compact_json"]
+    assert "q-empty" in answers(prompt)
+
+
+def test_empty_answers_are_dropped_before_real_ones():
+    data = checklist()
+    del data["responses"]["q-empty"]
+    prompt, report = fit_prompt_to_window(render, checklist(), window_for(data), MIN_OUTPUT_TOKENS)
+    assert report["steps"] == ["compact_json", "dropped_empty_answers:1"]
+    assert set(answers(prompt)) == set(data["responses"])
+
+
+def test_non_critical_answers_are_truncated_then_dropped_last_first():
+    data = checklist()
+    del data["responses"]["q-empty"]
+    for key in ("q-3", "q-4", "q-5"):
+        del data["responses"][key]
+    for key, answer in data["responses"].items():
+        if not answer.get("critical"):
+            answer["value"] = answer["value"][:200].rstrip() + " [truncated]"
+
+    prompt, report = fit_prompt_to_window(render, checklist(), window_for(data), MIN_OUTPUT_TOKENS)
+    assert report["steps"] == [
+        "compact_json", "dropped_empty_answers:1", "truncated_non_critical_answers", "dropped_non_critical_answers:3"
+    ]
+    kept = answers(prompt)
+    assert list(kept) == ["q-0", "q-1", "q-2", "q-critical"]
+    # The critical answer is still whole
+    assert kept["q-critical"] == checklist()["responses"]["q-critical"]
+
+
+def test_critical_answers_are_truncated_last_then_hard_cut():
+    window = estimate_tokens(render("")) + 40 + MIN_OUTPUT_TOKENS
+    prompt, report = fit_prompt_to_window(render, checklist(), window, MIN_OUTPUT_TOKENS)
+    assert report["steps"][-2:] == ["truncated_critical_answers", "hard_cut"]
+    assert report["prompt_tokens"] <= window - MIN_OUTPUT_TOKENS
+    assert prompt.endswith("...[checklist truncated to fit model context]")
+
+
+def test_at_least_the_minimum_is_reserved_for_output():
+    # A tiny requested max_tokens still leaves room for a usable answer
+    _, report = fit_prompt_to_window(render, checklist(), 2000, 10)
+    assert report["budget_tokens"] == 2000 - MIN_OUTPUT_TOKENS
+    assert output_token_budget(2000, report["prompt_tokens"], 4000) >= MIN_OUTPUT_TOKENS
+
+
+def test_output_budget_never_exceeds_the_remaining_window():
+    assert output_token_budget(32_768, 30_000, 4000) == 2768
+    assert output_token_budget(32_768, 1000, 4000) == 4000
+    assert output_token_budget(32_768, 32_768 - MIN_OUTPUT_TOKENS, 4000) == MIN_OUTPUT_TOKENS
+
+
+@pytest.mark.parametrize("prompt_tokens", [32_768 - 100, 32_768, 40_000])
+def test_output_budget_raises_when_too_little_is_left(prompt_tokens):
+    with pytest.raises(ValueError, match="context window"):
+        output_token_budget(32_768, prompt_tokens, 4000)
+
+
+class FakeAdapter:
+    def __init__(self, context_window: int, cost: float, capabilities=()):
+        self.context_window = context_window
+        self.cost = cost
+        self.capabilities = list(capabilities)
+
+    def get_context_window(self) -> int:
+        return self.context_window
+
+    def get_cost_per_1k_tokens(self):
+        return {"input": self.cost, "output": self.cost}
+
+    def get_capabilities(self):
+        return self.capabilities
+
+
+@pytest.fixture
+def registry():
+    # No API keys involved: only the routing logic is under test
+    registry = AgentRegistry.__new__(AgentRegistry)
+    registry.adapters = {
+        "small": FakeAdapter(32_768, 0.0, [ModelCapability.FAST_REASONING]),
+        "medium": FakeAdapter(131_072, 0.1, [ModelCapability.FAST_REASONING]),
+        "long": FakeAdapter(1_048_576, 0.5, [ModelCapability.LONG_CONTEXT]),
+        "huge": FakeAdapter(2_000_000, 1.0)
+    }
+    return registry
+
+
+def task(prompt_tokens, max_tokens=4000) -> AgentTask:
+    return AgentTask(task_type="risk_assessment", input_data={}, max_tokens=max_tokens, estimated_prompt_tokens=prompt_tokens)
+
+
+def candidates(registry, *names):
+    return [(name, registry.adapters[name]) for name in names]
+
+
+def filtered(registry, names, prompt_tokens, **kwargs):
+    return [name for name, _ in registry._filter_by_context_window(candidates(registry, *names), task(prompt_tokens), **kwargs)]
+
+
+def test_candidates_that_fit_are_kept(registry):
+    assert filtered(registry, ["small", "medium"], 10_000) == ["small", "medium"]
+    # Prompt plus requested output must fit
+    assert filtered(registry, ["small", "medium"], 30_000) == ["medium"]
+
+
+def test_no_estimate_keeps_every_candidate(registry):
+    assert filtered(registry, ["small"], None) == ["small"]
+
+
+def test_widens_to_long_context_models_when_nothing_fits(registry):
+    assert filtered(registry, ["small", "medium"], 500_000) == ["long"]
+
+
+def test_falls_back_to_the_largest_window_when_nothing_fits(registry):
+    assert filtered(registry, ["small", "medium"], 1_500_000) == ["huge"]
+
+
+def test_preferred_candidate_is_not_widened(registry):
+    assert filtered(registry, ["small"], 100_000, widen=False) == []
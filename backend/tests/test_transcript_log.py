@@ -0,0 +1,128 @@
+"""Segmented transcript log: appends, reads by analysis, sealing and crash repair"""
+
+import os
+from uuid import uuid4
+
+import pytest
+
+from app.core.transcript_log import INDEX_ENTRY, TranscriptLog
+
+
+def transcript_log(directory, **kwargs) -> TranscriptLog:
+    log = TranscriptLog(directory=directory, flush_interval_ms=10, **kwargs)
+    log.enabled = True  # Disabled for the rest of the test session
+    return log
+
+
+def entries(records):
+    return [(record["agent"], record["prompt"], record["response"]) for record in records]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return tmp_path / "transcripts"
+
+
+async def test_append_and_read_by_analysis(directory):
+    log = transcript_log(directory)
+    first, second = uuid4(), uuid4()
+    await log.start()
+    log.record(first, "validator", "model-a", "validate this", "looks fine", tokens=12)
+    log.record(second, "validator", "model-a", "another checklist", "missing PPE")
+    log.record(first, "risk_assessor", "model-b", "score hazards", '{"hazards": []}')
+    log.record(None, "voice", "model-c", "wind 35", '{"wind_speed": 35}')
+    await log.stop()
+
+    assert entries(await log.read(first)) == [
+        ("validator", "validate this", "looks fine"),
+        ("risk_assessor", "score hazards", '{"hazards": []}')
+    ]
+    record = (await log.read(first))[0]
+    assert (record["analysis_id"], record["model"], record["tokens"]) == (str(first), "model-a", 12)
+    assert entries(await log.read(second)) == [("validator", "another checklist", "missing PPE")]
+    assert await log.read(uuid4()) == []
+    assert log.stats()["written"] == 4
+
+
+async def test_index_is_rebuilt_at_startup(directory):
+    analysis_id = uuid4()
+    log = transcript_log(directory)
+    log.record(analysis_id, "validator", "m", "before restart", "r1")
+    await log.stop()
+
+    restarted = transcript_log(directory)
+    await restarted.start()
+    restarted.record(analysis_id, "validator", "m", "after restart", "r2")
+    await restarted.stop()
+
+    # Each start appends to a fresh segment
+    assert restarted.stats()["segments"] == 2
+    assert [record["prompt"] for record in await restarted.read(analysis_id)] == ["before restart", "after restart"]
+
+
+async def test_full_segment_is_sealed(directory):
+    analysis_id = uuid4()
+    log = transcript_log(directory, segment_max_bytes=1)
+    for i in range(3):
+        log.record(analysis_id, "validator", "m", f"prompt {i}", "r")
+        # One batch per record: each write finds the segment full
+        log._write_batch(log._take(log.batch_size))
+    await log.stop()
+
+    assert log.stats()["segments"] == 3
+    assert [segment for segment, _, _ in log._index[analysis_id]] == [1, 2, 3]
+    assert [record["prompt"] for record in await log.read(analysis_id)] == ["prompt 0", "prompt 1", "prompt 2"]
+
+
+async def test_torn_record_is_trimmed_at_startup(directory):
+    analysis_id = uuid4()
+    log = transcript_log(directory)
+    for i in range(2):
+        log.record(analysis_id, "validator", "m", f"prompt {i}", "r")
+    await log.stop()
+    log_path, idx_path = log._log_path(1), log._idx_path(1)
+    intact = (log_path.stat().st_size, idx_path.stat().st_size)
+
+    # Crash mid-batch: a partial record and a partial index entry
+    with open(log_path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial record")
+    with open(idx_path, "ab") as f:
+        f.write(analysis_id.bytes[:10])
+
+    restarted = transcript_log(directory)
+    await restarted.start()
+    assert (log_path.stat().st_size, idx_path.stat().st_size) == intact
+    assert intact[1] % INDEX_ENTRY.size == 0
+
+    restarted.record(analysis_id, "validator", "m", "after crash", "r")
+    await restarted.stop()
+    assert [record["prompt"] for record in await restarted.read(analysis_id)] == ["prompt 0", "prompt 1", "after crash"]
+
+
+async def test_expired_segments_are_deleted(directory):
+    analysis_id = uuid4()
+    log = transcript_log(directory)
+    log.record(analysis_id, "validator", "m", "old", "r")
+    await log.stop()
+    old = log._log_path(1)
+    os.utime(old, (0, 0))
+
+    restarted = transcript_log(directory, retention_days=1)
+    await restarted.start()
+    await restarted.stop()
+    assert not old.exists()
+    assert await restarted.read(analysis_id) == []
+
+
+def test_disabled_log_records_nothing(directory):
+    log = TranscriptLog(directory=directory)
+    log.enabled = False
+    log.record(uuid4(), "validator", "m", "p", "r")
+    assert log.stats()["queued"] == log.recorded == 0
+
+
+def test_full_queue_drops_and_counts(directory):
+    log = transcript_log(directory, max_queue_size=1)
+    log.record(uuid4(), "validator", "m", "p", "r")
+    log.record(uuid4(), "validator", "m", "p", "r")
+    assert (log.recorded, log.dropped) == (2, 1)
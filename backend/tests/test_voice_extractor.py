@@ -0,0 +1,97 @@
+"""Voice update extraction: common phrasings the rules handle, and the ones left to the LLM"""
+
+import pytest
+
+from app.services.voice_extractor import VoiceExtractor
+
+# Utterance -> fields the rules extract (concern_keywords aside); each
+# must be understood completely, without the LLM
+PARSED = [
+    ("wind now 35 mph gusting", {"wind_speed": 35}),
+    ("gusts up to 45 mph", {"wind_speed": 45}),
+    ("winds gusting to 40", {"wind_speed": 40}),
+    ("wind 30 km/h", {"wind_speed": 19}),
+    # Sustained and gust: the higher one; a bare gust takes the stated unit
+    ("wind 20 gusts 35", {"wind_speed": 35}),
+    ("30 mph winds gusting 45", {"wind_speed": 45}),
+    ("winds at 30 km/h gusting 45", {"wind_speed": 28}),
+    ("temp dropped to 28 degrees", {"temperature": 28}),
+    ("it's 12 c out here", {"temperature": 54}),
+    ("crew of 4", {"crew_size": 4}),
+    ("we're down to three guys", {"crew_size": 3}),
+    ("5 new guys on site", {"crew_size": 5, "crew_experience": "new"}),
+    ("starting to rain", {"precipitation": True}),
+    ("rain stopped", {"precipitation": False}),
+    ("2 cranes arrived", {"equipment_changes": ["2 cranes added"]}),
+    ("two forklifts delivered", {"equipment_changes": ["2 forklifts added"]}),
+    ("forklift broke down", {"equipment_changes": ["forklift down"]}),
+    ("the scissor lift is down", {"equipment_changes": ["scissor lift down"]}),
+    ("crew of 6, wind 20 mph, another crane", {"crew_size": 6, "wind_speed": 20, "equipment_changes": ["crane added"]})
+]
+
+# Utterance -> fields the rules still extract before falling back
+FALLBACK = [
+    # Relative changes are not readings
+    ("temperature dropped 10 degrees", {"temperature": None}),
+    ("it is 5 degrees colder", {"temperature": None}),
+    ("crew is down 2 people", {"crew_size": None}),
+    ("wind picked up by 10 mph", {"wind_speed": None}),
+    ("temp rose by 5", {"temperature": None}),
+    ("boss wants to reschedule the pour", {}),
+    ("we're moving the pour to tomorrow", {})
+]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = []
+        self.response = {"time_of_day": "morning"}
+
+    async def extract_variables_from_voice(self, voice_input, original_job_context=None):
+        self.calls.append(voice_input)
+        return dict(self.response)
+
+
+@pytest.fixture
+def extractor():
+    extractor = VoiceExtractor(min_confidence=0.8)
+    extractor.llm_fallback_enabled = True
+    extractor._llm = FakeLLM()
+    return extractor
+
+
+@pytest.mark.parametrize("voice_input, expected", PARSED)
+async def test_common_phrasings_use_the_rules_only(extractor, voice_input, expected):
+    variables, confidence, unexplained = extractor.extract_local(voice_input)
+    assert {name: variables.get(name) for name in expected} == expected
+    assert (confidence, unexplained) == (1.0, [])
+
+    extracted = await extractor.extract(voice_input)
+    assert extracted["source"] == "rules"
+    assert extractor._llm.calls == []
+
+
+@pytest.mark.parametrize("voice_input, expected", FALLBACK)
+async def test_unexplained_words_fall_back_to_the_llm(extractor, voice_input, expected):
+    variables, confidence, unexplained = extractor.extract_local(voice_input)
+    assert {name: variables.get(name) for name in expected} == expected
+    assert unexplained
+
+    extracted = await extractor.extract(voice_input)
+    assert extractor._llm.calls == [voice_input]
+    assert extracted["source"] == ("rules+llm" if variables else "llm")
+    # Rule values are kept; the LLM only fills the gaps
+    assert {name: extracted.get(name) for name in expected} == expected
+    assert extracted["time_of_day"] == "morning"
+
+
+async def test_llm_overrides_fields_next_to_unexplained_words(extractor):
+    extractor._llm.response = {"wind_speed": 25, "crew_size": 6}
+    voice_input = "wind 20 mph, crew of 4 plus 2 more"
+    variables, _, unexplained = extractor.extract_local(voice_input)
+    assert (variables["wind_speed"], variables["crew_size"]) == (20, 4)
+    assert unexplained == ["plus", "2"]
+
+    extracted = await extractor.extract(voice_input)
+    # "plus 2" follows the crew size; the wind reading stands on its own
+    assert (extracted["wind_speed"], extracted["crew_size"]) == (20, 6)